@@ -11,27 +11,50 @@ import pandas as pd
 # First-party imports
 from modules.lodging_log import LodgingLog
 
-def create_annual_night_counts(output_csv: Path) -> None:
-    """Create a CSV file with night counts for each year in the dataset."""
-    # Get lodging log data.
-    log = LodgingLog()
-    mornings = log.mornings()
-    mornings['year'] = mornings.index.year
-    mornings = mornings[['year', 'purpose']].reset_index()
+def create_annual_night_counts(output_csv: Path, log=None,
+    stream=False) -> None:
+    """
+    Create a CSV file with night counts for each year in the dataset.
 
-    # Create a pivot table for year and purpose counts.
-    annual_counts = pd.pivot_table(mornings,
-        index='year',
-        columns='purpose',
-        values='morning',
-        aggfunc='count',
-        fill_value=0
-    )
+    Args:
+        output_csv (Path): The CSV file to write.
+        log (LodgingLog): An open lodging log to read. Defaults to
+            opening the configured log.
+        stream (bool): Whether to count the mornings one year at a time
+            rather than loading them all at once.
+    """
+    if log is None:
+        with LodgingLog() as log:
+            all_annual_counts = annual_night_counts(log, stream)
+    else:
+        all_annual_counts = annual_night_counts(log, stream)
+
+    # Save the result to a CSV file.
+    all_annual_counts.to_csv(output_csv, index=False)
+    print(f"Annual night counts saved to {output_csv}")
+
+def annual_night_counts(log, stream=False) -> pd.DataFrame:
+    """
+    Return a DataFrame with night counts for each year in the log.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        stream (bool): Whether to count the mornings one year at a time
+            with log.iter_mornings(), so that memory use does not grow
+            with the length of the log.
+    """
+    if stream:
+        annual_counts = pd.concat([
+            purpose_counts(mornings)
+            for mornings in log.iter_mornings(chunk='year')
+        ]).fillna(0).astype('int')
+    else:
+        annual_counts = purpose_counts(log.mornings())
 
     # Create a date range from the minimum year to the current year.
     # This ensures that all years are represented in the output, even if
     # there are no entries for some years.
-    year_range = range(mornings['year'].min(), date.today().year + 1)
+    year_range = range(annual_counts.index.min(), date.today().year + 1)
     all_annual_counts = pd.DataFrame(year_range, columns=['year'])
 
     # Merge the date DataFrame with the annual counts
@@ -48,9 +71,24 @@ def create_annual_night_counts(output_csv: Path) -> None:
         'business_night_count': 'int', 'personal_night_count': 'int'
     })
 
-    # Save the result to a CSV file.
-    all_annual_counts.to_csv(output_csv, index=False)
-    print(f"Annual night counts saved to {output_csv}")
+    return all_annual_counts
+
+def purpose_counts(mornings) -> pd.DataFrame:
+    """
+    Return a DataFrame of night counts indexed by year, with a column for
+    each purpose.
+    """
+    mornings = mornings.assign(year=mornings.index.year)
+    mornings = mornings[['year', 'purpose']].reset_index()
+
+    # Create a pivot table for year and purpose counts.
+    return pd.pivot_table(mornings,
+        index='year',
+        columns='purpose',
+        values='morning',
+        aggfunc='count',
+        fill_value=0
+    )
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -60,5 +98,9 @@ if __name__ == "__main__":
         type=Path,
         help="Path to the output CSV file for annual night counts."
     )
+    parser.add_argument('--stream',
+        action='store_true',
+        help="Count the mornings one year at a time to bound memory use."
+    )
     args = parser.parse_args()
-    create_annual_night_counts(args.output_csv)
+    create_annual_night_counts(args.output_csv, stream=args.stream)
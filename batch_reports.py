@@ -0,0 +1,199 @@
+"""
+Generates the reports in a pipeline spec for many lodging logs, one
+GeoPackage per traveler, writing each traveler's reports to their own
+folder.
+"""
+
+# Standard library imports
+import contextlib
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import pandas as pd
+import tomllib
+
+# First-party imports
+from modules.lodging_log import LodgingLog
+from run_pipeline import build_pipeline
+
+def find_logs(source):
+    """
+    Returns the travelers and GeoPackage paths to process.
+
+    Args:
+        source (Path): A folder of GeoPackages, each named for its
+            traveler, or a TOML manifest with a `[[logs]]` table for each
+            log, each with a `traveler` name and a `path`.
+
+    Returns:
+        list: A list of (traveler, path) tuples.
+    """
+    source = Path(source).expanduser()
+    if source.is_dir():
+        logs = [(path.stem, path) for path in sorted(source.glob("*.gpkg"))]
+    else:
+        with open(source, 'rb') as f:
+            manifest = tomllib.load(f)
+        logs = [
+            (log['traveler'], Path(log['path']).expanduser())
+            for log in manifest.get('logs', [])
+        ]
+    travelers = [traveler for traveler, _ in logs]
+    duplicates = sorted({t for t in travelers if travelers.count(t) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate travelers: {', '.join(duplicates)}")
+    if not logs:
+        raise ValueError(f"No lodging logs found in {source}")
+    return logs
+
+
+def process_log(traveler, gpkg_path, spec, output_dir):
+    """
+    Generates the reports in a spec for one lodging log. Any error is
+    returned rather than raised, so one failed log does not stop the
+    others. The reports' console output is written to batch.log in the
+    traveler's folder.
+
+    Args:
+        traveler (str): The traveler's name, used for their folder.
+        gpkg_path (Path): The traveler's GeoPackage.
+        spec (dict): The parsed pipeline spec. Its output_dir is
+            replaced by the traveler's folder.
+        output_dir (Path): The folder for every traveler's folder.
+
+    Returns:
+        tuple: A dict summarizing the log's run, and the DataFrame of
+        stage timings from Pipeline.run() (empty if the log failed).
+    """
+    traveler_dir = Path(output_dir) / traveler
+    traveler_dir.mkdir(parents=True, exist_ok=True)
+    summary = {
+        'traveler': traveler,
+        'path': str(gpkg_path),
+        'status': 'ok',
+        'failed_outputs': 0,
+        'error': None,
+    }
+    timings = pd.DataFrame(columns=['stage', 'kind', 'seconds', 'error'])
+    start = time.perf_counter()
+    with open(traveler_dir / "batch.log", 'w', encoding='utf-8') as f, \
+        contextlib.redirect_stdout(f):
+        try:
+            with LodgingLog(path=gpkg_path) as log:
+                pipeline = build_pipeline(
+                    {**spec, 'output_dir': str(traveler_dir)},
+                    workers=1,
+                    log=log,
+                )
+                timings = pipeline.run()
+            failed = timings['error'].dropna()
+            if not failed.empty:
+                summary['status'] = 'partial'
+                summary['failed_outputs'] = len(failed)
+                summary['error'] = failed.iloc[0]
+        except Exception as e:
+            summary['status'] = 'failed'
+            summary['error'] = f"{type(e).__name__}: {e}"
+            print(summary['error'])
+    summary['seconds'] = time.perf_counter() - start
+    return summary, timings
+
+
+def batch_reports(source, spec_path, output_dir, workers=None):
+    """
+    Generates the reports in a pipeline spec for every lodging log, on a
+    pool of worker processes that each process one log at a time, and
+    writes summary.csv and timings.csv to the output folder.
+
+    Args:
+        source (Path): A folder of GeoPackages or a TOML manifest. See
+            find_logs().
+        spec_path (Path): The TOML pipeline spec listing the reports.
+        output_dir (Path): The folder to create each traveler's folder
+            in.
+        workers (int): The number of logs to process at once. Defaults to
+            the number of CPUs.
+
+    Returns:
+        DataFrame: The summary of each log's run.
+    """
+    logs = find_logs(source)
+    with open(spec_path, 'rb') as f:
+        spec = tomllib.load(f)
+    output_dir = Path(output_dir).expanduser()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    summaries = []
+    timings = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(process_log, traveler, path, spec, output_dir)
+            for traveler, path in logs
+        ]
+        for future in as_completed(futures):
+            summary, log_timings = future.result()
+            print(
+                f"{summary['traveler']:<24} {summary['status']:<8} "
+                f"{summary['seconds'] * 1000:>10.1f} ms"
+                + (
+                    f"  {summary['error'].splitlines()[0]}"
+                    if summary['error'] else ""
+                )
+            )
+            summaries.append(summary)
+            if not log_timings.empty:
+                timings.append(
+                    log_timings.assign(traveler=summary['traveler'])
+                )
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame(summaries).sort_values('traveler')
+    summary = summary[['traveler', 'path', 'status', 'seconds',
+        'failed_outputs', 'error']]
+    summary.to_csv(output_dir / "summary.csv", index=False)
+    columns = ['traveler', 'stage', 'kind', 'seconds', 'error']
+    timings = pd.concat(timings, ignore_index=True)[columns] if timings \
+        else pd.DataFrame(columns=columns)
+    timings.to_csv(output_dir / "timings.csv", index=False)
+
+    counts = summary['status'].value_counts()
+    print(
+        f"\nProcessed {len(summary)} logs in {elapsed:.1f} s: "
+        + ", ".join(f"{count} {status}" for status, count in counts.items())
+    )
+    print(f"Wrote summary to {output_dir / 'summary.csv'}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate reports for many travelers' lodging logs."
+    )
+    parser.add_argument('source',
+        help="folder of GeoPackages, or TOML manifest of travelers and paths",
+        type=Path,
+    )
+    parser.add_argument('--spec',
+        help="TOML pipeline spec listing the reports to generate",
+        type=Path,
+        default=Path(__file__).parent / "pipeline.toml",
+    )
+    parser.add_argument('--output_dir',
+        help="folder to write each traveler's reports to",
+        type=Path,
+        default=Path("output") / "batch",
+    )
+    parser.add_argument('--workers',
+        help="number of logs to process at once",
+        type=int,
+    )
+    args = parser.parse_args()
+    summary = batch_reports(
+        args.source, args.spec, args.output_dir, args.workers
+    )
+    if (summary['status'] != 'ok').any():
+        raise SystemExit(1)
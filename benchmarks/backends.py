@@ -0,0 +1,76 @@
+"""
+Benchmarks the LodgingLog storage backends against each other.
+
+Run from the repository root:
+
+    python -m benchmarks.backends --repeat 5
+
+The columnar backend is only timed if `columnar_dir` is set in
+data_sources.toml.
+"""
+
+# Standard library imports
+import statistics
+import time
+
+# Third-party imports
+import argparse
+
+# First-party imports
+from modules.lodging_log import LodgingLog, SOURCES, configured_backend
+
+OPERATIONS = {
+    'mornings': lambda log: log.mornings(),
+    'iter_mornings': lambda log: list(log.iter_mornings('year')),
+    'mornings_by city': lambda log: log.mornings_by(by='city'),
+    'home_locations': lambda log: log.home_locations(),
+}
+
+def benchmark_backends(repeat=5, backends=None):
+    """
+    Prints the median time to construct a LodgingLog with each backend
+    and to run each operation on it, with the query cache disabled.
+    """
+    if backends is None:
+        backends = ['gpkg', 'memory']
+        if 'columnar_dir' in SOURCES:
+            backends.append('columnar')
+
+    # Construct once so validation is cached for every timed run.
+    LodgingLog(backend='gpkg').close()
+
+    steps = ['construct'] + list(OPERATIONS)
+    print(f"{'backend':>10}" + "".join(f"{step:>18}" for step in steps))
+    for name in backends:
+        times = {step: [] for step in steps}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            log = LodgingLog(cache_bytes=0, backend=configured_backend(name))
+            times['construct'].append(time.perf_counter() - start)
+            for step, operation in OPERATIONS.items():
+                start = time.perf_counter()
+                operation(log)
+                times[step].append(time.perf_counter() - start)
+            log.close()
+        print(f"{name:>10}" + "".join(
+            f"{statistics.median(times[step]) * 1000:>15.2f} ms"
+            for step in steps
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the LodgingLog storage backends."
+    )
+    parser.add_argument('--repeat',
+        help="number of runs to time for each backend",
+        type=int,
+        default=5,
+    )
+    parser.add_argument('--backends',
+        help="backends to compare",
+        choices=['gpkg', 'columnar', 'memory'],
+        nargs='+',
+    )
+    args = parser.parse_args()
+    benchmark_backends(args.repeat, args.backends)
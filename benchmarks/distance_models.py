@@ -0,0 +1,117 @@
+"""
+Checks how far haversine distances deviate from geodesic distances over
+the places in the lodging log, and benchmarks the speed of each distance
+model.
+
+Run from the repository root:
+
+    python -m benchmarks.distance_models --points 1000000
+
+Exits with an error if any haversine distance deviates from its geodesic
+distance by more than the documented bound.
+"""
+
+# Standard library imports
+import statistics
+import time
+
+# Third-party imports
+import argparse
+import numpy as np
+
+# First-party imports
+from modules.distance import DISTANCE_MODELS, geodesic_miles, haversine_miles
+from modules.lodging_log import LodgingLog
+
+MAX_RELATIVE_ERROR = 0.006 # The bound documented for haversine distances.
+
+def log_coordinates(log):
+    """
+    Returns the latitudes and longitudes of every stay location, city,
+    and home in the log.
+    """
+    frames = [
+        log.geodata_cache[layer][['lat', 'lon']]
+        for layer in ['stay_locations', 'cities']
+    ]
+    frames.append(log.home_locations()[['lat', 'lon']])
+    coords = np.concatenate([frame.to_numpy('float64') for frame in frames])
+    coords = coords[~np.isnan(coords).any(axis=1)]
+    return np.unique(coords, axis=0)
+
+
+def check_deviation(log):
+    """
+    Prints the largest deviation of haversine from geodesic distances
+    between every pair of places in the log, and returns the largest
+    relative deviation.
+    """
+    coords = log_coordinates(log)
+    i, j = np.triu_indices(len(coords), k=1)
+    geodesic = geodesic_miles(coords[i, 0], coords[i, 1],
+        coords[j, 0], coords[j, 1],
+    )
+    haversine = haversine_miles(coords[i, 0], coords[i, 1],
+        coords[j, 0], coords[j, 1],
+    )
+    deviation = np.abs(haversine - geodesic)
+    nonzero = geodesic > 0
+    relative = deviation[nonzero] / geodesic[nonzero]
+    max_relative = relative.max() if len(relative) else 0.0
+    print(f"{len(coords)} places, {len(geodesic)} pairs")
+    print(f"  max deviation:          {deviation.max(initial=0):>10.3f} mi")
+    print(f"  max relative deviation: {max_relative:>10.3%}")
+    return max_relative
+
+
+def benchmark_models(points=1_000_000, repeat=5, log=None):
+    """
+    Prints the median time of each distance model over random pairs of
+    points, and to build the daily timeline with each model.
+    """
+    rng = np.random.default_rng(0)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, (2, points))))
+    lons = rng.uniform(-180, 180, (2, points))
+
+    print(f"\n{'model':>10}{f'{points:,} pairs':>20}{'daily_timeline':>20}")
+    for model, func in DISTANCE_MODELS.items():
+        times = {'pairs': [], 'timeline': []}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(lats[0], lons[0], lats[1], lons[1])
+            times['pairs'].append(time.perf_counter() - start)
+            if log is not None:
+                log.query_cache.clear()
+                start = time.perf_counter()
+                log.daily_timeline(distance_model=model)
+                times['timeline'].append(time.perf_counter() - start)
+        print(f"{model:>10}" + "".join(
+            f"{statistics.median(values) * 1000:>17.2f} ms" if values
+            else f"{'':>20}"
+            for values in times.values()
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check and benchmark the distance models."
+    )
+    parser.add_argument('--points',
+        help="number of random pairs of points to time",
+        type=int,
+        default=1_000_000,
+    )
+    parser.add_argument('--repeat',
+        help="number of runs to time for each model",
+        type=int,
+        default=5,
+    )
+    args = parser.parse_args()
+    with LodgingLog() as log:
+        max_relative = check_deviation(log)
+        benchmark_models(args.points, args.repeat, log)
+    if max_relative > MAX_RELATIVE_ERROR:
+        raise SystemExit(
+            f"Haversine deviation {max_relative:.3%} exceeds "
+            f"{MAX_RELATIVE_ERROR:.1%}."
+        )
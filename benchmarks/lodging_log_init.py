@@ -0,0 +1,61 @@
+"""
+Benchmarks LodgingLog construction with place layers read serially and
+concurrently.
+
+Run from the repository root:
+
+    python -m benchmarks.lodging_log_init --repeat 20
+"""
+
+# Standard library imports
+import statistics
+import time
+
+# Third-party imports
+import argparse
+
+# First-party imports
+from modules.lodging_log import LodgingLog, PLACE_LAYERS
+
+def benchmark_lodging_log_init(repeat=10, workers=None):
+    """
+    Prints the construction time of a new LodgingLog for each worker
+    count.
+    """
+    if workers is None:
+        workers = [1, len(PLACE_LAYERS)]
+
+    # Construct once so validation is cached and the file is in the OS
+    # cache for every timed run.
+    LodgingLog().close()
+
+    print(f"{'workers':>8} {'min_ms':>10} {'median_ms':>10} {'max_ms':>10}")
+    for worker_count in workers:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            log = LodgingLog(load_workers=worker_count)
+            times.append((time.perf_counter() - start) * 1000)
+            log.close()
+        print(
+            f"{worker_count:>8} {min(times):>10.2f} "
+            f"{statistics.median(times):>10.2f} {max(times):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark LodgingLog construction."
+    )
+    parser.add_argument('--repeat',
+        help="number of constructions to time for each worker count",
+        type=int,
+        default=10,
+    )
+    parser.add_argument('--workers',
+        help="worker counts to compare",
+        type=int,
+        nargs='+',
+    )
+    args = parser.parse_args()
+    benchmark_lodging_log_init(args.repeat, args.workers)
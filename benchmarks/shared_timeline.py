@@ -0,0 +1,76 @@
+"""
+Benchmarks worker processes that each rebuild the daily timeline
+against workers that attach to one published copy.
+
+Run from the repository root:
+
+    python -m benchmarks.shared_timeline --workers 4
+"""
+
+# Standard library imports
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party imports
+import argparse
+
+# First-party imports
+from modules.lodging_log import LodgingLog
+from modules.shared_timeline import SharedTimeline
+
+def rebuild_total_distance(_):
+    """Builds the timeline in this process and sums its distances."""
+    with LodgingLog() as log:
+        return log.daily_timeline()['distance_mi'].sum()
+
+
+def attached_total_distance(name):
+    """Attaches to a published timeline and sums its distances."""
+    with SharedTimeline.attach(name=name) as timeline:
+        return float(timeline.records['distance_mi'].sum())
+
+
+def benchmark_shared_timeline(workers=4, tasks=None):
+    """Prints the time for a pool of workers to run each kind of task."""
+    if tasks is None:
+        tasks = workers
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(rebuild_total_distance, range(tasks)))
+    rebuild = time.perf_counter() - start
+
+    # Publish before starting the workers, so they share this process's
+    # shared memory tracker.
+    start = time.perf_counter()
+    with LodgingLog() as log:
+        published = log.publish_timeline()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(
+                attached_total_distance, [published.name] * tasks
+            ))
+    finally:
+        published.close()
+        published.unlink()
+    attach = time.perf_counter() - start
+
+    print(f"{tasks} tasks on {workers} workers, including pool startup")
+    print(f"{'rebuild in each task':<24} {rebuild * 1000:>10.1f} ms")
+    print(f"{'publish and attach':<24} {attach * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark sharing the daily timeline across processes."
+    )
+    parser.add_argument('--workers',
+        help="number of worker processes",
+        type=int,
+        default=4,
+    )
+    parser.add_argument('--tasks',
+        help="number of tasks to run (defaults to the number of workers)",
+        type=int,
+    )
+    args = parser.parse_args()
+    benchmark_shared_timeline(args.workers, args.tasks)
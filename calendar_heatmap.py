@@ -0,0 +1,394 @@
+"""
+Generates an SVG calendar heatmap with a cell for every morning, colored
+by whether it was at home or away on business, personal travel, or in
+transit.
+"""
+
+# Standard imports
+from datetime import date
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import numpy as np
+import pandas as pd
+from lxml import etree as xml
+
+# First-party imports
+from modules.lodging_log import LodgingLog
+from modules.timeline import timeline_span
+
+# Day states, in the order of the legend. Mornings outside the log's
+# history have no state and are not drawn.
+NO_DATA = -1
+STATES = {
+    0: {'label': "Home", 'class': "night-home"},
+    1: {'label': "Business", 'class': "night-away-business"},
+    2: {'label': "Personal", 'class': "night-away-personal"},
+    3: {'label': "Transit", 'class': "night-transit"},
+}
+TRANSIT_TYPES = ['Flight']
+
+def day_states(log, first_day, last_day):
+    """
+    Returns an array with the state of each morning from first_day
+    through last_day: a key of STATES, or NO_DATA for mornings before
+    the log's history begins or after today.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        first_day (date): The first morning.
+        last_day (date): The last morning.
+    """
+    first_day, last_day = pd.Timestamp(first_day), pd.Timestamp(last_day)
+    states = np.full((last_day - first_day).days + 1, NO_DATA, dtype='int8')
+    history_start, history_end = timeline_span(log)
+    start = max((history_start - first_day).days, 0)
+    end = min((history_end - first_day).days + 1, len(states))
+    states[start:end] = 0
+
+    mornings = log.mornings().loc[first_day:last_day]
+    positions = (mornings.index - first_day).days.to_numpy()
+    purposes = mornings['purpose'].to_numpy()
+    states[positions[purposes == 'Business']] = 1
+    states[positions[purposes == 'Personal']] = 2
+    states[positions[mornings['type'].isin(TRANSIT_TYPES).to_numpy()]] = 3
+    return states
+
+
+def merged_runs(states, first_day):
+    """
+    Returns the rectangles that draw a day-state array on a calendar
+    grid with a column for each week (Sunday through Saturday) of each
+    year.
+
+    Consecutive days in a week with the same state are merged into one
+    rectangle, and so are consecutive full weeks with the same state,
+    so long runs at home or away take a single rectangle.
+
+    Args:
+        states (ndarray): The state of each morning, from day_states().
+        first_day (date): The morning of the first state; must be 1
+            January.
+
+    Returns:
+        DataFrame: A row for each rectangle, with its year, its first
+        week column and weekday row in that year, its width in weeks and
+        height in days, and its state.
+    """
+    days = pd.date_range(first_day, periods=len(states), freq='D')
+    years = days.year.to_numpy()
+    # Weekday row (Sunday = 0) and week column within each year.
+    rows = ((days.dayofweek + 1) % 7).to_numpy()
+    jan_1_rows = ((pd.to_datetime({'year': years, 'month': 1, 'day': 1})
+        .dt.dayofweek + 1) % 7).to_numpy()
+    cols = (days.dayofyear.to_numpy() - 1 + jan_1_rows) // 7
+    # Number the columns across years, leaving a gap between years so
+    # runs never merge across them.
+    global_cols = (years - years[0]) * 60 + cols
+
+    # Runs of one state within a week column.
+    breaks = np.ones(len(states), dtype=bool)
+    breaks[1:] = (states[1:] != states[:-1]) \
+        | (global_cols[1:] != global_cols[:-1])
+    starts = np.flatnonzero(breaks)
+    heights = np.diff(np.append(starts, len(states)))
+    runs = pd.DataFrame({
+        'year': years[starts],
+        'col': cols[starts],
+        'global_col': global_cols[starts],
+        'row': rows[starts],
+        'width': 1,
+        'height': heights,
+        'state': states[starts],
+    })
+    runs = runs[runs['state'] != NO_DATA].reset_index(drop=True)
+
+    # Merge runs of full weeks with the same state in adjacent columns.
+    full = (runs['height'] == 7).to_numpy()
+    same_state = (runs['state'] == runs['state'].shift()).to_numpy()
+    adjacent = (runs['global_col'].diff() == 1).to_numpy()
+    joined = full & np.roll(full, 1) & same_state & adjacent
+    joined[:1] = False
+    groups = np.cumsum(~joined)
+    return runs.groupby(groups).agg(
+        year=('year', 'first'),
+        col=('col', 'first'),
+        row=('row', 'first'),
+        width=('width', 'sum'),
+        height=('height', 'first'),
+        state=('state', 'first'),
+    ).reset_index(drop=True)
+
+
+class CalendarHeatmap:
+    """Creates an SVG calendar heatmap from a day-state array."""
+
+    _NSMAP = {None: "http://www.w3.org/2000/svg"}
+    _PARAMS = {
+        'cell': {
+            'size': 12, # px
+            'gap': 2, # px
+            'radius': 2, # px
+        },
+        'footer': {
+            'height': 40, # px
+            'padding_bottom': 16 # px
+        },
+        'legend': {
+            'height': 30, # px
+            'item_width': 100, # px
+            'text_offset': [16, 10], # [x, y] px
+        },
+        'page': {
+            'margin': 40 # px
+        },
+        'title': {
+            'height': 85, # px
+            'text_offset': 32, # px
+            'subtext_offset': 66 # px
+        },
+        'year': {
+            'label_width': 50, # px
+            'month_height': 16, # px
+            'margin': 14, # px
+        },
+    }
+    _STYLES_PATH = "styles/svg_chart.svg.css"
+    _WEEKS = 54 # Week columns in the longest year.
+
+    def __init__(self, start_year=None, thru_year=None, log=None):
+        """
+        Initializes the CalendarHeatmap.
+
+        Args:
+            start_year (int): The first year to include. Defaults to the
+                first year of the log's history.
+            thru_year (int): The last year to include. Defaults to the
+                current year.
+            log (LodgingLog): An open lodging log to read. Defaults to
+                opening the configured log.
+        """
+        if log is None:
+            log = LodgingLog()
+        if start_year is None:
+            start_year = timeline_span(log)[0].year
+        if thru_year is None:
+            thru_year = date.today().year
+        if thru_year < start_year:
+            raise ValueError("thru_year must not be before start_year.")
+        self.start_year = start_year
+        self.thru_year = thru_year
+
+        first_day = date(start_year, 1, 1)
+        self.states = day_states(log, first_day, date(thru_year, 12, 31))
+        self.rects = merged_runs(self.states, first_day)
+
+        params = self._PARAMS
+        self._year_height = (params['year']['month_height']
+            + 7 * params['cell']['size'] + params['year']['margin'])
+        self._grid_left = params['page']['margin'] \
+            + params['year']['label_width']
+        self._grid_top = (params['page']['margin'] + params['title']['height']
+            + params['legend']['height'])
+        self.width = (self._grid_left + self._WEEKS * params['cell']['size']
+            + params['page']['margin'])
+        self.height = (self._grid_top
+            + (thru_year - start_year + 1) * self._year_height
+            + params['footer']['height'] + params['page']['margin'])
+
+        self._root = xml.Element(
+            "svg", xmlns=self._NSMAP[None],
+            width=str(self.width), height=str(self.height)
+        )
+        self._g = {} # Holds SVG groups for chart elements.
+
+    def export(self, output_path):
+        """Generates the heatmap and writes it to an SVG file."""
+        tree = self._draw()
+        tree.write(output_path, encoding='utf-8',
+            xml_declaration=True, pretty_print=True)
+        print(f"Wrote SVG to {output_path}")
+
+    def tostring(self):
+        """Generates the heatmap and returns it as UTF-8 bytes."""
+        return xml.tostring(self._draw(), encoding='UTF-8',
+            xml_declaration=True, pretty_print=True)
+
+    def _draw(self):
+        """
+        Draws the heatmap and returns its ElementTree. Each
+        CalendarHeatmap can only be drawn once.
+        """
+        self._import_styles()
+        for group in ['page-background', 'title', 'legend', 'years', 'days',
+            'footer']:
+            self._g[group] = xml.SubElement(self._root, "g", id=group)
+
+        self._draw_page_background()
+        self._draw_title()
+        self._draw_legend()
+        self._draw_years()
+        self._draw_days()
+        self._draw_footer()
+        return xml.ElementTree(self._root)
+
+    def _draw_days(self):
+        """Draws a rectangle for each run of days with the same state."""
+        cell = self._PARAMS['cell']
+        rects = self.rects
+        x = (self._grid_left + rects['col'] * cell['size']
+            + cell['gap'] / 2)
+        y = (self._year_top(rects['year'])
+            + self._PARAMS['year']['month_height']
+            + rects['row'] * cell['size'] + cell['gap'] / 2)
+        widths = rects['width'] * cell['size'] - cell['gap']
+        heights = rects['height'] * cell['size'] - cell['gap']
+        classes = rects['state'].map(
+            {state: value['class'] for state, value in STATES.items()}
+        )
+        for rect in zip(x, y, widths, heights, classes):
+            xml.SubElement(self._g['days'], "rect",
+                x=f"{rect[0]:g}", y=f"{rect[1]:g}",
+                width=f"{rect[2]:g}", height=f"{rect[3]:g}",
+                rx=str(cell['radius']), **{'class': rect[4]},
+            )
+
+    def _draw_footer(self):
+        """Draws the page footer."""
+        y = self.height - self._PARAMS['footer']['padding_bottom']
+        credit = xml.SubElement(self._g['footer'], "text",
+            x=str(self._PARAMS['page']['margin']), y=str(y),
+            **{'class': "footer credit"},
+        )
+        credit.text = "github.com/bogardpd/hotel-data-utils"
+        generated = xml.SubElement(self._g['footer'], "text",
+            x=str(self.width - self._PARAMS['page']['margin']), y=str(y),
+            **{'class': "footer date-generated"},
+        )
+        generated.text = f"Generated on {self._format_date(date.today())}"
+
+    def _draw_legend(self):
+        """Draws a swatch and label for each day state."""
+        params = self._PARAMS
+        size = params['cell']['size']
+        top = params['page']['margin'] + params['title']['height']
+        for i, state in enumerate(STATES.values()):
+            x = self._grid_left + i * params['legend']['item_width']
+            xml.SubElement(self._g['legend'], "rect",
+                x=str(x), y=str(top), width=str(size), height=str(size),
+                rx=str(params['cell']['radius']),
+                **{'class': state['class']},
+            )
+            label = xml.SubElement(self._g['legend'], "text",
+                x=str(x + params['legend']['text_offset'][0]),
+                y=str(top + params['legend']['text_offset'][1]),
+                **{'class': "legend-label"},
+            )
+            label.text = state['label']
+
+    def _draw_page_background(self):
+        """Draws the page background color."""
+        xml.SubElement(self._g['page-background'], "rect",
+            x="0", y="0", width=str(self.width), height=str(self.height),
+            **{'class': "page-background"},
+        )
+
+    def _draw_title(self):
+        """Draws a title and subtitle."""
+        params = self._PARAMS['title']
+        top = self._PARAMS['page']['margin']
+        title = xml.SubElement(self._g['title'], "text",
+            x=str(self.width / 2), y=str(top + params['text_offset']),
+            **{'class': "chart-title"},
+        )
+        title.text = "Nights Traveling and Home by Day"
+        subtitle = xml.SubElement(self._g['title'], "text",
+            x=str(self.width / 2), y=str(top + params['subtext_offset']),
+            **{'class': "chart-subtitle"},
+        )
+        years = str(self.start_year) if self.start_year == self.thru_year \
+            else f"{self.start_year} to {self.thru_year}"
+        subtitle.text = f"Mornings from {years}".upper()
+
+    def _draw_years(self):
+        """Draws each year's label and month labels."""
+        size = self._PARAMS['cell']['size']
+        month_height = self._PARAMS['year']['month_height']
+        for year in range(self.start_year, self.thru_year + 1):
+            top = self._year_top(year)
+            label = xml.SubElement(self._g['years'], "text",
+                x=str(self._PARAMS['page']['margin']),
+                y=str(top + month_height + size),
+                **{'class': "year-label"},
+            )
+            label.text = str(year)
+            jan_1_row = (date(year, 1, 1).weekday() + 1) % 7
+            for month in range(1, 13):
+                first = date(year, month, 1)
+                col = (first.timetuple().tm_yday - 1 + jan_1_row) // 7
+                month_label = xml.SubElement(self._g['years'], "text",
+                    x=str(self._grid_left + col * size),
+                    y=str(top + month_height - 4),
+                    **{'class': "month-label"},
+                )
+                month_label.text = f"{first:%b}"
+
+    def _format_date(self, date_obj):
+        """Formats a date object as a string, such as 1 Jan 2024."""
+        return "{d.day} {d:%b} {d.year}".format(d=date_obj)
+
+    def _import_styles(self):
+        """Imports styles from an external file."""
+        style_tag = xml.SubElement(self._root, "style")
+        with open(self._STYLES_PATH, encoding='utf-8') as f:
+            style_text = "\n"
+            for line in f.readlines():
+                style_text += f"    {line}"
+            style_text += "\n  "
+            style_tag.text = style_text
+
+    def _year_top(self, year):
+        """Returns the top y coordinate of a year's row of the grid."""
+        return self._grid_top + (year - self.start_year) * self._year_height
+
+
+def calendar_heatmap(output_svg, start_year=None, thru_year=None, log=None):
+    """
+    Generates a calendar heatmap SVG.
+
+    Args:
+        output_svg (Path): The SVG file to write.
+        start_year (int): The first year to include. Defaults to the
+            first year of the log's history.
+        thru_year (int): The last year to include. Defaults to the
+            current year.
+        log (LodgingLog): An open lodging log to read. Defaults to
+            opening the configured log.
+    """
+    CalendarHeatmap(start_year, thru_year, log=log).export(output_svg)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a calendar heatmap of nights away and home."
+    )
+    parser.add_argument('--output_svg',
+        help="Path to save the output SVG file.",
+        type=Path,
+        required=True,
+    )
+    parser.add_argument('--start_year',
+        help="The first year to include in the chart.",
+        type=int,
+    )
+    parser.add_argument('--thru_year',
+        help="The last year to include in the chart.",
+        type=int,
+    )
+    args = parser.parse_args()
+
+    calendar_heatmap(
+        args.output_svg,
+        start_year=args.start_year,
+        thru_year=args.thru_year,
+    )
@@ -1,28 +1,32 @@
 """
 A script to generate charts showing distance from home for each day of
 a year. Can also include prior years and average distance across a
-range of years.
+range of years, or export the distance data without charting it.
 """
 
 # Standard library imports
 import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import date, datetime
 
 # Third-party imports
 import argparse
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
+import numpy as np
 import pandas as pd
-from matplotlib.gridspec import GridSpec
-from pyproj import Geod
 
 # First-party imports
+from modules.distance import DISTANCE_MODELS, KM_PER_MILE
 from modules.lodging_log import LodgingLog
 
-KM_PER_MILE = 1.6093
 DECIMAL_PLACES = 2 # Number of decimal places to round distances to.
+DECIMATE_PERIODS = ['week', 'month'] # Buckets for decimating days.
+DECIMATE_AGGS = ['mean', 'max'] # Aggregates of the days in a bucket.
+DATA_FORMATS = ['.csv', '.parquet', '.arrow'] # Distance data file types.
+YEARS_PER_PAGE = 12 # Default most years on each multi year chart image.
+MIN_GRID_ROWS = 12 # Fewest year rows in a multi year chart grid.
+ROW_HEIGHT = 0.5 # Height in inches of each year row.
 
 COLORS = {
     'line': "#ee7733",
@@ -34,11 +38,18 @@ COLORS = {
 
 def distance_from_home_by_day(
     single_multi, years,
-    output_img=None, output_csv=None, labels=None, earliest_prior_year=None
+    output_img=None, output_csv=None, labels=None, earliest_prior_year=None,
+    log=None, distance_model='geodesic',
+    output_data=None, decimate_period=None, agg='mean',
+    years_per_page=YEARS_PER_PAGE, workers=None,
 ):
     """
     Generate a distance from home by day chart for a single year or
-    multiple years.
+    multiple years. The log argument is an open LodgingLog to read;
+    if omitted, the configured log is opened. The distance_model is
+    `geodesic` or `haversine` (faster, within about 0.6%). For multiple
+    years, output_data, decimate_period, agg, years_per_page, and workers
+    are passed to YearsAndAverageDistanceChart.
     """
     if single_multi == 'single':
         SingleYearDistanceChart(
@@ -47,23 +58,205 @@ def distance_from_home_by_day(
             output_csv,
             labels,
             earliest_prior_year,
+            log=log,
+            distance_model=distance_model,
         ).plot()
     elif single_multi == 'multi':
-        YearsAndAverageDistanceChart(*years, output_img).plot()
+        YearsAndAverageDistanceChart(*years, output_img, log=log,
+            distance_model=distance_model,
+            output_data=output_data,
+            decimate_period=decimate_period,
+            agg=agg,
+            years_per_page=years_per_page,
+            workers=workers,
+        ).plot()
+
+def year_distances(log, year, distance_model='geodesic'):
+    """
+    Returns a DataFrame with the morning and distance_mi of each day of
+    a year. distance_mi is 0 for mornings at home, and NA for mornings
+    with no lodging data.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        year (int): The year.
+        distance_model (str): `geodesic` or `haversine`. See
+            modules.distance.distance_miles().
+    """
+    df = log.daily_timeline(
+        start_morning=date(year, 1, 1),
+        thru_morning=date(year, 12, 31),
+        distance_model=distance_model,
+    ).reset_index()
+    _check_homes(df)
+    return pd.DataFrame({
+        'morning': df['morning'],
+        'distance_mi': df['distance_mi'].round(DECIMAL_PLACES),
+    })
+
+def decimate(distances, period, agg='mean'):
+    """
+    Returns daily distances aggregated into weekly or monthly buckets,
+    each labeled with its first morning.
+
+    Weeks are seven day periods counted from 1 January, with the extra
+    day or two at the end of each year added to the last week, so that
+    no bucket spans two years and every year has 52 weeks.
+
+    Args:
+        distances (DataFrame): Columns morning and distance_mi, as
+            returned by year_distances().
+        period (str): `week` or `month`.
+        agg (str): `mean` or `max` of the distances in each bucket.
+            Days with no lodging data are skipped.
+
+    Returns:
+        DataFrame: Columns morning and distance_mi.
+    """
+    if period not in DECIMATE_PERIODS:
+        raise ValueError(f"Invalid decimation period: {period}")
+    if agg not in DECIMATE_AGGS:
+        raise ValueError(f"Invalid decimation aggregate: {agg}")
+    mornings = pd.to_datetime(distances['morning'])
+    days_into_year = (mornings.dt.dayofyear - 1).to_numpy()
+    year_starts = mornings - pd.to_timedelta(days_into_year, unit='D')
+    if period == 'week':
+        weeks = np.minimum(days_into_year // 7, 51)
+        buckets = year_starts + pd.to_timedelta(weeks * 7, unit='D')
+    else:
+        buckets = mornings - pd.to_timedelta(mornings.dt.day - 1, unit='D')
+    decimated = distances['distance_mi'].astype('float64') \
+        .groupby(buckets.to_numpy()).agg(agg).round(DECIMAL_PLACES)
+    return pd.DataFrame({
+        'morning': decimated.index,
+        'distance_mi': decimated.to_numpy(),
+    })
+
+def export_distances(
+    output_data, start_year, thru_year,
+    decimate_period=None, agg='mean', log=None, distance_model='geodesic',
+):
+    """
+    Writes the distance from home for each day (or each week or month)
+    of a range of years to a CSV, Parquet, or Arrow file, without
+    charting it.
+
+    Years are read and written one at a time, so the whole range is
+    never held in memory, and matplotlib is not imported.
+
+    Args:
+        output_data (Path): The file to write. Its extension (`.csv`,
+            `.parquet`, or `.arrow`) sets the format.
+        start_year (int): The first year to write.
+        thru_year (int): The last year to write.
+        decimate_period (str): `week` or `month` to aggregate days into
+            buckets (see decimate()), or None to write every day.
+        agg (str): `mean` or `max` of the distances in each bucket.
+        log (LodgingLog): An open lodging log to read. Defaults to
+            opening the configured log.
+        distance_model (str): `geodesic` or `haversine`. See
+            modules.distance.distance_miles().
+    """
+    start_year, thru_year = int(start_year), int(thru_year)
+    if start_year > thru_year:
+        raise ValueError(
+            f"start_year ({start_year}) must not be after thru_year "
+            f"({thru_year})."
+        )
+
+    def chunks(log):
+        for year in range(start_year, thru_year + 1):
+            distances = year_distances(log, year, distance_model)
+            if decimate_period is not None:
+                distances = decimate(distances, decimate_period, agg)
+            yield distances
+
+    if log is None:
+        with LodgingLog() as log:
+            write_distance_data(chunks(log), output_data)
+    else:
+        write_distance_data(chunks(log), output_data)
+    print(f"Saved distance data to {output_data}.")
+
+def write_distance_data(chunks, output_data):
+    """
+    Writes DataFrames of morning and distance_mi columns to one CSV,
+    Parquet, or Arrow file, appending each as it is produced.
+
+    Args:
+        chunks (iterable): The DataFrames, in date order.
+        output_data (Path): The file to write. Its extension (`.csv`,
+            `.parquet`, or `.arrow`) sets the format.
+    """
+    output_data = Path(output_data)
+    suffix = output_data.suffix.lower()
+    if suffix not in DATA_FORMATS:
+        raise ValueError(
+            f"Invalid distance data file type: {output_data.suffix} "
+            f"(use {', '.join(DATA_FORMATS)})"
+        )
+
+    if suffix == '.csv':
+        with open(output_data, 'w', newline='', encoding='UTF-8') as f:
+            f.write("morning,distance_mi\n")
+            for chunk in chunks:
+                chunk.to_csv(f, header=False, index=False,
+                    date_format='%Y-%m-%d',
+                )
+        return
+
+    # Imported here so pyarrow is only needed for columnar files.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ('morning', pa.date32()),
+        ('distance_mi', pa.float64()),
+    ])
+    if suffix == '.parquet':
+        writer = pq.ParquetWriter(output_data, schema)
+    else:
+        writer = pa.ipc.new_file(output_data, schema)
+    with writer:
+        for chunk in chunks:
+            writer.write_table(pa.table({
+                'morning': pd.to_datetime(chunk['morning']).dt.date,
+                'distance_mi': chunk['distance_mi'].astype('float64'),
+            }, schema=schema))
+
+def _check_homes(timeline):
+    """Raises a ValueError if any morning away has no home."""
+    no_home = (timeline['status'] == 'away') & timeline['home_fid'].isna()
+    if no_home.any():
+        morning = timeline.loc[no_home, 'morning'].iloc[0]
+        raise ValueError(f"No home location found for {morning}.")
 
 
 class DistanceByDayChart():
     """Parent class for distance by day charts."""
 
-    def __init__(self):
-        """Initialize the chart."""
-        self.log = LodgingLog()
-        self.home_locations = self.log.home_locations()
+    def __init__(self, log=None, distance_model='geodesic'):
+        """
+        Initialize the chart.
 
-    def apply_styles(self, ax, ax_data, year, include_xaxis=False):
+        Args:
+            log (LodgingLog): An open lodging log to read. Defaults to
+                opening the configured log.
+            distance_model (str): `geodesic` or `haversine`. See
+                modules.distance.distance_miles().
+        """
+        self.log = LodgingLog() if log is None else log
+        self.distance_model = distance_model
+
+    @staticmethod
+    def apply_styles(ax, ax_data, year, include_xaxis=False):
         """
         Apply styles to the given axis for the distance by day chart.
         """
+        # Imported here so exporting distance data does not need
+        # matplotlib.
+        import matplotlib.dates as mdates
+        import matplotlib.ticker as ticker
+
         ax.fill_between(ax_data['dates'], ax_data['distances'], 0,
             facecolor=COLORS['face'], alpha=0.1)
         ax.xaxis.set_major_locator(mdates.MonthLocator())
@@ -86,44 +279,15 @@ class DistanceByDayChart():
         Returns a DataFrame of miles from home for each day in the
         specified inclusive range of years.
         """
-        def morning_distance(morning, mornings_lodging):
-            """Calculate miles from home for a given morning."""
-            morning = pd.Timestamp(morning)
-            if morning in mornings_lodging.index:
-                # Morning is away from home.
-                home_lat_lon = self.home_lat_lon(morning)
-                lodging_lat_lon = mornings_lodging.loc[
-                    morning, ['lat', 'lon']
-                ].values.tolist()
-                geod = Geod(ellps='WGS84')
-                return geod.inv(
-                    home_lat_lon[1], home_lat_lon[0],
-                    lodging_lat_lon[1], lodging_lat_lon[0],
-                )[2] / (1000 * KM_PER_MILE) # Convert meters to miles
-            else:
-                # Morning is at home.
-                return 0.0
-
-        # Get all lodging in the specified range of years.
-        lodging_mornings = self.log.mornings_by(
-            by='city',
+        # Get the timeline of every morning in the range, which has the
+        # distance from home for each morning away.
+        df = self.log.daily_timeline(
             start_morning=date(years_inclusive[0], 1, 1),
             thru_morning=date(years_inclusive[1], 12, 31),
-            exclude_transit=False,
-        )
-
-        # Create a DataFrame with all mornings in the range.
-        df = pd.DataFrame()
-        df['morning'] = pd.date_range(
-            start=date(years_inclusive[0], 1, 1),
-            end=date(years_inclusive[1], 12, 31),
-            freq='D',
-        )
-
-        # Calculate distance from home for each morning.
-        df['distance_mi'] = df['morning'].apply(
-            lambda d: morning_distance(d, lodging_mornings)
-        ).round(DECIMAL_PLACES)
+            distance_model=self.distance_model,
+        ).reset_index()
+        _check_homes(df)
+        df['distance_mi'] = df['distance_mi'].round(DECIMAL_PLACES)
 
         # Split out years, months, and days.
         df['year'] = df['morning'].dt.year
@@ -139,19 +303,6 @@ class DistanceByDayChart():
         )
         return df
 
-    def home_lat_lon(self, morning):
-        """
-        Returns the latitude and longitude of the home location for a
-        given morning.
-        """
-        morning = pd.Timestamp(morning)
-        homes = self.home_locations[
-            self.home_locations['move_in_date'] < morning
-        ].sort_values(by='move_in_date', ascending=False).head(1)
-        if homes.empty:
-            raise ValueError(f"No home location found for {morning}.")
-        return [homes.iloc[0]['lat'], homes.iloc[0]['lon']]
-
     def normalize_year(self, year_series, year):
         """Returns a normalized year for plotting purposes."""
         ds = year_series.copy()
@@ -165,6 +316,17 @@ class DistanceByDayChart():
         )
         return ds
 
+    def year_series(self, year):
+        """
+        Returns a DataFrame with the morning and distance_mi of each day
+        of a year in the distance matrix.
+        """
+        output_data = self.normalize_year(
+            self.dist_matrix[year], year
+        ).reset_index()
+        output_data.columns = ['morning', 'distance_mi']
+        return output_data
+
 
 class SingleYearDistanceChart(DistanceByDayChart):
     """A chart showing distance by day for a single year."""
@@ -172,9 +334,10 @@ class SingleYearDistanceChart(DistanceByDayChart):
     def __init__(
             self, year,
             output_img=None, output_csv=None,
-            labels=None, earliest_prior_year=None,
+            labels=None, earliest_prior_year=None, log=None,
+            distance_model='geodesic',
         ):
-        super().__init__()
+        super().__init__(log, distance_model)
 
         self.year = int(year)
         self.output_img = output_img
@@ -198,6 +361,13 @@ class SingleYearDistanceChart(DistanceByDayChart):
         self.dist_matrix = self.date_year_distance_matrix(years)
         self.labels = labels
 
+    def distance_series(self):
+        """
+        Returns a DataFrame with the morning and distance_mi of each day
+        of the year.
+        """
+        return self.year_series(self.year)
+
     def plot(self):
         """
         Plot the distance by day chart.
@@ -205,6 +375,11 @@ class SingleYearDistanceChart(DistanceByDayChart):
         Note: if self.year is not a leap year, February 29 will not be
         included in the chart for any prior years.
         """
+        # Imported here so exporting distance data does not need
+        # matplotlib.
+        import matplotlib.pyplot as plt
+        import matplotlib.ticker as ticker
+
         ax = plt.subplots(1,1,figsize=(9,3),dpi=96)[1]
 
         # Plot prior years (if any):
@@ -276,9 +451,7 @@ class SingleYearDistanceChart(DistanceByDayChart):
 
         # Export data to CSV if requested.
         if self.output_csv is not None:
-            output_data = current_year_series.copy()
-            output_data = output_data.reset_index()
-            output_data.columns = ['morning', 'distance_mi']
+            output_data = self.distance_series()
             output_data.to_csv(self.output_csv, header=True, index=False)
             print(f"Saved distance data to {self.output_csv}.")
 
@@ -292,110 +465,304 @@ class SingleYearDistanceChart(DistanceByDayChart):
 class YearsAndAverageDistanceChart(DistanceByDayChart):
     """A chart for each year and a chart averaging all years."""
 
-    def __init__(self, start_year, thru_year, output=None):
-        super().__init__()
+    def __init__(self, start_year, thru_year, output=None, log=None,
+        distance_model='geodesic', output_data=None, decimate_period=None,
+        agg='mean', years_per_page=YEARS_PER_PAGE, workers=None,
+    ):
+        """
+        Initialize the chart.
+
+        Args:
+            start_year (int): The first year to chart.
+            thru_year (int): The last year to chart.
+            output (Path): The image file to save. Defaults to showing
+                the chart.
+            log (LodgingLog): An open lodging log to read. Defaults to
+                opening the configured log.
+            distance_model (str): `geodesic` or `haversine`.
+            output_data (Path): A CSV, Parquet, or Arrow file to write
+                the distance data of every year to.
+            decimate_period (str): `week` or `month` to chart and write
+                the distances aggregated into buckets (see decimate()),
+                or None for every day.
+            agg (str): `mean` or `max` of the distances in each bucket.
+            years_per_page (int): The most years to chart on one image,
+                or None for all years. Longer ranges are split into
+                pages, saved as separate images named for their years.
+            workers (int): The number of processes to render pages in.
+                Defaults to the number of CPUs; 1 renders them in this
+                process.
+        """
+        super().__init__(log, distance_model)
         self.start_year = int(start_year)
         self.thru_year = int(thru_year)
+        if years_per_page is not None and years_per_page < 1:
+            raise ValueError(
+                f"years_per_page ({years_per_page}) must be at least 1."
+            )
+        self.years_per_page = years_per_page
+        self.workers = workers
         self.output_img = output
+        self.output_data = output_data
+        if decimate_period is not None:
+            if decimate_period not in DECIMATE_PERIODS:
+                raise ValueError(
+                    f"Invalid decimation period: {decimate_period}"
+                )
+            if agg not in DECIMATE_AGGS:
+                raise ValueError(f"Invalid decimation aggregate: {agg}")
+        self.decimate_period = decimate_period
+        self.agg = agg
 
         self.dist_matrix = self.date_year_distance_matrix(
             [self.start_year, self.thru_year]
         )
 
-    def plot(self):
+    def plot_series(self, ds):
         """
-        Plot a distance by day chart for each year and a chart
-        averaging all years.
+        Returns the dates and distances to plot for a date indexed
+        series, decimated if a decimation period is set.
         """
+        if self.decimate_period is None:
+            return ds.index, ds.values
+        decimated = decimate(
+            pd.DataFrame({'morning': ds.index, 'distance_mi': ds.values}),
+            self.decimate_period,
+            self.agg,
+        )
+        return decimated['morning'].dt.date, decimated['distance_mi'].values
 
+    def page_data(self):
+        """
+        Returns the plotted data shared by every page of the chart: the
+        dates and distances of each year, and the title, dates, and
+        distances of the average of all years.
+        """
         # Create a placeholder year to use for storing days of the year
         # when calculating mean miles for each day. Use a leap year so
         # all days are included.
         mean_data_year = 2020
 
-        # Set plot preferences.
-        year_title_options = {
-            'y': 0.8,
-            'verticalalignment': 'top',
-            'alpha': 0.6,
-            'fontsize': 10,
-        }
-
-        # Initialize the figure and grid.
-        fig = plt.figure(dpi=96,figsize=(9,6))
-        gs = GridSpec(12, 2, width_ratios=[1,3])
-
-        # Create plots for each year.
-        year_axs = {}
-        for index, year in enumerate(range(self.start_year, self.thru_year+1)):
+        years = {}
+        for year in range(self.start_year, self.thru_year + 1):
             year_ds = self.normalize_year(self.dist_matrix[year], year)
-            data = {
-                'title': str(year),
-                'dates': year_ds.index,
-                'distances': year_ds.values,
-            }
-            year_axs[index] = fig.add_subplot(gs[index, 0])
-            year_axs[index].plot(data['dates'], data['distances'])
-            is_bottom = index == (self.thru_year - self.start_year)
-            self.apply_styles(
-                year_axs[index],
-                data,
-                year,
-                include_xaxis=is_bottom
-            )
-            for spine in year_axs[index].spines.values():
-                spine.set_visible(False)
-            year_axs[index].get_yaxis().set_visible(False)
-
-            year_axs[index].set_xlim([date(year,1,1),date(year,12,31)])
-            year_axs[index].set_ylim([-1000,12000])
-            year_axs[index].set_yticks([0,6000,12000])
-            year_axs[index].set_title(data['title'], **year_title_options)
-
-            # Hide leftmost gridline for all years.
-            year_axs[index].get_xgridlines()[0].set_visible(False)
-
-            # Add month labels to the bottom year.
-            if is_bottom:
-                month_letters = list("JFMAMJJASOND")
-                mid_months = [
-                    date(year, m, 15) for m in range(1, 13)
-                ]
-                year_axs[index].set_xticks(
-                    mid_months, month_letters, minor=True
-                )
+            years[year] = self.plot_series(year_ds)
 
-        # Plot mean distance data.
-        self.dist_matrix['mean'] = (
-            self.dist_matrix.mean(axis=1).round(DECIMAL_PLACES)
+        mean_ds = self.normalize_year(
+            self.dist_matrix.mean(axis=1).round(DECIMAL_PLACES),
+            mean_data_year,
         )
-        mean_ds = self.normalize_year(self.dist_matrix['mean'], mean_data_year)
-        mean_dist_data = {
-            'title': (f"Average Distance From Home by Day of Year "
-                f"({self.start_year}–{self.thru_year})"),
-            'dates': mean_ds.index,
-            'distances': mean_ds.values,
+        dates, distances = self.plot_series(mean_ds)
+        return {
+            'years': years,
+            'mean': {
+                'title': (f"Average Distance From Home by Day of Year "
+                    f"({self.start_year}–{self.thru_year})"),
+                'year': mean_data_year,
+                'dates': dates,
+                'distances': distances,
+            },
         }
-        mean_ax = fig.add_subplot(gs[:, 1])
-        mean_ax.plot(mean_dist_data['dates'], mean_dist_data['distances'])
-        self.apply_styles(mean_ax, data, mean_data_year, include_xaxis=True)
-        mean_ax.set_title(mean_dist_data['title'])
 
-        # Configure y-axes for mean distance plot.
-        y_max_miles = 3000
-        y_max_km = y_max_miles * KM_PER_MILE
-        mean_ax.set_ylim([0,y_max_miles])
-        mean_ax.set_ylabel("Distance (miles)")
-        mean_ax_km = mean_ax.twinx()
-        mean_ax_km.set_ylim([0,y_max_km])
-        mean_ax_km.set_ylabel("Distance (km)")
+    def pages(self):
+        """
+        Returns the years and output image of each page. When there is
+        more than one page, each image is named for its years.
+        """
+        years = list(range(self.start_year, self.thru_year + 1))
+        per_page = self.years_per_page or len(years)
+        page_years = [
+            years[i:i + per_page] for i in range(0, len(years), per_page)
+        ]
+        if self.output_img is None or len(page_years) == 1:
+            return [(page, self.output_img) for page in page_years]
+        output_img = Path(self.output_img)
+        return [
+            (page, output_img.with_name(
+                f"{output_img.stem}_{page[0]}"
+                + (f"_{page[-1]}" if page[-1] != page[0] else "")
+                + output_img.suffix
+            ))
+            for page in page_years
+        ]
+
+    def plot(self):
+        """
+        Plot a distance by day chart for each year and a chart
+        averaging all years, on as many pages as years_per_page needs.
+
+        When saving more than one page, the pages are rendered at once
+        in worker processes, which are each sent the plotted data once.
+        """
+        # Imported here so exporting distance data does not need
+        # matplotlib.
+        import matplotlib.pyplot as plt
+
+        # Export distance data if requested.
+        if self.output_data is not None:
+            write_distance_data((
+                self.year_chunk(year)
+                for year in range(self.start_year, self.thru_year + 1)
+            ), self.output_data)
+            print(f"Saved distance data to {self.output_data}.")
+
+        page_data = self.page_data()
+        pages = self.pages()
+        rows = max(MIN_GRID_ROWS, *(len(years) for years, _ in pages))
 
-        fig.tight_layout()
         if self.output_img is None:
+            for years, _ in pages:
+                render_multi_page(page_data, years, rows)
             plt.show()
+        elif len(pages) == 1 or self.workers == 1:
+            for years, output_img in pages:
+                render_multi_page(page_data, years, rows, output_img)
+                print(f"Saved distance by day chart to {output_img}.")
         else:
-            plt.savefig(self.output_img)
-            print(f"Saved distance by day chart to {self.output_img}.")
+            workers = min(self.workers or os.cpu_count() or 1, len(pages))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_set_worker_page_data,
+                initargs=(page_data,),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _render_worker_page, years, rows, output_img
+                    )
+                    for years, output_img in pages
+                ]
+                for future in futures:
+                    print(
+                        f"Saved distance by day chart to {future.result()}."
+                    )
+
+    def year_chunk(self, year):
+        """
+        Returns the distance data of a year to write, decimated if a
+        decimation period is set.
+        """
+        distances = self.year_series(year)
+        distances['morning'] = pd.to_datetime(distances['morning'])
+        if self.decimate_period is not None:
+            distances = decimate(distances, self.decimate_period, self.agg)
+        return distances
+
+
+def render_multi_page(page_data, years, rows, output_img=None):
+    """
+    Draws one page of a multiple year chart: a row for each of its years
+    beside the average of all years.
+
+    Args:
+        page_data (dict): The plotted data shared by every page, from
+            YearsAndAverageDistanceChart.page_data().
+        years (list): The years on the page, in order.
+        rows (int): The number of year rows in the grid. Rows after the
+            page's years are left empty, so that every page has the same
+            layout. The figure is taller for more than MIN_GRID_ROWS.
+        output_img (Path): The image file to save the page to and close.
+            If None, the figure is left open to show.
+
+    Returns:
+        Figure: The page's figure.
+    """
+    # Imported here so exporting distance data does not need matplotlib.
+    import matplotlib.pyplot as plt
+    from matplotlib.gridspec import GridSpec
+
+    # Set plot preferences.
+    year_title_options = {
+        'y': 0.8,
+        'verticalalignment': 'top',
+        'alpha': 0.6,
+        'fontsize': 10,
+    }
+
+    # Initialize the figure and grid.
+    fig = plt.figure(dpi=96, figsize=(9, rows * ROW_HEIGHT))
+    gs = GridSpec(rows, 2, width_ratios=[1,3])
+
+    # Create plots for each year.
+    for index, year in enumerate(years):
+        dates, distances = page_data['years'][year]
+        data = {
+            'title': str(year),
+            'dates': dates,
+            'distances': distances,
+        }
+        year_ax = fig.add_subplot(gs[index, 0])
+        year_ax.plot(data['dates'], data['distances'])
+        is_bottom = index == len(years) - 1
+        DistanceByDayChart.apply_styles(
+            year_ax,
+            data,
+            year,
+            include_xaxis=is_bottom
+        )
+        for spine in year_ax.spines.values():
+            spine.set_visible(False)
+        year_ax.get_yaxis().set_visible(False)
+
+        year_ax.set_xlim([date(year,1,1),date(year,12,31)])
+        year_ax.set_ylim([-1000,12000])
+        year_ax.set_yticks([0,6000,12000])
+        year_ax.set_title(data['title'], **year_title_options)
+
+        # Hide leftmost gridline for all years.
+        year_ax.get_xgridlines()[0].set_visible(False)
+
+        # Add month labels to the bottom year.
+        if is_bottom:
+            month_letters = list("JFMAMJJASOND")
+            mid_months = [
+                date(year, m, 15) for m in range(1, 13)
+            ]
+            year_ax.set_xticks(
+                mid_months, month_letters, minor=True
+            )
+
+    # Plot mean distance data.
+    mean_dist_data = page_data['mean']
+    mean_ax = fig.add_subplot(gs[:, 1])
+    mean_ax.plot(mean_dist_data['dates'], mean_dist_data['distances'])
+    DistanceByDayChart.apply_styles(mean_ax, data, mean_dist_data['year'],
+        include_xaxis=True,
+    )
+    mean_ax.set_title(mean_dist_data['title'])
+
+    # Configure y-axes for mean distance plot.
+    y_max_miles = 3000
+    y_max_km = y_max_miles * KM_PER_MILE
+    mean_ax.set_ylim([0,y_max_miles])
+    mean_ax.set_ylabel("Distance (miles)")
+    mean_ax_km = mean_ax.twinx()
+    mean_ax_km.set_ylim([0,y_max_km])
+    mean_ax_km.set_ylabel("Distance (km)")
+
+    fig.tight_layout()
+    if output_img is not None:
+        fig.savefig(output_img)
+        plt.close(fig)
+    return fig
+
+# The page data of the chart being rendered in a worker process.
+_worker_page_data = None
+
+def _set_worker_page_data(page_data):
+    """
+    Stores the page data shared by every page in a worker process, and
+    selects the non-interactive Agg backend, since workers only save
+    images.
+    """
+    global _worker_page_data
+    import matplotlib
+    matplotlib.use('Agg')
+    _worker_page_data = page_data
+
+def _render_worker_page(years, rows, output_img):
+    """Saves one page in a worker process and returns its path."""
+    render_multi_page(_worker_page_data, years, rows, output_img)
+    return output_img
 
 
 if __name__ == "__main__":
@@ -470,6 +837,86 @@ if __name__ == "__main__":
         default=None,
     )
 
+    parser_multi.add_argument(
+        '--years_per_page',
+        dest='years_per_page',
+        type=int,
+        help=(
+            f"Most years on each image (default {YEARS_PER_PAGE}); longer "
+            "ranges are saved as several images"
+        ),
+        default=YEARS_PER_PAGE,
+    )
+    parser_multi.add_argument(
+        '--workers',
+        dest='workers',
+        type=int,
+        help="Processes to render images in (default: number of CPUs)",
+        default=None,
+    )
+    parser_multi.add_argument(
+        '--output_data',
+        dest='output_data',
+        type=Path,
+        help="Output CSV, Parquet, or Arrow file with distance data",
+        default=None,
+    )
+
+    parser_export = subparsers.add_parser(
+        'export',
+        help=(
+            "Write distance data for a range of years without creating "
+            "charts."
+        )
+    )
+    parser_export.add_argument(
+        'output_data',
+        type=Path,
+        help="Output CSV, Parquet, or Arrow file with distance data",
+    )
+    parser_export.add_argument(
+        '--start_year',
+        dest='start_year',
+        type=int,
+        required=True,
+        help="First year to include in the data",
+    )
+    parser_export.add_argument(
+        '--thru_year',
+        dest='thru_year',
+        type=int,
+        required=True,
+        help="Last year to include in the data",
+    )
+
+    for subparser in [parser_multi, parser_export]:
+        subparser.add_argument(
+            '--decimate',
+            dest='decimate',
+            choices=DECIMATE_PERIODS,
+            help="Aggregate days into weekly or monthly buckets",
+            default=None,
+        )
+        subparser.add_argument(
+            '--agg',
+            dest='agg',
+            choices=DECIMATE_AGGS,
+            help="Aggregate of the days in each bucket (default mean)",
+            default='mean',
+        )
+
+    for subparser in [parser_single, parser_multi, parser_export]:
+        subparser.add_argument(
+            '--distance_model',
+            dest='distance_model',
+            choices=list(DISTANCE_MODELS),
+            help=(
+                "Distance model: geodesic (WGS84) or haversine (faster, "
+                "within about 0.6%%)"
+            ),
+            default='geodesic',
+        )
+
     args = parser.parse_args()
     if args.single_multi == 'single':
         distance_from_home_by_day(
@@ -479,10 +926,26 @@ if __name__ == "__main__":
             args.output_csv,
             args.labels,
             args.earliest_prior_year,
+            distance_model=args.distance_model,
         )
-    else:
+    elif args.single_multi == 'multi':
         distance_from_home_by_day(
             'multi',
             [args.start_year, args.thru_year],
-            args.output_img
+            args.output_img,
+            distance_model=args.distance_model,
+            output_data=args.output_data,
+            decimate_period=args.decimate,
+            agg=args.agg,
+            years_per_page=args.years_per_page,
+            workers=args.workers,
+        )
+    else:
+        export_distances(
+            args.output_data,
+            args.start_year,
+            args.thru_year,
+            decimate_period=args.decimate,
+            agg=args.agg,
+            distance_model=args.distance_model,
         )
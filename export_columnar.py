@@ -0,0 +1,51 @@
+"""
+Exports the lodging log GeoPackage to columnar files (GeoParquet or
+Arrow IPC) for fast analytical reads.
+"""
+
+# Standard library imports
+from pathlib import Path
+
+# Third-party imports
+import argparse
+
+# First-party imports
+from modules.columnar import export_columnar
+from modules.lodging_log import LodgingLog
+
+def export_lodging_log(output_dir, file_format='parquet',
+    include_mornings=False,
+):
+    """Export the lodging log GeoPackage to columnar files."""
+    with LodgingLog(backend='gpkg') as log:
+        written = export_columnar(
+            log, output_dir, file_format, include_mornings
+        )
+    for path in written:
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the lodging log to columnar files."
+    )
+    parser.add_argument('output_dir',
+        type=Path,
+        help="Directory to write the columnar files to.",
+    )
+    parser.add_argument('--format',
+        dest='file_format',
+        help="columnar file format",
+        choices=['parquet', 'arrow'],
+        default='parquet',
+    )
+    parser.add_argument('--include_mornings',
+        help="also export the expanded mornings table",
+        action='store_true',
+    )
+    args = parser.parse_args()
+    export_lodging_log(
+        args.output_dir,
+        file_format=args.file_format,
+        include_mornings=args.include_mornings,
+    )
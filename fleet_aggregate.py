@@ -0,0 +1,225 @@
+"""
+Combines the annual night counts and frequency tables of many lodging
+logs into team-wide totals.
+"""
+
+# Standard library imports
+import datetime
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import pandas as pd
+
+# First-party imports
+from annual_night_counts import annual_night_counts
+from batch_reports import find_logs
+from frequency_table import frequency_data, sort_places
+from modules.lodging_log import LodgingLog
+
+FREQUENCY_COLUMNS = ['title', 'name', 'key', 'place_type', 'latitude',
+    'longitude', 'night_count']
+
+class FleetAggregate:
+    """
+    Running totals of nights across lodging logs, which are added one at
+    a time so memory use does not grow with the number of logs.
+
+    Fids differ between GeoPackages, so places are combined by their
+    stable keys: the `key` of cities and metros and the ISO 3166-2 code
+    of regions. Stay locations, used for stays without a city, have no
+    stable key and are combined by name and coordinates.
+    """
+
+    def __init__(self, by=('city', 'metro', 'region'), start_morning=None,
+        thru_morning=None, exclude_transit=False,
+    ):
+        """
+        Initializes the FleetAggregate.
+
+        Args:
+            by (list): The frequency table groupings to combine: `city`,
+                `metro`, and/or `region`.
+            start_morning (date): The first morning to include in the
+                frequency tables.
+            thru_morning (date): The last morning to include in the
+                frequency tables.
+            exclude_transit (bool): Whether to exclude nights in transit
+                from the frequency tables.
+        """
+        for grouping in by:
+            if grouping not in ['city', 'metro', 'region']:
+                raise ValueError(f"Invalid grouping type: {grouping}")
+        self.by = list(by)
+        self.query = {
+            'start_morning': start_morning,
+            'thru_morning': thru_morning,
+            'exclude_transit': exclude_transit,
+        }
+        self.log_count = 0
+        self._annual = None
+        self._places = {grouping: {} for grouping in self.by}
+
+    def add(self, log):
+        """
+        Adds a lodging log's nights to the totals. Nothing is added if
+        reading the log fails.
+
+        Args:
+            log (LodgingLog): The log to add.
+        """
+        annual = annual_night_counts(log).set_index('year')
+        frequencies = {
+            grouping: frequency_data(log, by=grouping, **self.query)
+            for grouping in self.by
+        }
+
+        if self._annual is None:
+            self._annual = annual
+        else:
+            self._annual = self._annual.add(annual, fill_value=0)
+        for grouping, grouped in frequencies.items():
+            self._fold(self._places[grouping], grouped)
+        self.log_count += 1
+
+    def _fold(self, places, grouped):
+        """Adds a log's frequency table to a dict of running totals."""
+        grouped = grouped.reindex(columns=FREQUENCY_COLUMNS)
+        for row in grouped.itertuples(index=False):
+            if row.place_type == 'StayLocation':
+                key = (row.place_type, row.name, row.latitude, row.longitude)
+            else:
+                key = (row.place_type, row.key)
+            if key in places:
+                places[key]['night_count'] += row.night_count
+            else:
+                places[key] = row._asdict()
+                if row.place_type == 'StayLocation':
+                    # A fid is only meaningful within its own log.
+                    places[key]['key'] = None
+
+    def annual_night_counts(self):
+        """
+        Returns the combined annual night counts, in the format of
+        annual_night_counts.py.
+        """
+        if self._annual is None:
+            raise ValueError("No lodging logs have been added.")
+        return self._annual.fillna(0).astype('int').reset_index()
+
+    def frequency_table(self, by, rank=False):
+        """
+        Returns a combined frequency table, in the format of
+        frequency_table.py.
+
+        Args:
+            by (str): The grouping: `city`, `metro`, or `region`.
+            rank (bool): Whether to add a ranking column.
+        """
+        grouped = pd.DataFrame(
+            list(self._places[by].values()), columns=FREQUENCY_COLUMNS,
+        )
+        return sort_places(grouped, rank)
+
+
+def fleet_aggregate(source, output_dir, by=('city', 'metro', 'region'),
+    start_morning=None, thru_morning=None, exclude_transit=False,
+    rank=False,
+):
+    """
+    Reads each lodging log in turn, adds it to the combined totals, and
+    writes the combined annual night counts and frequency tables.
+
+    Logs that cannot be read or fail validation are reported and left out
+    of the totals.
+
+    Args:
+        source (Path): A folder of GeoPackages or a TOML manifest. See
+            batch_reports.find_logs().
+        output_dir (Path): The folder to write the CSV files to.
+        by (list): The frequency table groupings to write.
+        start_morning (date): The first morning for the frequency tables.
+        thru_morning (date): The last morning for the frequency tables.
+        exclude_transit (bool): Whether to exclude nights in transit from
+            the frequency tables.
+        rank (bool): Whether to add a ranking column to the frequency
+            tables.
+
+    Returns:
+        list: The travelers whose logs were left out.
+    """
+    aggregate = FleetAggregate(by, start_morning, thru_morning,
+        exclude_transit,
+    )
+    skipped = []
+    for traveler, path in find_logs(source):
+        try:
+            with LodgingLog(path=path) as log:
+                aggregate.add(log)
+        except Exception as e:
+            message = f"{type(e).__name__}: {e}".splitlines()[0]
+            print(f"Skipped {traveler}: {message}")
+            skipped.append(traveler)
+    print(f"Combined {aggregate.log_count} logs.")
+
+    output_dir = Path(output_dir).expanduser()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    annual_csv = output_dir / "annual_night_counts.csv"
+    aggregate.annual_night_counts().to_csv(annual_csv, index=False)
+    print(f"Annual night counts saved to {annual_csv}")
+    for grouping in aggregate.by:
+        frequency_csv = output_dir / f"frequency_by_{grouping}.csv"
+        aggregate.frequency_table(grouping, rank).to_csv(
+            frequency_csv, index=False
+        )
+        print(f"Saved CSV to `{frequency_csv}`.")
+    return skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Combine the night counts of many lodging logs."
+    )
+    parser.add_argument('source',
+        help="folder of GeoPackages, or TOML manifest of travelers and paths",
+        type=Path,
+    )
+    parser.add_argument('output_dir',
+        help="folder to write the combined CSV files to",
+        type=Path,
+    )
+    parser.add_argument('--by',
+        help="frequency table groupings to write (`city`, `metro`, "
+            "and/or `region`)",
+        choices=['city', 'metro', 'region'],
+        nargs='+',
+        default=['city', 'metro', 'region'],
+    )
+    parser.add_argument('--start_morning',
+        help="the earliest morning to count (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--thru_morning',
+        help="the latest morning to count (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--exclude_transit',
+        help="do not include nights on flights",
+        action='store_true',
+    )
+    parser.add_argument('--rank',
+        help="add a ranking column to the frequency tables",
+        action='store_true',
+    )
+    args = parser.parse_args()
+    skipped = fleet_aggregate(
+        args.source,
+        args.output_dir,
+        by=args.by,
+        start_morning=args.start_morning,
+        thru_morning=args.thru_morning,
+        exclude_transit=args.exclude_transit,
+        rank=args.rank,
+    )
+    if skipped:
+        raise SystemExit(1)
@@ -24,11 +24,53 @@ def frequency_table(
     exclude_transit=False,
     rank=False,
     silent=False,
+    log=None,
 ):
-    """Create a frequency table of hotel locations and nights."""
+    """
+    Create a frequency table of hotel locations and nights.
+
+    The log argument is an open LodgingLog to read; if omitted, the
+    configured log is opened and closed.
+    """
+    query = {
+        'by': by,
+        'start_morning': start_morning,
+        'thru_morning': thru_morning,
+        'exclude_transit': exclude_transit,
+        'rank': rank,
+    }
+    if log is None:
+        with LodgingLog() as log:
+            grouped = frequency_data(log, **query)
+    else:
+        grouped = frequency_data(log, **query)
+
+    total_nights = grouped['night_count'].sum()
+    total_locs = len(grouped)
+    if top is not None:
+        grouped = grouped.head(top)
+    if not silent:
+        print(grouped.to_string(index=False))
+        print(pluralize_total(by, total_locs))
+        print(pluralize_total('night', total_nights))
 
-    log = LodgingLog()
+    if output_csv is not None:
+        grouped.to_csv(output_csv, index=False)
+        print(f"Saved CSV to `{output_csv}`.")
 
+
+def frequency_data(
+    log,
+    by='city',
+    start_morning=None,
+    thru_morning=None,
+    exclude_transit=False,
+    rank=False,
+):
+    """
+    Return a DataFrame of places and the nights spent at each, sorted by
+    night count.
+    """
     mornings = log.mornings_by(
         by=by,
         start_morning=start_morning,
@@ -46,15 +88,24 @@ def frequency_table(
         longitude=('lon', 'first'),
         night_count=('type_fid', 'count'),
     )
-    grouped = grouped.sort_values(
-        by=['night_count','name'],
-        ascending=[False, True],
-    )
 
     # Round coordinates to a fixed number of decimal places.
     grouped['latitude'] = grouped['latitude'].round(COORD_DECIMALS)
     grouped['longitude'] = grouped['longitude'].round(COORD_DECIMALS)
 
+    return sort_places(grouped, rank)
+
+
+def sort_places(grouped, rank=False):
+    """
+    Return a frequency table sorted by night count and name, without
+    empty columns, and with a leading rank column if requested.
+    """
+    grouped = grouped.sort_values(
+        by=['night_count','name'],
+        ascending=[False, True],
+    )
+
     # Remove title if not needed.
     grouped = grouped.dropna(axis=1, how='all')
 
@@ -66,18 +117,7 @@ def frequency_table(
         columns = columns[-1:] + columns[:-1]
         grouped = grouped[columns]
 
-    total_nights = grouped['night_count'].sum()
-    total_locs = len(grouped)
-    if top is not None:
-        grouped = grouped.head(top)
-    if not silent:
-        print(grouped.to_string(index=False))
-        print(pluralize_total(by, total_locs))
-        print(pluralize_total('night', total_nights))
-
-    if output_csv is not None:
-        grouped.to_csv(output_csv, index=False)
-        print(f"Saved CSV to `{output_csv}`.")
+    return grouped
 
 
 def pluralize_total(label, count):
@@ -0,0 +1,251 @@
+"""Maintenance commands for the lodging log GeoPackage."""
+
+# Standard library imports
+import statistics
+import time
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import tomllib
+
+# First-party imports
+from modules import validation
+from modules.backends import HOMES_QUERY, STAYS_QUERY
+from modules.gpkg_connection import GeoPackageConnection
+from modules.lodging_log import CACHE_DIR, LodgingLog
+from modules.timeline import TimelineStore
+
+ROOT = Path(__file__).parent
+with open(ROOT / "data_sources.toml", 'rb') as f:
+    SOURCES = tomllib.load(f)
+TIMELINE_SQLITE = Path(
+    SOURCES.get('timeline_sqlite', CACHE_DIR / "daily_timeline.sqlite")
+).expanduser()
+
+# Indexes supporting the joins and sorts of the LodgingLog queries. The
+# stays and homes indexes cover every column those queries read, so the
+# sorted reads never visit the tables themselves.
+INDEXES = {
+    'lodging_stays_check_out_date': {
+        'table': "stays",
+        'columns': ['check_out_date', 'stay_location_fid', 'nights',
+            'purpose'],
+    },
+    'lodging_homes_move_in_date': {
+        'table': "homes",
+        'columns': ['move_in_date', 'stay_location_fid'],
+    },
+    'lodging_stay_locations_city_fid': {
+        'table': "stay_locations",
+        'columns': ['city_fid'],
+    },
+    'lodging_cities_metro_fid_region_fid': {
+        'table': "cities",
+        'columns': ['metro_fid', 'region_fid'],
+    },
+}
+
+# The queries run by LodgingLog, in the order they are run.
+QUERIES = {
+    'validate': validation.validation_query(),
+    'validate overlapping stays': validation.OVERLAP_QUERY,
+    'stays': STAYS_QUERY,
+    'homes': HOMES_QUERY,
+}
+
+def optimize(gpkg_path, dry_run=False, repeat=20):
+    """
+    Creates indexes for the LodgingLog queries, updates the query
+    planner statistics, and prints each query plan and timing before
+    and after.
+
+    Only ordinary SQLite indexes are added, and statistics are gathered
+    only for the indexed tables, so the GeoPackage remains conformant.
+
+    Args:
+        gpkg_path (Path): The path to the GeoPackage.
+        dry_run (bool): Whether to only print the plans and the indexes
+            that would be created.
+        repeat (int): The number of times to run each query when timing
+            it.
+    """
+    with GeoPackageConnection(gpkg_path, read_only=dry_run) as connection:
+        before = _query_timings(connection, repeat)
+        _print_plans(connection, "Query plans before optimizing")
+
+        missing = _missing_indexes(connection)
+        if not missing:
+            print("All indexes already exist.")
+        for name in missing:
+            index = INDEXES[name]
+            sql = (
+                f"CREATE INDEX IF NOT EXISTS {name} ON {index['table']} "
+                f"({', '.join(index['columns'])})"
+            )
+            print(f"{'Would run' if dry_run else 'Running'}: {sql}")
+            if not dry_run:
+                connection.execute(sql, label=f"create {name}")
+        if dry_run:
+            return
+
+        tables = sorted({index['table'] for index in INDEXES.values()})
+        for table in tables:
+            connection.execute(f"ANALYZE {table}", label=f"analyze {table}")
+        connection.connection().commit()
+        print(f"Analyzed {', '.join(tables)}")
+
+        after = _query_timings(connection, repeat)
+        _print_plans(connection, "Query plans after optimizing")
+
+    print("\nMedian query times (ms):")
+    print(f"{'query':<28} {'before':>10} {'after':>10}")
+    for label in QUERIES:
+        print(f"{label:<28} {before[label]:>10.3f} {after[label]:>10.3f}")
+
+
+def refresh_timeline(gpkg_path, in_gpkg=False, sqlite_path=None,
+    full=False,
+):
+    """
+    Refreshes the materialized daily_timeline table, rebuilding only the
+    mornings affected by stays and homes changed since the last refresh.
+
+    Args:
+        gpkg_path (Path): The path to the GeoPackage.
+        in_gpkg (bool): Whether to store the timeline in the GeoPackage
+            rather than in a separate SQLite file.
+        sqlite_path (Path): The separate SQLite file. Defaults to the
+            `timeline_sqlite` value in data_sources.toml, or
+            daily_timeline.sqlite in the cache folder.
+        full (bool): Whether to rebuild the whole timeline.
+    """
+    if in_gpkg:
+        store = TimelineStore(gpkg_path, geopackage=True)
+    else:
+        store = TimelineStore(sqlite_path or TIMELINE_SQLITE)
+
+    start = time.perf_counter()
+    with LodgingLog() as log:
+        result = store.refresh(log, full=full)
+    elapsed = time.perf_counter() - start
+
+    if not result['ranges']:
+        print("Timeline is up to date.")
+    for first, last in result['ranges']:
+        print(f"Rebuilt {first:%Y-%m-%d} through {last:%Y-%m-%d}")
+    print(
+        f"Wrote {result['rows']} rows to {store.path} "
+        f"in {elapsed * 1000:.1f} ms"
+    )
+
+
+def _missing_indexes(connection):
+    """
+    Returns the names of the indexes in INDEXES that do not yet exist,
+    skipping any whose table lacks one of the indexed columns.
+    """
+    existing = {
+        row[0] for row in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'",
+            label='list indexes',
+        )
+    }
+    missing = []
+    for name, index in INDEXES.items():
+        if name in existing:
+            continue
+        columns = {
+            row[1] for row in connection.execute(
+                f"PRAGMA table_info({index['table']})",
+                label=f"columns {index['table']}",
+            )
+        }
+        absent = [col for col in index['columns'] if col not in columns]
+        if absent:
+            print(
+                f"Skipping {name}: {index['table']} has no "
+                f"{', '.join(absent)} column"
+            )
+            continue
+        missing.append(name)
+    return missing
+
+
+def _print_plans(connection, title):
+    """Prints the EXPLAIN QUERY PLAN output of each LodgingLog query."""
+    print(f"\n{title}:")
+    for label, query in QUERIES.items():
+        print(f"\n{label}")
+        rows = connection.execute(
+            f"EXPLAIN QUERY PLAN {query}", label=f"explain {label}"
+        )
+        # Each row is (id, parent, notused, detail); indent by depth.
+        depth = {0: 0}
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, 0) + 1
+            print(f"{'  ' * depth[node_id]}{detail}")
+    print()
+
+
+def _query_timings(connection, repeat):
+    """Returns the median time in milliseconds to run each query."""
+    timings = {}
+    for label, query in QUERIES.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connection.execute(query, label=label)
+            times.append((time.perf_counter() - start) * 1000)
+        timings[label] = statistics.median(times)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Maintain the lodging log GeoPackage."
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    optimize_parser = subparsers.add_parser('optimize',
+        help="create indexes for the lodging queries and analyze them",
+    )
+    optimize_parser.add_argument('--dry_run',
+        help="only print the query plans and the indexes to create",
+        action='store_true',
+    )
+    optimize_parser.add_argument('--repeat',
+        help="number of times to run each query when timing it",
+        type=int,
+        default=20,
+    )
+
+    timeline_parser = subparsers.add_parser('timeline-refresh',
+        help="refresh the materialized daily_timeline table",
+    )
+    timeline_parser.add_argument('--in_gpkg',
+        help="store the timeline in the GeoPackage",
+        action='store_true',
+    )
+    timeline_parser.add_argument('--sqlite',
+        dest='sqlite_path',
+        type=Path,
+        help="SQLite file to store the timeline in",
+        default=None,
+    )
+    timeline_parser.add_argument('--full',
+        help="rebuild the whole timeline",
+        action='store_true',
+    )
+
+    args = parser.parse_args()
+    lodging_path = Path(SOURCES['lodging_gpkg']).expanduser()
+    if args.command == 'optimize':
+        optimize(lodging_path, dry_run=args.dry_run, repeat=args.repeat)
+    elif args.command == 'timeline-refresh':
+        refresh_timeline(
+            lodging_path,
+            in_gpkg=args.in_gpkg,
+            sqlite_path=args.sqlite_path,
+            full=args.full,
+        )
@@ -0,0 +1,454 @@
+"""
+Defines the storage backends that a LodgingLog can read lodging data
+from.
+"""
+
+# Standard library imports
+import hashlib
+from pathlib import Path
+
+# Third-party imports
+import geopandas as gpd
+import pandas as pd
+import pyogrio
+
+# First-party imports
+from modules import validation
+from modules.gpkg_connection import GeoPackageConnection
+from modules.gpkg_geometry import GeometryDecodeError, decode_points
+
+TABLES = ['stays', 'homes']
+PLACE_LAYERS = ['stay_locations', 'cities', 'metros', 'regions']
+ID_COLUMNS = ['city_fid', 'metro_fid', 'region_fid']
+STAY_CHUNK_ROWS = 10_000 # Stays read at a time by iter_stays().
+
+STAYS_QUERY = """
+SELECT stays.fid as stay_fid, check_out_date, purpose, nights,
+stay_location_fid, type, city_fid, metro_fid, region_fid
+FROM stays
+JOIN stay_locations on stays.stay_location_fid = stay_locations.fid
+LEFT JOIN cities on stay_locations.city_fid = cities.fid
+ORDER BY check_out_date
+"""
+
+HOMES_QUERY = """
+SELECT homes.fid, move_in_date, stay_location_fid, city_fid
+FROM homes
+JOIN stay_locations on homes.stay_location_fid = stay_locations.fid
+ORDER BY move_in_date
+"""
+
+
+def nullable_ids(df):
+    """Converts a DataFrame's city, metro, and region fids to Int64."""
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('Int64')
+    return df
+
+
+def frame_hash(df):
+    """Returns a hash of a DataFrame's column names, index, and values."""
+    digest = hashlib.sha256(repr(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy())
+    return digest.hexdigest()
+
+
+class LodgingBackend:
+    """
+    The interface for a store of lodging data.
+
+    Subclasses return stays and homes joined to their place fids, point
+    layers as attributes with lat and lon columns, and a validation
+    report.
+    """
+
+    name = None
+
+    def __init__(self, path=None):
+        """
+        Initializes the LodgingBackend.
+
+        Args:
+            path (Path): The file or directory the data is stored in, if
+                any.
+        """
+        self.path = None if path is None else Path(path)
+
+    def __repr__(self):
+        """Returns a string representation of the backend."""
+        return f"{type(self).__name__}(path={self.path})"
+
+    def table(self, name):
+        """Returns a table (`stays` or `homes`) as stored."""
+        raise NotImplementedError
+
+    def stays(self):
+        """
+        Returns a DataFrame with a row for each stay, with the fids of
+        its stay location, city, metro, and region, ordered by check out
+        date.
+        """
+        raise NotImplementedError
+
+    def iter_stays(self, chunk_rows=STAY_CHUNK_ROWS):
+        """
+        Yields the rows of stays() in DataFrames of at most chunk_rows
+        stays each, in check out date order.
+
+        Backends that can read stays incrementally override this so the
+        whole table is never held in memory at once.
+        """
+        stays = self.stays()
+        for start in range(0, len(stays), chunk_rows):
+            yield stays.iloc[start:start + chunk_rows]
+
+    def homes(self):
+        """
+        Returns a DataFrame with a row for each home, with the fids of
+        its stay location and city, ordered by move in date.
+        """
+        raise NotImplementedError
+
+    def places(self, layer):
+        """
+        Returns a DataFrame of a point layer's attributes with lat and lon
+        columns, indexed by fid.
+        """
+        raise NotImplementedError
+
+    def geodata(self, layer, columns=None):
+        """
+        Returns a GeoDataFrame for a point layer, indexed by fid, with
+        Int64 city, metro, and region fids.
+
+        Args:
+            layer (str): The name of the point layer.
+            columns (list): The attribute columns to read. Defaults to
+                all.
+        """
+        raise NotImplementedError
+
+    def validate(self):
+        """Returns a ValidationReport for the stored data."""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """
+        Returns a fingerprint that changes whenever the stored data
+        changes, or None if the data cannot be fingerprinted.
+        """
+        return None
+
+    def table_hashes(self):
+        """
+        Returns a hash of each table and point layer, keyed by name, for
+        finding which of them changed between two reads of the data.
+        """
+        hashes = {table: frame_hash(self.table(table)) for table in TABLES}
+        for layer in PLACE_LAYERS:
+            hashes[layer] = frame_hash(nullable_ids(self.places(layer)))
+        return hashes
+
+    def mornings(self):
+        """
+        Returns precomputed mornings indexed by morning if the backend
+        stores them; otherwise, returns None.
+        """
+        return None
+
+    def query_stats(self):
+        """Returns query statistics if the backend records them."""
+        return None
+
+    def close(self):
+        """Releases any resources held by the backend."""
+
+
+class GeoPackageBackend(LodgingBackend):
+    """Reads lodging data from a GeoPackage over one SQLite connection."""
+
+    name = 'gpkg'
+
+    def __init__(self, path, use_arrow=True):
+        """
+        Initializes the GeoPackageBackend.
+
+        Args:
+            path (Path): The path to the GeoPackage file.
+            use_arrow (bool): Whether to read layers with pyogrio through
+                Arrow when pyarrow is installed.
+        """
+        super().__init__(path)
+        self.use_arrow = use_arrow
+        # Use one read-only connection for every query.
+        self.connection = GeoPackageConnection(self.path)
+
+    def table(self, name):
+        """Returns a table (`stays` or `homes`) as stored."""
+        return self.connection.read_sql(f"SELECT * FROM {name}",
+            label=f"table {name}",
+        )
+
+    def stays(self):
+        """Returns each stay joined to its place fids."""
+        return self.connection.read_sql(STAYS_QUERY, label='stays',
+            parse_dates=['check_out_date'],
+        )
+
+    def iter_stays(self, chunk_rows=STAY_CHUNK_ROWS):
+        """Yields each stay joined to its place fids, read by a cursor."""
+        chunks = self.connection.iter_sql(STAYS_QUERY, chunk_rows,
+            label='stays (chunked)',
+        )
+        for chunk in chunks:
+            chunk['check_out_date'] = pd.to_datetime(chunk['check_out_date'])
+            yield chunk
+
+    def homes(self):
+        """Returns each home joined to its place fids."""
+        return self.connection.read_sql(HOMES_QUERY, label='homes',
+            parse_dates=['move_in_date'],
+        )
+
+    def places(self, layer):
+        """
+        Returns a point layer's attributes with lat and lon columns.
+
+        Decodes the point geometries directly from SQLite, and falls back
+        to reading the layer with pyogrio if any geometry is not a
+        standard GeoPackage point.
+        """
+        try:
+            return self._read_points(layer)
+        except GeometryDecodeError:
+            gdf = self.geodata(layer)
+            df = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+            df['lat'] = gdf.geometry.y
+            df['lon'] = gdf.geometry.x
+            return df
+
+    def _read_points(self, layer):
+        """Reads a point layer and decodes its geometries from SQLite."""
+        geometry_columns = self.connection.execute(
+            "SELECT column_name FROM gpkg_geometry_columns "
+            "WHERE table_name = ? AND geometry_type_name = 'POINT'",
+            (layer,),
+            label='geometry columns',
+        )
+        if len(geometry_columns) != 1:
+            raise GeometryDecodeError(f"{layer} is not a point layer.")
+        geom_col = geometry_columns[0][0]
+
+        df = self.connection.read_sql(f'SELECT * FROM "{layer}"',
+            label=f"places {layer}", index_col='fid',
+        )
+        df.index = df.index.astype('int64')
+        df['lat'], df['lon'] = decode_points(df.pop(geom_col).tolist())
+        return df
+
+    def geodata(self, layer, columns=None):
+        """Returns a GeoDataFrame for a point layer, read with pyogrio."""
+        if self.use_arrow:
+            try:
+                return self._read_arrow(layer, columns)
+            except ImportError:
+                pass
+        gdf = gpd.read_file(
+            self.path,
+            layer=layer,
+            columns=columns,
+            engine='pyogrio',
+            fid_as_index=True
+        )
+        return nullable_ids(gdf)
+
+    def _read_arrow(self, layer, columns=None):
+        """
+        Reads a layer through Arrow, reading integer columns directly as
+        nullable Int64 and decoding geometries straight from WKB.
+        """
+        import pyarrow as pa
+
+        meta, table = pyogrio.read_arrow(
+            self.path, layer=layer, columns=columns, return_fids=True,
+        )
+        geom_col = meta['geometry_name'] or 'wkb_geometry'
+        fid_col = meta['fid_column'] or 'fid'
+        df = table.drop_columns([geom_col]).to_pandas(
+            types_mapper={pa.int64(): pd.Int64Dtype()}.get,
+        )
+        df.index = pd.Index(df.pop(fid_col).astype('int64'), name='fid')
+        # Name the geometry column as gpd.read_file() does.
+        df['geometry'] = gpd.GeoSeries.from_wkb(
+            table.column(geom_col).to_numpy(zero_copy_only=False),
+            index=df.index,
+        )
+        return gpd.GeoDataFrame(df, geometry='geometry', crs=meta['crs'])
+
+    def validate(self):
+        """Validates the GeoPackage in a single query pass."""
+        return validation.validate(self.connection)
+
+    def fingerprint(self):
+        """Returns a fingerprint of the GeoPackage file."""
+        return validation.fingerprint(self.path)
+
+    def query_stats(self):
+        """Returns the count and timing of each query run."""
+        return self.connection.stats()
+
+    def close(self):
+        """Closes the GeoPackage connection."""
+        self.connection.close()
+
+
+class FrameBackend(LodgingBackend):
+    """
+    A backend whose tables are read as whole DataFrames, joined and
+    validated in pandas.
+    """
+
+    def stays(self):
+        """Returns each stay joined to its place fids."""
+        stays = self.table('stays')[
+            ['fid', 'check_out_date', 'purpose', 'nights',
+                'stay_location_fid']
+        ].rename(columns={'fid': 'stay_fid'})
+        stay_locations = nullable_ids(
+            self.places('stay_locations')[['type', 'city_fid']]
+        )
+        cities = nullable_ids(
+            self.places('cities')[['metro_fid', 'region_fid']]
+        )
+
+        stays = stays.merge(stay_locations,
+            left_on='stay_location_fid', right_index=True,
+        )
+        stays = stays.merge(cities,
+            left_on='city_fid', right_index=True, how='left',
+        )
+        stays['check_out_date'] = pd.to_datetime(stays['check_out_date'])
+        return stays.sort_values('check_out_date', kind='stable') \
+            .reset_index(drop=True)
+
+    def homes(self):
+        """Returns each home joined to its place fids."""
+        homes = self.table('homes')[
+            ['fid', 'move_in_date', 'stay_location_fid']
+        ]
+        stay_locations = nullable_ids(
+            self.places('stay_locations')[['city_fid']]
+        )
+
+        homes = homes.merge(stay_locations,
+            left_on='stay_location_fid', right_index=True,
+        )
+        homes['move_in_date'] = pd.to_datetime(homes['move_in_date'])
+        return homes.sort_values('move_in_date', kind='stable') \
+            .reset_index(drop=True)
+
+    def validate(self):
+        """Validates the tables with the same checks as a GeoPackage."""
+        frames = {table: self.table(table) for table in TABLES}
+        for layer in PLACE_LAYERS:
+            frames[layer] = self.places(layer)
+        return validation.validate_frames(frames)
+
+
+class ColumnarBackend(FrameBackend):
+    """Reads lodging data from files written by export_columnar.py."""
+
+    name = 'columnar'
+
+    def __init__(self, directory, file_format='parquet'):
+        """
+        Initializes the ColumnarBackend.
+
+        Args:
+            directory (Path): The directory containing the files.
+            file_format (str): `parquet` or `arrow`.
+        """
+        super().__init__(directory)
+        # Imported here so pyarrow is only needed for this backend.
+        from modules.columnar import ColumnarStore
+        self.store = ColumnarStore(directory, file_format)
+
+    def table(self, name):
+        """Returns a table (`stays` or `homes`) as stored."""
+        return self.store.read(name)
+
+    def places(self, layer):
+        """Returns a point layer's attributes with lat and lon columns."""
+        return self.store.places(layer)
+
+    def geodata(self, layer, columns=None):
+        """Returns a GeoDataFrame for a point layer."""
+        return self.store.geodata(layer, columns)
+
+    def mornings(self):
+        """Returns the exported mornings table, if it was exported."""
+        return self.store.mornings()
+
+    def fingerprint(self):
+        """Returns a fingerprint of the columnar files."""
+        parts = {'rules': validation.rules_hash()}
+        for name in TABLES + PLACE_LAYERS:
+            stat = self.store.path(name).stat()
+            parts[name] = [stat.st_size, stat.st_mtime_ns]
+        return parts
+
+
+class MemoryBackend(FrameBackend):
+    """
+    Holds lodging data in DataFrames, for tests, benchmarks, and passing
+    a log to other processes.
+    """
+
+    name = 'memory'
+
+    def __init__(self, frames):
+        """
+        Initializes the MemoryBackend.
+
+        Args:
+            frames (dict): DataFrames keyed by table name. `stays` and
+                `homes` are tables as stored, and each point layer is a
+                frame of attributes with lat and lon columns, indexed by
+                fid.
+        """
+        super().__init__()
+        self.frames = frames
+        self._hashes = None
+
+    @classmethod
+    def from_backend(cls, backend):
+        """Returns a MemoryBackend with a snapshot of another backend."""
+        frames = {table: backend.table(table) for table in TABLES}
+        for layer in PLACE_LAYERS:
+            frames[layer] = nullable_ids(backend.places(layer))
+        return cls(frames)
+
+    def table(self, name):
+        """Returns a table (`stays` or `homes`)."""
+        return self.frames[name].copy()
+
+    def places(self, layer):
+        """Returns a point layer's attributes with lat and lon columns."""
+        return self.frames[layer].copy()
+
+    def table_hashes(self):
+        """Returns a hash of each frame, computed once."""
+        if self._hashes is None:
+            self._hashes = super().table_hashes()
+        return self._hashes
+
+    def geodata(self, layer, columns=None):
+        """Returns a GeoDataFrame for a point layer built from lat/lon."""
+        df = self.frames[layer]
+        attrs = df.drop(columns=['lat', 'lon'])
+        return gpd.GeoDataFrame(
+            attrs if columns is None else attrs[columns],
+            geometry=gpd.points_from_xy(df['lon'], df['lat']),
+            crs="EPSG:4326",
+        )
@@ -0,0 +1,193 @@
+"""
+Exports a lodging log to columnar files (GeoParquet or Arrow IPC), and
+reads lodging data back from those files.
+"""
+
+# Standard library imports
+import json
+from pathlib import Path
+
+# Third-party imports
+import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+FORMATS = {
+    'parquet': ".parquet",
+    'arrow': ".arrow",
+}
+TABLES = ['stays', 'homes']
+POINT_LAYERS = ['stay_locations', 'cities', 'metros', 'regions']
+
+def export_columnar(log, output_dir, file_format='parquet',
+    include_mornings=False,
+):
+    """
+    Writes the tables and point layers of a lodging log to columnar
+    files, one file per table.
+
+    Point layers are written as GeoParquet (or GeoArrow IPC) with lat and
+    lon columns alongside the geometry, so they can be read without
+    decoding geometries.
+
+    Args:
+        log (LodgingLog): The lodging log to export.
+        output_dir (Path): The directory to write files to.
+        file_format (str): `parquet` or `arrow`.
+        include_mornings (bool): Whether to also write the expanded
+            mornings table.
+
+    Returns:
+        list: The paths of the written files.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Invalid columnar format: {file_format}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = FORMATS[file_format]
+    written = []
+
+    for table in TABLES:
+        df = log.backend.table(table)
+        written.append(_write_frame(df, output_dir / f"{table}{suffix}"))
+
+    for layer in POINT_LAYERS:
+        geodata = log.geodata(layer)
+        gdf = gpd.GeoDataFrame(
+            log.places(layer),
+            geometry=geodata.geometry,
+            crs=geodata.crs,
+        ).reset_index()
+        path = output_dir / f"{layer}{suffix}"
+        if file_format == 'parquet':
+            gdf.to_parquet(path, index=False)
+        else:
+            gdf.to_feather(path, compression='uncompressed')
+        written.append(path)
+
+    if include_mornings:
+        mornings = log.mornings().reset_index()
+        path = output_dir / f"mornings{suffix}"
+        written.append(_write_frame(mornings, path))
+
+    return written
+
+
+def _write_frame(df, path):
+    """Writes a DataFrame without geometry to a columnar file."""
+    if path.suffix == FORMATS['parquet']:
+        df.to_parquet(path, index=False)
+    else:
+        # Uncompressed Arrow IPC files can be memory-mapped without
+        # copying.
+        df.to_feather(path, compression='uncompressed')
+    return path
+
+
+class ColumnarStore:
+    """Reads lodging data from columnar files written by export_columnar."""
+
+    def __init__(self, directory, file_format='parquet'):
+        """
+        Initializes the ColumnarStore.
+
+        Args:
+            directory (Path): The directory containing the files.
+            file_format (str): `parquet` or `arrow`.
+        """
+        if file_format not in FORMATS:
+            raise ValueError(f"Invalid columnar format: {file_format}")
+        self.directory = Path(directory)
+        self.file_format = file_format
+
+    def __repr__(self):
+        """Returns a string representation of the ColumnarStore."""
+        return (
+            f"ColumnarStore(directory={self.directory}, "
+            f"file_format={self.file_format})"
+        )
+
+    def path(self, table):
+        """Returns the path of the file for a table."""
+        return self.directory / f"{table}{FORMATS[self.file_format]}"
+
+    def has_table(self, table):
+        """Returns True if a file exists for the table."""
+        return self.path(table).is_file()
+
+    def read_arrow(self, table, columns=None, exclude=None):
+        """
+        Reads a table as a memory-mapped pyarrow Table.
+
+        Args:
+            table (str): The table name.
+            columns (list): The columns to read. Defaults to all.
+            exclude (list): Columns to leave out.
+
+        Returns:
+            pyarrow.Table: The table data.
+        """
+        path = self.path(table)
+        if not path.is_file():
+            raise FileNotFoundError(f"Columnar file not found: {path}")
+        if self.file_format == 'parquet':
+            schema = pq.read_schema(path)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+            schema = reader.schema
+        if columns is None:
+            columns = [name for name in schema.names
+                if name not in (exclude or [])]
+        if self.file_format == 'parquet':
+            return pq.read_table(path, columns=columns, memory_map=True)
+        return reader.read_all().select(columns)
+
+    def read(self, table, columns=None, exclude=None):
+        """Reads a table into a DataFrame."""
+        return self.read_arrow(table, columns, exclude).to_pandas()
+
+    def mornings(self):
+        """
+        Returns the expanded mornings table indexed by morning, if it was
+        exported; otherwise, returns None.
+        """
+        if not self.has_table('mornings'):
+            return None
+        return self.read('mornings').set_index('morning')
+
+    def places(self, layer):
+        """
+        Returns a point layer's attributes with lat and lon columns,
+        indexed by fid, without reading its geometry.
+        """
+        df = self.read(layer, exclude=[self._geometry_column(layer)])
+        return df.set_index('fid')
+
+    def geodata(self, layer, columns=None):
+        """
+        Returns a GeoDataFrame for a point layer, indexed by fid.
+
+        Args:
+            layer (str): The name of the point layer.
+            columns (list): The attribute columns to read. Defaults to
+                all.
+        """
+        if columns is not None:
+            columns = ['fid', *columns, self._geometry_column(layer)]
+        if self.file_format == 'parquet':
+            gdf = gpd.read_parquet(self.path(layer), columns=columns)
+        else:
+            gdf = gpd.read_feather(self.path(layer), columns=columns)
+        gdf = gdf.drop(columns=['lat', 'lon'], errors='ignore')
+        return gdf.set_index('fid')
+
+    def _geometry_column(self, layer):
+        """Returns the name of a layer's primary geometry column."""
+        path = self.path(layer)
+        if self.file_format == 'parquet':
+            metadata = pq.read_schema(path).metadata
+        else:
+            metadata = pa.ipc.open_file(
+                pa.memory_map(str(path), 'r')
+            ).schema.metadata
+        return json.loads(metadata[b'geo'])['primary_column']
@@ -0,0 +1,91 @@
+"""Computes distances between points in latitude and longitude."""
+
+# Third-party imports
+import numpy as np
+from pyproj import Geod
+
+KM_PER_MILE = 1.6093
+
+GEOD = Geod(ellps='WGS84')
+
+# The mean radius of the WGS84 ellipsoid, (2a + b) / 3, in km. With this
+# radius, haversine distances are within about 0.6% of the geodesic
+# distances; benchmarks/distance_models.py measures the deviation over
+# the lodging log.
+EARTH_RADIUS_KM = 6371.0088
+
+def geodesic_miles(lat1, lon1, lat2, lon2):
+    """
+    Returns the geodesic distance in miles between pairs of points on
+    the WGS84 ellipsoid.
+
+    Args:
+        lat1 (array-like): Latitudes of the first points.
+        lon1 (array-like): Longitudes of the first points.
+        lat2 (array-like): Latitudes of the second points.
+        lon2 (array-like): Longitudes of the second points.
+
+    Returns:
+        ndarray: The distance in miles for each pair of points. Pairs
+        with a missing coordinate have a NaN distance.
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.asarray(values, dtype='float64')
+        for values in (lat1, lon1, lat2, lon2)
+    )
+    meters = GEOD.inv(lon1, lat1, lon2, lat2)[2]
+    miles = np.asarray(meters) / (1000 * KM_PER_MILE)
+    missing = np.isnan(lat1) | np.isnan(lon1) | np.isnan(lat2) | np.isnan(lon2)
+    return np.where(missing, np.nan, miles)
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance in miles between pairs of points on
+    a sphere with the Earth's mean radius. Faster than geodesic_miles(),
+    and accurate to within about 0.6%.
+
+    Args:
+        lat1 (array-like): Latitudes of the first points.
+        lon1 (array-like): Longitudes of the first points.
+        lat2 (array-like): Latitudes of the second points.
+        lon2 (array-like): Longitudes of the second points.
+
+    Returns:
+        ndarray: The distance in miles for each pair of points. Pairs
+        with a missing coordinate have a NaN distance.
+    """
+    lat1, lon1, lat2, lon2 = (
+        np.radians(np.asarray(values, dtype='float64'))
+        for values in (lat1, lon1, lat2, lon2)
+    )
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return km / KM_PER_MILE
+
+
+DISTANCE_MODELS = {
+    'geodesic': geodesic_miles,
+    'haversine': haversine_miles,
+}
+
+def distance_miles(lat1, lon1, lat2, lon2, model='geodesic'):
+    """
+    Returns the distance in miles between pairs of points with a
+    distance model.
+
+    Args:
+        lat1 (array-like): Latitudes of the first points.
+        lon1 (array-like): Longitudes of the first points.
+        lat2 (array-like): Latitudes of the second points.
+        lon2 (array-like): Longitudes of the second points.
+        model (str): `geodesic` (WGS84 ellipsoid) or `haversine`
+            (sphere).
+
+    Returns:
+        ndarray: The distance in miles for each pair of points.
+    """
+    if model not in DISTANCE_MODELS:
+        raise ValueError(f"Invalid distance model: {model}")
+    return DISTANCE_MODELS[model](lat1, lon1, lat2, lon2)
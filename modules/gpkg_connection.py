@@ -0,0 +1,192 @@
+"""Defines the GeoPackageConnection class for managed SQLite access."""
+
+# Standard library imports
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Third-party imports
+import pandas as pd
+
+# Pragmas applied to every connection. Negative cache_size values are
+# in KiB rather than pages.
+PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
+class GeoPackageConnection:
+    """
+    A single SQLite connection to a GeoPackage, opened lazily and reused
+    for every query until closed.
+
+    Records the label, row count, and duration of each query so callers
+    can see where time is spent. The connection may be shared between
+    threads; queries from different threads run one at a time.
+    """
+
+    def __init__(self, path, read_only=True):
+        """
+        Initializes the GeoPackageConnection.
+
+        Args:
+            path (Path): The path to the GeoPackage file.
+            read_only (bool): Whether to open the file in read-only mode
+                with writes disabled.
+        """
+        self.path = Path(path)
+        self.read_only = read_only
+        self.query_log = []
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        """Returns a string representation of the GeoPackageConnection."""
+        return (
+            f"GeoPackageConnection(path={self.path}, "
+            f"read_only={self.read_only})"
+        )
+
+    def __enter__(self):
+        """Opens the connection when entering a context."""
+        self.connection()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the connection when leaving a context."""
+        self.close()
+
+    def connection(self):
+        """Returns the open sqlite3 connection, opening it if needed."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            return self._conn
+
+    def _open(self):
+        """Opens a new sqlite3 connection with the configured pragmas."""
+        if not self.path.is_file():
+            raise FileNotFoundError(f"GeoPackage not found: {self.path}")
+        mode = "ro" if self.read_only else "rw"
+        uri = f"{self.path.resolve().as_uri()}?mode={mode}"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        for pragma, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def close(self):
+        """Closes the connection if it is open."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @property
+    def is_open(self):
+        """Returns True if the connection is currently open."""
+        return self._conn is not None
+
+    def execute(self, query, params=(), label=None):
+        """
+        Executes a query and returns all resulting rows.
+
+        Args:
+            query (str): The SQL query to execute.
+            params (tuple): Parameters to bind to the query.
+            label (str): A label for the query in the query log.
+
+        Returns:
+            list: A list of row tuples.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            rows = self.connection().execute(query, params).fetchall()
+            self._log(label or query, len(rows), start)
+        return rows
+
+    def read_sql(self, query, label=None, **kwargs):
+        """
+        Reads the results of a query into a DataFrame.
+
+        Args:
+            query (str): The SQL query to execute.
+            label (str): A label for the query in the query log.
+            **kwargs: Additional arguments for pandas.read_sql_query.
+
+        Returns:
+            DataFrame: The query results.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            df = pd.read_sql_query(query, self.connection(), **kwargs)
+            self._log(label or query, len(df), start)
+        return df
+
+    def iter_sql(self, query, chunk_rows, label=None):
+        """
+        Reads the results of a query into DataFrames of at most
+        chunk_rows rows each, fetching the rows from a cursor so that the
+        whole result is never held in memory at once.
+
+        The query is logged once, with its total rows and time, when the
+        last chunk has been read.
+
+        Args:
+            query (str): The SQL query to execute.
+            chunk_rows (int): The maximum number of rows per DataFrame.
+            label (str): A label for the query in the query log.
+
+        Yields:
+            DataFrame: The next chunk of query results.
+        """
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1.")
+        elapsed = 0.0
+        total = 0
+        with self._lock:
+            start = time.perf_counter()
+            cursor = self.connection().execute(query)
+            columns = [col[0] for col in cursor.description]
+            elapsed += time.perf_counter() - start
+        try:
+            while True:
+                # Hold the lock only while fetching, so other queries can
+                # run between chunks.
+                with self._lock:
+                    start = time.perf_counter()
+                    rows = cursor.fetchmany(chunk_rows)
+                    elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                total += len(rows)
+                yield pd.DataFrame.from_records(rows, columns=columns)
+        finally:
+            cursor.close()
+        self.query_log.append((" ".join((label or query).split()), total,
+            elapsed,
+        ))
+
+    def stats(self):
+        """
+        Returns a DataFrame summarizing the queries run on this
+        connection, with the count, total time, and mean time (in
+        seconds) for each query label.
+        """
+        log = pd.DataFrame(
+            self.query_log, columns=['label', 'rows', 'seconds']
+        )
+        return log.groupby('label', sort=False).agg(
+            count=('seconds', 'count'),
+            rows=('rows', 'sum'),
+            total_seconds=('seconds', 'sum'),
+            mean_seconds=('seconds', 'mean'),
+        )
+
+    def _log(self, label, rows, start):
+        """Records a query in the query log."""
+        self.query_log.append((
+            " ".join(label.split()), rows, time.perf_counter() - start
+        ))
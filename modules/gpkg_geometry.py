@@ -0,0 +1,93 @@
+"""
+Decodes GeoPackage point geometry blobs into coordinate arrays without
+using GDAL.
+"""
+
+# Third-party imports
+import numpy as np
+
+# Envelope sizes in bytes, indexed by the envelope contents indicator in
+# the GeoPackage binary header flags.
+ENVELOPE_BYTES = np.array([0, 32, 48, 48, 64])
+
+# WKB point: byte order (1), geometry type (4), x (8), y (8).
+WKB_POINT_BYTES = 21
+
+class GeometryDecodeError(ValueError):
+    """Raised when a geometry blob cannot be decoded as a point."""
+
+
+def decode_points(blobs):
+    """
+    Decodes GeoPackage geometry blobs containing points.
+
+    Handles either byte order in both the GeoPackage header and the WKB,
+    any envelope type, empty points, and null geometries. Points with Z
+    and/or M values are accepted, but only X and Y are returned.
+
+    Args:
+        blobs (list): A list of GeoPackage geometry blobs (bytes), or
+            None for null geometries.
+
+    Returns:
+        tuple: A tuple of numpy arrays (lat, lon). Null geometries and
+        empty points are NaN.
+
+    Raises:
+        GeometryDecodeError: If any blob is not a standard GeoPackage
+        point geometry.
+    """
+    count = len(blobs)
+    lat = np.full(count, np.nan)
+    lon = np.full(count, np.nan)
+
+    present = np.fromiter(
+        (b is not None for b in blobs), dtype=bool, count=count
+    )
+    data = [bytes(b) for b in blobs if b is not None]
+    if not data:
+        return lat, lon
+
+    lengths = np.fromiter(map(len, data), dtype=np.int64, count=len(data))
+    if (lengths < 8).any():
+        raise GeometryDecodeError("Geometry blob is shorter than its header.")
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    buf = np.frombuffer(b"".join(data), dtype=np.uint8)
+
+    # Check the header magic number and flags.
+    if not ((buf[starts] == 0x47) & (buf[starts + 1] == 0x50)).all():
+        raise GeometryDecodeError("Geometry blob is not a GeoPackage blob.")
+    flags = buf[starts + 3]
+    if (flags & 0x20).any():
+        raise GeometryDecodeError("Extended GeoPackage geometry found.")
+    envelope = (flags >> 1) & 0x07
+    if (envelope >= len(ENVELOPE_BYTES)).any():
+        raise GeometryDecodeError("Invalid envelope contents indicator.")
+    empty = (flags & 0x10) != 0
+
+    # Only non-empty points need their WKB decoded.
+    wkb = (starts + 8 + ENVELOPE_BYTES[envelope])[~empty]
+    if (wkb + WKB_POINT_BYTES > (starts + lengths)[~empty]).any():
+        raise GeometryDecodeError("Geometry blob is too short for a point.")
+    byte_order = buf[wkb]
+    if not np.isin(byte_order, [0, 1]).all():
+        raise GeometryDecodeError("Invalid WKB byte order.")
+    big_endian = byte_order == 0
+
+    # Read geometry types, which are ISO WKB codes (1, 1001, 2001, and
+    # 3001 for Point, PointZ, PointM, and PointZM).
+    type_bytes = buf[wkb[:, None] + np.arange(1, 5)]
+    type_bytes[big_endian] = type_bytes[big_endian, ::-1]
+    geometry_types = np.ascontiguousarray(type_bytes).view('<u4').ravel()
+    if not np.isin(geometry_types, [1, 1001, 2001, 3001]).all():
+        raise GeometryDecodeError("Non-point geometry found.")
+
+    # Read X and Y as two 8-byte doubles.
+    coord_bytes = buf[wkb[:, None] + np.arange(5, 21)].reshape(-1, 2, 8)
+    coord_bytes[big_endian] = coord_bytes[big_endian, :, ::-1]
+    coords = np.ascontiguousarray(coord_bytes).view('<f8').reshape(-1, 2)
+
+    decoded = np.flatnonzero(present)[~empty]
+    lon[decoded] = coords[:, 0]
+    lat[decoded] = coords[:, 1]
+    return lat, lon
@@ -0,0 +1,102 @@
+"""Defines the GeoPackageWatcher class for detecting committed edits."""
+
+# Standard library imports
+import sqlite3
+import time
+from pathlib import Path
+
+class GeoPackageWatcher:
+    """
+    Polls a GeoPackage for committed changes.
+
+    A change is detected when SQLite's data_version for the file changes,
+    which happens when another connection (such as QGIS) commits a
+    transaction, or when the file is replaced by a new one. Writes to the
+    -wal file that have not yet been committed are ignored, as are WAL
+    checkpoints, which do not change the data.
+    """
+
+    def __init__(self, path, interval=1.0, debounce=2.0):
+        """
+        Initializes the GeoPackageWatcher.
+
+        Args:
+            path (Path): The path to the GeoPackage file.
+            interval (float): The seconds between polls.
+            debounce (float): The seconds without a further change to
+                wait for before reporting a change, so that a burst of
+                edits is reported once.
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.debounce = debounce
+        self._conn = None
+        self._inode = None
+        self._state = self._read_state()
+
+    def __repr__(self):
+        """Returns a string representation of the GeoPackageWatcher."""
+        return (
+            f"GeoPackageWatcher(path={self.path}, interval={self.interval}, "
+            f"debounce={self.debounce})"
+        )
+
+    def __enter__(self):
+        """Returns the GeoPackageWatcher when entering a context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the GeoPackageWatcher when leaving a context."""
+        self.close()
+
+    def close(self):
+        """Closes the watcher's connection to the GeoPackage."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def changed(self):
+        """Returns True if a change was committed since the last wait()."""
+        return self._read_state() != self._state
+
+    def wait(self):
+        """
+        Blocks until a change has been committed and no further change
+        has followed it for the debounce period.
+        """
+        while not self.changed():
+            time.sleep(self.interval)
+
+        state = self._read_state()
+        settled = time.monotonic()
+        while (remaining := self.debounce - (time.monotonic() - settled)) > 0:
+            time.sleep(min(self.interval, remaining))
+            current = self._read_state()
+            if current != state:
+                state = current
+                settled = time.monotonic()
+        self._state = state
+
+    def _read_state(self):
+        """
+        Returns the file's inode and committed data version, or None if
+        the file cannot be read, such as while it is being replaced.
+        """
+        try:
+            inode = self.path.stat().st_ino
+        except FileNotFoundError:
+            return None
+        if inode != self._inode:
+            # A new file; data versions of different files and
+            # connections cannot be compared.
+            self.close()
+            self._inode = inode
+        try:
+            if self._conn is None:
+                uri = f"{self.path.resolve().as_uri()}?mode=ro"
+                self._conn = sqlite3.connect(uri, uri=True)
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            self.close()
+            return None
+        return (inode, version)
@@ -1,25 +1,124 @@
 """Defines the LodgingLog class for managing lodging information."""
 
 # Standard library imports
-import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import timedelta
 
 # Third-party imports
 import tomllib
-import geopandas as gpd
+import numpy as np
 import pandas as pd
 
+# First-party imports
+from modules import shared_timeline, timeline, validation
+from modules.backends import (
+    PLACE_LAYERS,
+    TABLES,
+    ColumnarBackend,
+    GeoPackageBackend,
+    LodgingBackend,
+    MemoryBackend,
+    nullable_ids,
+)
+from modules.query_cache import QueryCache
+
 ROOT = Path(__file__).parent.parent
 with open(ROOT / "data_sources.toml", 'rb') as f:
     SOURCES = tomllib.load(f)
+CACHE_DIR = Path(SOURCES.get('cache_dir', ROOT / ".cache")).expanduser()
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# The tables and point layers each cached query reads, so refresh() can
+# keep the results of queries whose data did not change.
+QUERY_TABLES = {
+    'mornings': {'stays', 'stay_locations', 'cities'},
+    'mornings_by': {'stays', *PLACE_LAYERS},
+    'home_locations': {'homes', 'stay_locations', 'cities'},
+    'daily_timeline': {'stays', 'homes', 'stay_locations', 'cities'},
+}
+MORNING_COLUMNS = ['stay_fid', 'purpose', 'type', 'stay_location_fid',
+    'city_fid', 'metro_fid', 'region_fid']
+
+def configured_backend(name=None, path=None):
+    """
+    Returns the storage backend named in data_sources.toml.
+
+    Args:
+        name (str): `gpkg` to read the GeoPackage, `columnar` to read
+            files written by export_columnar.py, or `memory` to read the
+            GeoPackage once into DataFrames. Defaults to the
+            `lodging_backend` value in data_sources.toml, or `gpkg` if not
+            set, or to `gpkg` if a path is given.
+        path (Path): The GeoPackage to read, instead of the
+            `lodging_gpkg` value in data_sources.toml.
+
+    Returns:
+        LodgingBackend: The storage backend.
+    """
+    if name is None:
+        name = 'gpkg' if path is not None \
+            else SOURCES.get('lodging_backend', 'gpkg')
+    if path is None:
+        lodging_path = Path(SOURCES['lodging_gpkg']).expanduser()
+    elif name == 'columnar':
+        raise ValueError("A GeoPackage path cannot be read as columnar.")
+    else:
+        lodging_path = Path(path).expanduser()
+    if name == 'gpkg':
+        return GeoPackageBackend(lodging_path)
+    if name == 'columnar':
+        return ColumnarBackend(
+            Path(SOURCES['columnar_dir']).expanduser(),
+            SOURCES.get('columnar_format', 'parquet'),
+        )
+    if name == 'memory':
+        source = GeoPackageBackend(lodging_path)
+        try:
+            return MemoryBackend.from_backend(source)
+        finally:
+            source.close()
+    raise ValueError(f"Invalid lodging backend: {name}")
+
 
 class LodgingLog:
     """A class to manage lodging information for a trip."""
 
-    def __init__(self):
-        """Initializes the LodgingLog."""
-        self.lodging_path = Path(SOURCES['lodging_gpkg']).expanduser()
+    def __init__(self, load_workers=None, cache_bytes=None, backend=None,
+        path=None,
+    ):
+        """
+        Initializes the LodgingLog.
+
+        Args:
+            load_workers (int): The number of threads used to read place
+                layers. Defaults to the `load_workers` value in
+                data_sources.toml, or 1 (serial reads) if not set.
+            cache_bytes (int): The memory budget for cached query
+                results. Defaults to the `cache_bytes` value in
+                data_sources.toml, or 64 MiB if not set. Use 0 to disable
+                caching.
+            backend (LodgingBackend or str): The storage backend to read
+                from, or the name of a backend for configured_backend().
+                Defaults to the `lodging_backend` value in
+                data_sources.toml, or `gpkg` if not set.
+            path (Path): The GeoPackage to read, instead of the
+                `lodging_gpkg` value in data_sources.toml, so that one
+                process can read several logs.
+        """
+        if isinstance(backend, LodgingBackend):
+            if path is not None:
+                raise ValueError("Give either a backend or a path, not both.")
+        else:
+            backend = configured_backend(backend, path)
+        self.backend = backend
+        self.lodging_path = backend.path
+
+        # Cache the results of mornings(), mornings_by(), and
+        # home_locations(), which are often called repeatedly.
+        if cache_bytes is None:
+            cache_bytes = SOURCES.get('cache_bytes', DEFAULT_CACHE_BYTES)
+        self.query_cache = QueryCache(cache_bytes)
+
         self._validate()
         self.dtypes = {
             'stay_fid': 'int64',
@@ -30,91 +129,250 @@ class LodgingLog:
             'region_fid': 'Int64',
         }
 
-        # Store geodata in a cache for quick access.
-        # This avoids reading the GeoPackage multiple times.
-        self.geodata_cache = {
-            'stay_locations': self.geodata('stay_locations'),
-            'cities': self.geodata('cities'),
-            'metros': self.geodata('metros'),
-            'regions': self.geodata('regions'),
-        }
+        # Store place attributes and coordinates in a cache for quick
+        # access. This avoids reading the GeoPackage multiple times.
+        self.geodata_cache = self._load_places(load_workers)
 
     def __repr__(self):
         """Returns a string representation of the LodgingLog."""
-        return f"LodgingLog(lodging_path={self.lodging_path})"
+        return f"LodgingLog(backend={self.backend!r})"
 
     def __str__(self):
         """Returns a string representation of the LodgingLog."""
+        if self.lodging_path is None:
+            return f"LodgingLog in {self.backend.name}"
         return f"LodgingLog at {self.lodging_path}"
 
-    def geodata(self, layer):
+    def __enter__(self):
+        """Returns the LodgingLog when entering a context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the LodgingLog when leaving a context."""
+        self.close()
+
+    def close(self):
+        """Closes the storage backend."""
+        self.backend.close()
+
+    def snapshot(self):
+        """
+        Returns a copy of this log held in memory by a MemoryBackend,
+        which can be pickled and sent to worker processes. Cached query
+        results are not copied.
+        """
+        frames = {table: self.backend.table(table) for table in TABLES}
+        frames.update(self.geodata_cache)
+        return LodgingLog(
+            cache_bytes=self.query_cache.max_bytes,
+            backend=MemoryBackend(frames),
+        )
+
+    def refresh(self, backend):
         """
-        Returns a GeoDataFrame for the specified layer in the GeoPackage.
+        Replaces the storage backend with one holding newer data, keeping
+        the cached results of queries whose tables did not change.
+
+        The current backend must still return the data it was read with,
+        as a MemoryBackend does. If the new data fails validation, the
+        current backend is kept.
 
         Args:
-            layer (str): The name of the layer to read from the GeoPackage.
+            backend (LodgingBackend): The backend with the newer data,
+                such as a new MemoryBackend snapshot.
 
         Returns:
-            GeoDataFrame: A GeoDataFrame containing the data from the
-            specified layer.
+            set: The names of the tables and point layers that changed.
         """
-        gdf = gpd.read_file(
-            self.lodging_path,
-            layer=layer,
-            engine='pyogrio',
-            fid_as_index=True
+        old_hashes = self.backend.table_hashes()
+        new_hashes = backend.table_hashes()
+        changed = {
+            name for name, value in new_hashes.items()
+            if old_hashes.get(name) != value
+        }
+
+        previous = self.backend
+        self.backend = backend
+        self.lodging_path = backend.path
+        if changed:
+            try:
+                self._validate()
+            except validation.LodgingValidationError:
+                self.backend = previous
+                self.lodging_path = previous.path
+                raise
+        self.query_cache.discard(
+            name for name, tables in QUERY_TABLES.items() if tables & changed
         )
-        # Convert id columns to Int64.
-        for col in ['city_fid', 'metro_fid', 'region_fid']:
-            if col in gdf.columns:
-                gdf[col] = gdf[col].astype('Int64')
+        for layer in PLACE_LAYERS:
+            if layer in changed:
+                self.geodata_cache[layer] = self.places(layer)
+        return changed
 
-        return gdf
+    def query_stats(self):
+        """
+        Returns a DataFrame with the count and timing of each query run
+        against the GeoPackage, or None if the backend does not run
+        queries.
+        """
+        return self.backend.query_stats()
+
+    def cache_stats(self):
+        """
+        Returns a dict of query result cache statistics: entries, bytes,
+        max_bytes, hits, misses, and evictions.
+        """
+        return self.query_cache.stats()
+
+    def geodata(self, layer, columns=None):
+        """
+        Returns a GeoDataFrame for the specified layer in the lodging
+        data.
+
+        Args:
+            layer (str): The name of the layer to read.
+            columns (list): The attribute columns to read. Defaults to
+                all.
+
+        Returns:
+            GeoDataFrame: A GeoDataFrame containing the data from the
+            specified layer, with Int64 city, metro, and region fids.
+        """
+        return self.backend.geodata(layer, columns)
+
+    def _load_places(self, load_workers=None):
+        """
+        Reads every place layer, concurrently if more than one worker is
+        used, and returns a dict of DataFrames keyed by layer name.
+        """
+        if load_workers is None:
+            load_workers = SOURCES.get('load_workers', 1)
+        if load_workers <= 1:
+            return {layer: self.places(layer) for layer in PLACE_LAYERS}
+        with ThreadPoolExecutor(max_workers=load_workers) as executor:
+            results = executor.map(self.places, PLACE_LAYERS)
+            return dict(zip(PLACE_LAYERS, results))
+
+    def places(self, layer):
+        """
+        Returns a DataFrame of the attributes of a point layer, with lat
+        and lon columns in place of the geometry.
+
+        Args:
+            layer (str): The name of the point layer to read.
+
+        Returns:
+            DataFrame: A DataFrame indexed by fid.
+        """
+        return nullable_ids(self.backend.places(layer))
 
     def mornings(self):
         """
         Returns a DataFrame with a row for each morning away from home.
+        Validation ensures that no two stays share a morning, so the
+        morning index is unique.
         """
-        # Read an SQLite table into a DataFrame.
-        conn = sqlite3.connect(self.lodging_path)
-        query = """
-        SELECT stays.fid as stay_fid, check_out_date, purpose, nights,
-        stay_location_fid, type, city_fid, metro_fid, region_fid
-        FROM stays
-        JOIN stay_locations on stays.stay_location_fid = stay_locations.fid
-        LEFT JOIN cities on stay_locations.city_fid = cities.fid
-        ORDER BY check_out_date
-        """
-        dtypes = {
-            'stay_fid': 'int64',
-            'nights': 'int64',
-            'stay_location_fid': 'int64',
-            'city_fid': 'Int64',
-            'metro_fid': 'Int64',
-            'region_fid': 'Int64',
-        }
-        stays = pd.read_sql_query(query, conn,
-            parse_dates=['check_out_date'], dtype=dtypes,
+        return self.query_cache.get_or_compute(('mornings',), self._mornings)
+
+    def _mornings(self):
+        """Reads the mornings away from home from the lodging data."""
+        mornings = self.backend.mornings()
+        if mornings is not None:
+            return mornings
+
+        return self._expand_mornings(self._stays())
+
+    def _expand_mornings(self, stays):
+        """
+        Expands stays, as returned by _stays(), into a DataFrame with a
+        row for each of their mornings, indexed by morning.
+        """
+        nights = stays['nights'].to_numpy()
+        rows = np.repeat(np.arange(len(stays)), nights)
+        # Count back from each stay's last morning (its check out date).
+        first_rows = np.repeat(np.cumsum(nights) - nights, nights)
+        days_before = nights[rows] - 1 - (np.arange(len(rows)) - first_rows)
+        output = stays.iloc[rows][MORNING_COLUMNS].reset_index(drop=True)
+        output.index = pd.DatetimeIndex(
+            stays['check_out_date'].to_numpy()[rows]
+            - pd.to_timedelta(days_before, unit='D'),
+            name='morning',
         )
-        stay_frames = [
-            pd.DataFrame.from_dict({
-                'morning': [
-                    row.check_out_date - timedelta(days=i)
-                    for i in reversed(range(row.nights))
-                ],
-                'stay_fid': [row.stay_fid] * row.nights,
-                'purpose': [row.purpose] * row.nights,
-                'type': [row.type] * row.nights,
-                'stay_location_fid': [row.stay_location_fid] * row.nights,
-                'city_fid': [row.city_fid] * row.nights,
-                'metro_fid': [row.metro_fid] * row.nights,
-                'region_fid': [row.region_fid] * row.nights,
-            })
-            for row in stays.itertuples()
-        ]
-        output = pd.concat(stay_frames, ignore_index=True)
-        output = output.set_index('morning')
-        return output
+        return output.astype({
+            col: dtype for col, dtype in self.dtypes.items()
+            if col in output.columns
+        })
+
+    def iter_mornings(self, chunk='year', start_morning=None,
+        thru_morning=None,
+    ):
+        """
+        Yields the mornings away from home in date order, in DataFrames
+        like those returned by mornings(), reading the stays from the
+        backend a chunk at a time so that memory use is bounded however
+        long the log is.
+
+        The results are not cached; use mornings() for repeated queries
+        on logs that fit in memory.
+
+        Args:
+            chunk (str or int): `year` to yield each calendar year's
+                mornings as one DataFrame, or a number of mornings per
+                DataFrame (the last may be shorter).
+            start_morning (date): The first morning to include. Defaults
+                to the first morning of the log.
+            thru_morning (date): The last morning to include. Defaults to
+                the last morning of the log.
+
+        Yields:
+            DataFrame: The next chunk of mornings, indexed by morning.
+        """
+        if chunk != 'year' and not (isinstance(chunk, int) and chunk > 0):
+            raise ValueError(
+                f"Invalid chunk: {chunk} (use 'year' or a positive integer)"
+            )
+        start = None if start_morning is None \
+            else pd.Timestamp(start_morning)
+        thru = None if thru_morning is None else pd.Timestamp(thru_morning)
+
+        pending = None
+        for stays in self.backend.iter_stays():
+            mornings = self._expand_mornings(stays.astype(self.dtypes))
+            if mornings.empty:
+                continue
+            if thru is not None and mornings.index[0] > thru:
+                # Stays never share a morning, so no later stay can have
+                # a morning in range.
+                break
+            mornings = mornings.loc[start:thru]
+            if pending is not None:
+                mornings = pd.concat([pending, mornings])
+            if mornings.empty:
+                continue
+            if chunk == 'year':
+                # Every year before the last one present is complete.
+                years = mornings.index.year
+                complete = years < years[-1]
+                for _, year_mornings in mornings[complete].groupby(
+                    years[complete]
+                ):
+                    yield year_mornings
+                pending = mornings[~complete]
+            else:
+                full = len(mornings) - len(mornings) % chunk
+                for i in range(0, full, chunk):
+                    yield mornings.iloc[i:i + chunk]
+                pending = mornings.iloc[full:]
+
+        if pending is not None and not pending.empty:
+            yield pending
+
+    def _stays(self):
+        """
+        Returns a DataFrame with a row for each stay, with the fids of
+        its stay location, city, metro, and region.
+        """
+        return self.backend.stays().astype(self.dtypes)
 
     def mornings_by(self,
         by='location',
@@ -128,6 +386,15 @@ class LodgingLog:
         """
         if by not in ['location', 'city', 'metro', 'region']:
             raise ValueError(f"Invalid grouping type: {by}")
+        return self.query_cache.get_or_compute(
+            ('mornings_by', by, start_morning, thru_morning, exclude_transit),
+            lambda: self._mornings_by(
+                by, start_morning, thru_morning, exclude_transit
+            ),
+        )
+
+    def _mornings_by(self, by, start_morning, thru_morning, exclude_transit):
+        """Groups the mornings away from home by location type."""
         mornings = self.mornings().loc[start_morning:thru_morning]
         if exclude_transit:
             transit = ['Flight']
@@ -146,33 +413,79 @@ class LodgingLog:
 
         return mornings
 
+    def daily_timeline(self, start_morning=None, thru_morning=None,
+        distance_model='geodesic',
+    ):
+        """
+        Returns a DataFrame with a row for every morning, away or at
+        home, with the home in effect that morning and the distance from
+        it.
+
+        Args:
+            start_morning (date): The first morning to include. Defaults
+                to the first morning of the log.
+            thru_morning (date): The last morning to include. Defaults to
+                today.
+            distance_model (str): `geodesic` or `haversine`. See
+                modules.distance.distance_miles().
+        """
+        span = timeline.timeline_span(self, thru_morning)
+        start_morning = span[0] if start_morning is None \
+            else pd.Timestamp(start_morning)
+        return self.query_cache.get_or_compute(
+            ('daily_timeline', start_morning, span[1], distance_model),
+            lambda: timeline.build_timeline(
+                self, start_morning, span[1], distance_model
+            ),
+        )
+
+    def publish_timeline(self, path=None, name=None, start_morning=None,
+        thru_morning=None,
+    ):
+        """
+        Publishes the daily timeline for other processes to attach to
+        with SharedTimeline.attach(), instead of each rebuilding it.
+
+        Args:
+            path (Path): A file to memory-map. If omitted, the timeline is
+                published to a shared memory block.
+            name (str): The name of the shared memory block. Defaults to a
+                generated name.
+            start_morning (date): The first morning to include. Defaults
+                to the first morning of the log.
+            thru_morning (date): The last morning to include. Defaults to
+                today.
+
+        Returns:
+            SharedTimeline: The published timeline.
+        """
+        return shared_timeline.publish(
+            self.daily_timeline(start_morning, thru_morning), path, name
+        )
+
     def home_locations(self):
         """
         Returns a DataFrame with the location of home for each morning.
         Uses the home's city if available; otherwise, uses the home's
         stay_location.
         """
+        return self.query_cache.get_or_compute(
+            ('home_locations',), self._home_locations
+        )
+
+    def _home_locations(self):
+        """Reads the home locations from the lodging data."""
         def get_home_location(row):
             """Returns the home location based on city or stay_location."""
             if pd.notna(row.city_fid):
-                geom = self.geodata_cache['cities'].loc[row.city_fid].geometry
+                place = self.geodata_cache['cities'].loc[row.city_fid]
             else:
-                geom = self.geodata_cache['stay_locations'].loc[
+                place = self.geodata_cache['stay_locations'].loc[
                     row.stay_location_fid
-                ].geometry
-            return (geom.y, geom.x)
-
-        # Read an SQLite table into a DataFrame.
-        conn = sqlite3.connect(self.lodging_path)
-        query = """
-        SELECT homes.fid, move_in_date, stay_location_fid, city_fid
-        FROM homes
-        JOIN stay_locations on homes.stay_location_fid = stay_locations.fid
-        ORDER BY move_in_date
-        """
-        home_mornings = pd.read_sql_query(query, conn,
-            parse_dates=['move_in_date'], dtype={'fid': 'int64'},
-        )
+                ]
+            return (place['lat'], place['lon'])
+
+        home_mornings = self._homes()
         home_mornings[['lat', 'lon']] = home_mornings.apply(
             get_home_location,
             axis=1,
@@ -180,6 +493,15 @@ class LodgingLog:
         )
         return home_mornings
 
+    def _homes(self):
+        """
+        Returns a DataFrame with a row for each home, with the fids of
+        its stay location and city.
+        """
+        return self.backend.homes().astype(
+            {'fid': 'int64', 'city_fid': 'Int64'}
+        )
+
     def location_attrs(self, row, by):
         """Get the attributes of each location row."""
         priority = {
@@ -245,13 +567,12 @@ class LodgingLog:
                             col_vals[k] = type_fid
                         else:
                             col_vals[k] = record[v]
-                geometry = record.geometry
-                if geometry is None:
+                if pd.isna(record['lat']):
                     lat = pd.NA
                     lon = pd.NA
                 else:
-                    lat = geometry.y
-                    lon = geometry.x
+                    lat = record['lat']
+                    lon = record['lon']
                 return (
                     place_types[place_type]['name'],
                     f"{place_type}_{type_fid}",
@@ -263,91 +584,22 @@ class LodgingLog:
                 )
         return (pd.NA, pd.NA, pd.NA, pd.NA, pd.NA, pd.NA)
 
-    def _validate(self):
-        """Validates the LodgingLog data."""
-        conn = sqlite3.connect(self.lodging_path)
-        dtype = {'fid': 'int64'}
-        validations = [
-            # Check that every stay has a valid stay_location_fid.
-            {
-                'table': "stays",
-                'query': """
-                    SELECT fid, stay_location_fid FROM stays
-                    WHERE stay_location_fid IS NULL OR stay_location_fid
-                    NOT IN (
-                        SELECT fid FROM stay_locations
-                    )
-                """,
-                'error': "Invalid or null stay_location_fid",
-            },
-            # Check that every home has a valid stay_location_fid.
-            {
-                'table': "homes",
-                'query': """
-                    SELECT fid, stay_location_fid FROM homes
-                    WHERE stay_location_fid IS NULL OR stay_location_fid
-                    NOT IN (
-                        SELECT fid FROM stay_locations
-                    )
-                """,
-                'error': "Invalid or null stay_location_fid",
-            },
-            # Check that every stay_location has a valid or null city_fid.
-            {
-                'table': "stay_locations",
-                'query': """
-                    SELECT fid, city_fid FROM stay_locations
-                    WHERE city_fid IS NOT NULL AND city_fid NOT IN (
-                        SELECT fid FROM cities
-                    )
-                """,
-                'error': "Invalid city_fid",
-            },
-            ## Check that every stay_location has a valid type.
-            {
-                'table': "stay_locations",
-                'query': """
-                    SELECT fid, type FROM stay_locations
-                    WHERE type NOT IN ('Hotel', 'STR', 'Residence', 'Flight')
-                    OR type IS NULL
-                """,
-                'error': (
-                    "Type must be one of 'Hotel', 'STR', 'Residence', or "
-                    "'Flight'"
-                ),
-            },
-            ## Check that every city has a valid or null metro_fid.
-            {
-                'table': "cities", 'query': """
-                    SELECT fid, metro_fid FROM cities
-                    WHERE metro_fid IS NOT NULL AND metro_fid NOT IN (
-                        SELECT fid FROM metros
-                    )
-                """,
-                'error': "Invalid metro_fid",
-            },
-            ## Check that every city has a valid or null region_fid.
-            {
-                'table': "cities",
-                'query': """
-                    SELECT fid, region_fid FROM cities
-                    WHERE region_fid IS NOT NULL AND region_fid NOT IN (
-                        SELECT fid FROM regions
-                    )
-                """,
-                'error': "Invalid region_fid",
-            },
-        ]
-        for validation in validations:
-            query = validation['query']
-            invalid_data = pd.read_sql_query(query, conn, dtype=dtype)
-            if not invalid_data.empty:
-                table = validation['table']
-                error = validation['error']
-                raise ValueError(
-                    f"Invalid data found in {table} ({error}):\n"
-                    f"{invalid_data.to_string(index=False)}"
-                )
+    def _validate(self, force=False):
+        """
+        Validates the LodgingLog data.
+
+        Validation is skipped if the backend's data has not changed since
+        its last successful validation, unless force is True. Backends
+        that cannot be fingerprinted are validated every time.
+        """
+        data_fingerprint = self.backend.fingerprint()
+        cache = validation.ValidationCache(CACHE_DIR / "validation.json")
+        if (not force and data_fingerprint is not None
+            and cache.is_current(self.lodging_path, data_fingerprint)):
+            return True
 
-        conn.close()
+        report = self.backend.validate()
+        report.raise_if_invalid()
+        if data_fingerprint is not None:
+            cache.record(self.lodging_path, data_fingerprint)
         return True
@@ -0,0 +1,190 @@
+"""
+Runs a graph of report stages, computing each shared stage once and
+running the output stages concurrently on a process pool.
+"""
+
+# Standard library imports
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Third-party imports
+import pandas as pd
+
+# Results of the shared stages, set in each worker process by the pool
+# initializer so they are sent once per worker rather than once per task.
+_worker_results = {}
+
+class Pipeline:
+    """
+    A dependency graph of stages. Shared stages are computed once, in
+    this process, in dependency order; output stages are the leaves of
+    the graph and run on a process pool once every shared stage they
+    depend on is ready.
+
+    Each stage is a function called with the results of its dependencies
+    as positional arguments, in the order the dependencies are listed.
+    Output stage functions must be picklable (defined at module level, or
+    a functools.partial of one).
+    """
+
+    def __init__(self, workers=None):
+        """
+        Initializes the Pipeline.
+
+        Args:
+            workers (int): The number of worker processes for output
+                stages. Defaults to the number of CPUs. Use 1 to run
+                output stages in this process.
+        """
+        self.workers = workers
+        self._stages = {}
+        self._outputs = {}
+        self._results = {}
+        self.timings = []
+
+    def add_stage(self, key, func, deps=(), tables=()):
+        """
+        Adds a shared stage. Adding a key that already exists does
+        nothing, so several outputs can declare the same stage.
+
+        Args:
+            key (tuple): A hashable key for the stage, such as the stage
+                name followed by its parameters.
+            func (callable): Computes the stage's result.
+            deps (list): The keys of the stages this stage depends on.
+            tables (iterable): The names of the source tables the stage
+                reads directly, used to find the outputs affected by a
+                change.
+        """
+        self._stages.setdefault(key, (func, tuple(deps), frozenset(tables)))
+
+    def add_output(self, name, func, deps=()):
+        """
+        Adds an output stage.
+
+        Args:
+            name (str): A unique name for the output.
+            func (callable): Writes the output. Its return value is
+                ignored.
+            deps (list): The keys of the shared stages it depends on.
+        """
+        if name in self._outputs:
+            raise ValueError(f"Duplicate output: {name}")
+        self._outputs[name] = (func, tuple(deps))
+
+    def run(self, changed=None):
+        """
+        Computes the shared stages and runs the output stages. Shared
+        stage results are kept only for the duration of the run.
+
+        Args:
+            changed (set): The names of the source tables changed since
+                the last run. Only the outputs that depend on one of them
+                are run. Defaults to running every output.
+
+        Returns:
+            DataFrame: The timing of each stage, with stage, kind
+            (`shared` or `output`), seconds, and error columns, in the
+            order the stages finished. Errors in output stages are
+            recorded rather than raised, so one failed output does not
+            stop the others.
+        """
+        self.timings = []
+        self._results = {}
+        outputs = {
+            name: output for name, output in self._outputs.items()
+            if changed is None or self.output_tables(name) & set(changed)
+        }
+        # Only the results the outputs use are sent to the workers.
+        results = {
+            dep: self._compute(dep, ())
+            for _, deps in outputs.values()
+            for dep in deps
+        }
+
+        if self.workers == 1:
+            _set_worker_results(results)
+            for name, (func, deps) in outputs.items():
+                self._record(name, 'output', *_run_output(func, deps))
+        elif outputs:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_set_worker_results,
+                initargs=(results,),
+            ) as executor:
+                futures = {
+                    executor.submit(_run_output, func, deps): name
+                    for name, (func, deps) in outputs.items()
+                }
+                for future in as_completed(futures):
+                    seconds, error = future.result()
+                    self._record(futures[future], 'output', seconds, error)
+
+        return pd.DataFrame(
+            self.timings, columns=['stage', 'kind', 'seconds', 'error'],
+        )
+
+    def output_tables(self, name):
+        """Returns the source tables an output depends on."""
+        tables = set()
+        pending = list(self._outputs[name][1])
+        seen = set()
+        while pending:
+            key = pending.pop()
+            if key in seen or key not in self._stages:
+                continue
+            seen.add(key)
+            _, deps, stage_tables = self._stages[key]
+            tables |= stage_tables
+            pending.extend(deps)
+        return tables
+
+    def _compute(self, key, path):
+        """Computes a shared stage and its dependencies, once each."""
+        if key in self._results:
+            return self._results[key]
+        if key in path:
+            cycle = " -> ".join(str(k) for k in path + (key,))
+            raise ValueError(f"Stage dependency cycle: {cycle}")
+        if key not in self._stages:
+            raise ValueError(f"Unknown stage: {key}")
+
+        func, deps, _ = self._stages[key]
+        args = [self._compute(dep, path + (key,)) for dep in deps]
+        start = time.perf_counter()
+        self._results[key] = func(*args)
+        self._record(_stage_name(key), 'shared',
+            time.perf_counter() - start, None,
+        )
+        return self._results[key]
+
+    def _record(self, stage, kind, seconds, error):
+        """Records the timing of a stage."""
+        self.timings.append((stage, kind, seconds, error))
+
+
+def _stage_name(key):
+    """Returns a readable name for a stage key."""
+    name, *params = key
+    params = [str(param) for param in params if param is not None]
+    return f"{name}({', '.join(params)})" if params else name
+
+
+def _set_worker_results(results):
+    """Stores the shared stage results in a worker process."""
+    global _worker_results
+    _worker_results = results
+
+
+def _run_output(func, deps):
+    """
+    Runs an output stage with the shared stage results, and returns its
+    elapsed seconds and error message (None if it succeeded).
+    """
+    start = time.perf_counter()
+    try:
+        func(*[_worker_results[dep] for dep in deps])
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, error
@@ -0,0 +1,127 @@
+"""Defines the QueryCache class for memoizing DataFrame results."""
+
+# Standard library imports
+import threading
+from collections import OrderedDict
+
+# Third-party imports
+import pandas as pd
+
+class QueryCache:
+    """
+    A least-recently-used cache of DataFrames, bounded by the total
+    memory used by the cached frames.
+
+    Callers always receive a copy of the cached frame, so modifying a
+    returned frame never changes the cache. When pandas copy-on-write is
+    enabled the copy is lazy and costs nothing until it is modified.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Initializes the QueryCache.
+
+        Args:
+            max_bytes (int): The memory budget for cached frames. Use 0
+                to disable caching.
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key: (frame, size in bytes)
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        """Returns a string representation of the QueryCache."""
+        return (
+            f"QueryCache(entries={len(self._entries)}, "
+            f"bytes={self._bytes}, max_bytes={self.max_bytes})"
+        )
+
+    def __getstate__(self):
+        """Returns the picklable state of the QueryCache."""
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        """Restores the QueryCache from its pickled state."""
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns a copy of the cached frame for key, calling compute() to
+        create and cache it if it is not already cached.
+
+        Args:
+            key (tuple): A hashable key for the frame.
+            compute (callable): A function returning the DataFrame.
+
+        Returns:
+            DataFrame: A copy of the cached DataFrame.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._copy(self._entries[key][0])
+            self._misses += 1
+
+        frame = compute()
+        self._put(key, frame)
+        return self._copy(frame)
+
+    def clear(self):
+        """Removes every cached frame."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def discard(self, names):
+        """
+        Removes every cached frame whose key starts with one of the given
+        query names.
+
+        Args:
+            names (iterable): The query names, such as `mornings`.
+        """
+        names = set(names)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in names]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        """
+        Returns a dict of cache statistics: entries, bytes, max_bytes,
+        hits, misses, and evictions.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+            }
+
+    def _put(self, key, frame):
+        """Caches a frame, evicting the least recently used frames."""
+        size = int(frame.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self._evictions += 1
+
+    def _copy(self, frame):
+        """Returns a copy of a frame that is safe to hand to callers."""
+        return frame.copy(deep=pd.get_option('mode.copy_on_write') is not True)
@@ -0,0 +1,248 @@
+"""
+Publishes a daily timeline as a fixed-width array in a memory-mapped
+file or a shared memory block, so that several processes can read one
+copy of it without rebuilding or copying it.
+"""
+
+# Standard library imports
+import json
+import struct
+from multiprocessing import shared_memory
+from pathlib import Path
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# First-party imports
+from modules.timeline import TIMELINE_COLUMNS
+
+MAGIC = b"LODGTL01"
+ALIGNMENT = 64
+
+# Text columns are stored as codes: 0 for a missing value, otherwise one
+# more than the value's position in the header's list of categories.
+CODED_COLUMNS = ['status', 'purpose', 'type']
+
+# One record per morning, in morning order with no gaps. Missing ids are
+# stored as -1; missing coordinates and distances as NaN.
+DTYPE = np.dtype([
+    (col, 'u1' if col in CODED_COLUMNS else
+        'i8' if sql_type == 'INTEGER' else 'f8')
+    for col, sql_type in TIMELINE_COLUMNS.items()
+    if col != 'morning'
+])
+
+def publish(timeline, path=None, name=None):
+    """
+    Writes a timeline to a memory-mapped file, or to a new shared memory
+    block if no path is given.
+
+    Args:
+        timeline (DataFrame): A timeline from build_timeline(), with one
+            row for every morning in its range.
+        path (Path): The file to write.
+        name (str): The name of the shared memory block. Defaults to a
+            generated name.
+
+    Returns:
+        SharedTimeline: The published timeline. The publisher must keep
+        it open while readers are attached, and unlink() a shared memory
+        block when it is no longer needed.
+    """
+    start = timeline.index.min() if len(timeline) else pd.Timestamp(0)
+    expected = pd.date_range(start, periods=len(timeline), freq='D')
+    if not timeline.index.equals(expected):
+        raise ValueError("Timeline must have one row for every morning.")
+
+    records = np.empty(len(timeline), dtype=DTYPE)
+    categories = {}
+    for col in DTYPE.names:
+        values = timeline[col]
+        if col in CODED_COLUMNS:
+            codes, uniques = pd.factorize(values, sort=True)
+            records[col] = codes + 1
+            categories[col] = [str(value) for value in uniques]
+        elif DTYPE[col].kind == 'i':
+            records[col] = values.fillna(-1).to_numpy('int64')
+        else:
+            records[col] = values.to_numpy('float64', na_value=np.nan)
+
+    header = _header({
+        'start': start.strftime("%Y-%m-%d"),
+        'rows': len(records),
+        'categories': categories,
+    })
+    size = len(header) + records.nbytes
+
+    if path is not None:
+        path = Path(path)
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(records.tobytes())
+        return SharedTimeline.attach(path=path)
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    shm.buf[:len(header)] = header
+    shm.buf[len(header):size] = records.tobytes()
+    return SharedTimeline(shm)
+
+
+def _header(meta):
+    """Returns the header bytes, padded so the records are aligned."""
+    body = json.dumps(meta).encode('utf-8')
+    header = MAGIC + struct.pack('<I', len(body)) + body
+    padding = -len(header) % ALIGNMENT
+    return header + b"\0" * padding
+
+
+def _read_header(buffer):
+    """Returns the metadata and record offset of a published timeline."""
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a published timeline.")
+    length = struct.unpack('<I', bytes(buffer[len(MAGIC):len(MAGIC) + 4]))[0]
+    start = len(MAGIC) + 4
+    meta = json.loads(bytes(buffer[start:start + length]))
+    offset = start + length
+    return meta, offset + (-offset % ALIGNMENT)
+
+
+class SharedTimeline:
+    """
+    A read-only view of a published timeline. The records array maps
+    the file or shared memory block directly, without copying it.
+    """
+
+    def __init__(self, source):
+        """
+        Initializes the SharedTimeline. Use publish() or attach() rather
+        than calling this directly.
+
+        Args:
+            source (Path or SharedMemory): The file or shared memory block.
+        """
+        if isinstance(source, shared_memory.SharedMemory):
+            self.shm = source
+            self.path = None
+            buffer = np.frombuffer(source.buf, dtype='u1')
+        else:
+            self.shm = None
+            self.path = Path(source)
+            buffer = np.memmap(self.path, dtype='u1', mode='r')
+        meta, offset = _read_header(buffer)
+        self.records = buffer[offset:offset + meta['rows'] * DTYPE.itemsize] \
+            .view(DTYPE)
+        self.records.flags.writeable = False
+        self.start = pd.Timestamp(meta['start'])
+        self.categories = meta['categories']
+
+    def __repr__(self):
+        """Returns a string representation of the SharedTimeline."""
+        source = self.path if self.shm is None else self.shm.name
+        return f"SharedTimeline(source={source}, rows={len(self.records)})"
+
+    def __enter__(self):
+        """Returns the SharedTimeline when entering a context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes the SharedTimeline when leaving a context."""
+        self.close()
+
+    @property
+    def name(self):
+        """Returns the shared memory block name, or None for a file."""
+        return None if self.shm is None else self.shm.name
+
+    @classmethod
+    def attach(cls, path=None, name=None):
+        """
+        Attaches to a timeline published by another process.
+
+        Before Python 3.13, processes attaching to a shared memory block
+        should be started after it is published, so that they share the
+        publisher's resource tracker; unrelated processes should attach
+        to a file instead.
+
+        Args:
+            path (Path): The memory-mapped file.
+            name (str): The name of the shared memory block.
+
+        Returns:
+            SharedTimeline: The attached timeline.
+        """
+        if path is not None:
+            return cls(path)
+        try:
+            # Only the publisher should remove the block (Python 3.13+).
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Older versions track attached blocks too. Worker processes
+            # started by the publisher share its resource tracker, so the
+            # block is still only removed once every process has exited.
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm)
+
+    def index_of(self, morning):
+        """Returns the record index of a morning."""
+        return (pd.Timestamp(morning) - self.start).days
+
+    def mornings(self):
+        """Returns the morning of each record."""
+        return pd.date_range(self.start, periods=len(self.records),
+            freq='D', name='morning',
+        )
+
+    def decode(self, col, codes):
+        """Returns the values of a coded column from their codes."""
+        categories = np.array(
+            [np.nan] + self.categories[col], dtype=object
+        )
+        return categories[codes]
+
+    def to_frame(self, start_morning=None, thru_morning=None):
+        """
+        Returns a range of the timeline as a DataFrame, matching the
+        output of build_timeline().
+
+        Args:
+            start_morning (date): The first morning. Defaults to the
+                first published morning.
+            thru_morning (date): The last morning. Defaults to the last
+                published morning.
+        """
+        first = 0 if start_morning is None \
+            else max(self.index_of(start_morning), 0)
+        last = len(self.records) if thru_morning is None \
+            else min(self.index_of(thru_morning) + 1, len(self.records))
+        last = max(first, last)
+        records = self.records[first:last]
+
+        columns = {}
+        for col in DTYPE.names:
+            values = records[col]
+            if col in CODED_COLUMNS:
+                columns[col] = self.decode(col, values)
+            elif DTYPE[col].kind == 'i':
+                columns[col] = pd.arrays.IntegerArray(
+                    np.array(values), values < 0
+                )
+            else:
+                columns[col] = np.array(values)
+        return pd.DataFrame(columns, index=self.mornings()[first:last])
+
+    def close(self):
+        """
+        Detaches from the file or shared memory block. Arrays taken from
+        records must be released first.
+        """
+        self.records = None
+        if self.shm is not None:
+            self.shm.close()
+
+    def unlink(self):
+        """Removes the published shared memory block or file."""
+        if self.shm is not None:
+            self.shm.unlink()
+        elif self.path is not None:
+            self.path.unlink(missing_ok=True)
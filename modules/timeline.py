@@ -0,0 +1,502 @@
+"""
+Builds a timeline with one row per morning, and materializes it as a
+table in the GeoPackage or in a separate SQLite file.
+"""
+
+# Standard library imports
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+# Third-party imports
+import numpy as np
+import pandas as pd
+
+# First-party imports
+from modules.distance import distance_miles
+
+TIMELINE_TABLE = 'daily_timeline'
+
+# Records a signature of each stay and home used to build the
+# materialized timeline, so a refresh can find what has changed.
+SOURCES_TABLE = 'daily_timeline_sources'
+
+# The timeline columns and their SQLite types.
+TIMELINE_COLUMNS = {
+    'morning': 'DATE',
+    'status': 'TEXT',
+    'stay_fid': 'INTEGER',
+    'purpose': 'TEXT',
+    'type': 'TEXT',
+    'stay_location_fid': 'INTEGER',
+    'city_fid': 'INTEGER',
+    'metro_fid': 'INTEGER',
+    'region_fid': 'INTEGER',
+    'lat': 'REAL',
+    'lon': 'REAL',
+    'home_fid': 'INTEGER',
+    'home_lat': 'REAL',
+    'home_lon': 'REAL',
+    'distance_mi': 'REAL',
+}
+ID_COLUMNS = [
+    col for col, sql_type in TIMELINE_COLUMNS.items()
+    if sql_type == 'INTEGER'
+]
+
+def build_timeline(log, start_morning, thru_morning,
+    distance_model='geodesic',
+):
+    """
+    Returns a DataFrame with a row for every morning in a range, whether
+    away or at home.
+
+    Away mornings have the stay's fid, purpose, type, and place fids,
+    and the coordinates of its city (or of its stay location, if it has
+    no city). Every morning has the home in effect that morning: the
+    home with the latest move in date before the morning. distance_mi is
+    the distance from that home, and is 0 for mornings at home.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        start_morning (date): The first morning to include.
+        thru_morning (date): The last morning to include.
+        distance_model (str): `geodesic` or `haversine`. See
+            modules.distance.distance_miles().
+
+    Returns:
+        DataFrame: The timeline, indexed by morning.
+    """
+    mornings = pd.date_range(start_morning, thru_morning, freq='D',
+        name='morning',
+    )
+    away = log.mornings().loc[
+        pd.Timestamp(start_morning):pd.Timestamp(thru_morning)
+    ]
+    timeline = pd.DataFrame(index=mornings).join(away[[
+        'stay_fid', 'purpose', 'type', 'stay_location_fid', 'city_fid',
+        'metro_fid', 'region_fid',
+    ]])
+    is_away = timeline['stay_fid'].notna().to_numpy()
+    timeline.insert(0, 'status', np.where(is_away, 'away', 'home'))
+
+    timeline[['lat', 'lon']] = place_coords(log, timeline)
+
+    homes = log.home_locations()[['move_in_date', 'fid', 'lat', 'lon']] \
+        .rename(columns={
+            'fid': 'home_fid', 'lat': 'home_lat', 'lon': 'home_lon'
+        })
+    timeline = pd.merge_asof(
+        timeline.reset_index(),
+        homes.astype({'move_in_date': timeline.index.dtype}),
+        left_on='morning',
+        right_on='move_in_date',
+        allow_exact_matches=False,
+    ).drop(columns='move_in_date').set_index('morning')
+
+    timeline['distance_mi'] = np.where(
+        is_away,
+        distance_miles(
+            timeline['home_lat'], timeline['home_lon'],
+            timeline['lat'], timeline['lon'],
+            distance_model,
+        ),
+        0.0,
+    )
+    return timeline.astype({col: 'Int64' for col in ID_COLUMNS})
+
+
+def timeline_span(log, thru_morning=None):
+    """
+    Returns the first and last mornings of a log's timeline: from the
+    earlier of the first morning away and the first morning after moving
+    into the first home, through thru_morning (today, by default).
+    """
+    firsts = []
+    mornings = log.mornings()
+    if len(mornings):
+        firsts.append(mornings.index.min())
+    homes = log.home_locations()
+    if len(homes):
+        firsts.append(homes['move_in_date'].min() + timedelta(days=1))
+    if thru_morning is None:
+        thru_morning = date.today()
+    if not firsts:
+        return (pd.Timestamp(thru_morning), pd.Timestamp(thru_morning))
+    return (min(firsts), pd.Timestamp(thru_morning))
+
+
+def source_signatures(log):
+    """
+    Returns a DataFrame with a signature of each stay and each home,
+    covering every value that the timeline reads from it.
+
+    Stay rows have the first and last mornings of the stay; home rows
+    have the move in date as their first morning.
+    """
+    stays = log.mornings().reset_index().groupby('stay_fid').agg(
+        first_morning=('morning', 'min'),
+        last_morning=('morning', 'max'),
+    )
+    stay_values = _stay_values(log)
+    stays = stays.join(stay_values).reset_index()
+    stays['signature'] = _hash_rows(stays.drop(columns='stay_fid'))
+    stays = stays.rename(columns={'stay_fid': 'fid'})
+    stays['kind'] = 'stay'
+
+    homes = log.home_locations()[['fid', 'move_in_date', 'lat', 'lon']]
+    homes = homes.rename(columns={'move_in_date': 'first_morning'})
+    homes['signature'] = _hash_rows(homes.drop(columns='fid'))
+    homes['last_morning'] = pd.NaT
+    homes['kind'] = 'home'
+
+    columns = ['kind', 'fid', 'signature', 'first_morning', 'last_morning']
+    return pd.concat([stays[columns], homes[columns]], ignore_index=True)
+
+
+def _stay_values(log):
+    """
+    Returns the timeline values of each stay's mornings, indexed by
+    stay fid.
+    """
+    columns = [
+        'purpose', 'type', 'stay_location_fid', 'city_fid', 'metro_fid',
+        'region_fid',
+    ]
+    stays = log.mornings().groupby('stay_fid')[columns].first()
+    stays[['lat', 'lon']] = place_coords(log, stays)
+    return stays
+
+
+def place_coords(log, df):
+    """
+    Returns a DataFrame with the lat and lon of each row's city, or of
+    its stay location if it has no city.
+
+    Args:
+        log (LodgingLog): The lodging log to read places from.
+        df (DataFrame): A frame with city_fid and stay_location_fid
+            columns.
+    """
+    cities = log.geodata_cache['cities']
+    stay_locations = log.geodata_cache['stay_locations']
+    has_city = df['city_fid'].notna()
+    return pd.DataFrame({
+        col: df['city_fid'].map(cities[col]).where(
+            has_city, df['stay_location_fid'].map(stay_locations[col]),
+        ).astype('float64')
+        for col in ['lat', 'lon']
+    }, index=df.index)
+
+
+def _hash_rows(df):
+    """Returns a hex digest of the values in each row of a DataFrame."""
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    return [f"{value:016x}" for value in hashes]
+
+
+def changed_ranges(old, new, span):
+    """
+    Returns the inclusive ranges of mornings whose timeline rows may
+    differ between two sets of source signatures.
+
+    Args:
+        old (DataFrame): The signatures the stored timeline was built
+            from.
+        new (DataFrame): The current signatures.
+        span (tuple): The first and last mornings of the new timeline.
+
+    Returns:
+        list: Merged (first, last) morning tuples within span.
+    """
+    merged = old.merge(new, on=['kind', 'fid'], how='outer',
+        suffixes=('_old', '_new'),
+    )
+    changed = merged[merged['signature_old'] != merged['signature_new']]
+    ranges = []
+
+    # A changed stay affects its old and new mornings.
+    stays = changed[changed['kind'] == 'stay']
+    for suffix in ['_old', '_new']:
+        rows = stays.dropna(subset=[f"first_morning{suffix}"])
+        ranges.extend(zip(
+            rows[f"first_morning{suffix}"], rows[f"last_morning{suffix}"]
+        ))
+
+    # A changed home affects the mornings after its old and new move in
+    # dates, through the next move in date of an unchanged home.
+    move_ins = new.loc[new['kind'] == 'home', 'first_morning'] \
+        .sort_values().to_numpy()
+    homes = changed[changed['kind'] == 'home']
+    for row in homes.itertuples():
+        dates = [
+            d for d in (row.first_morning_old, row.first_morning_new)
+            if pd.notna(d)
+        ]
+        later = move_ins[move_ins > np.datetime64(max(dates))]
+        last = pd.Timestamp(later[0]) if len(later) else span[1]
+        ranges.append((min(dates) + timedelta(days=1), last))
+
+    return merge_ranges(ranges, span)
+
+
+def merge_ranges(ranges, span):
+    """
+    Clips ranges of mornings to a span and merges ranges that overlap or
+    touch.
+    """
+    merged = []
+    for first, last in sorted(
+        (max(pd.Timestamp(first), span[0]), min(pd.Timestamp(last), span[1]))
+        for first, last in ranges
+    ):
+        if first > last:
+            continue
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class TimelineStore:
+    """
+    A materialized daily timeline in an SQLite database: either a
+    separate SQLite file, or the lodging GeoPackage itself.
+
+    When stored in a GeoPackage, the timeline table is registered as an
+    attributes table in gpkg_contents so GIS software can open it. The
+    signatures table is internal and left unregistered.
+    """
+
+    def __init__(self, path, geopackage=False):
+        """
+        Initializes the TimelineStore.
+
+        Args:
+            path (Path): The SQLite file. It is created if it does not
+                exist, unless it is a GeoPackage.
+            geopackage (bool): Whether the file is a GeoPackage.
+        """
+        self.path = Path(path).expanduser()
+        self.geopackage = geopackage
+
+    def __repr__(self):
+        """Returns a string representation of the TimelineStore."""
+        return (
+            f"TimelineStore(path={self.path}, geopackage={self.geopackage})"
+        )
+
+    def refresh(self, log, full=False, thru_morning=None):
+        """
+        Updates the stored timeline to match a lodging log, rebuilding
+        only the mornings affected by stays and homes that changed since
+        the last refresh.
+
+        Args:
+            log (LodgingLog): The lodging log to read.
+            full (bool): Whether to rebuild the whole timeline.
+            thru_morning (date): The last morning of the timeline.
+                Defaults to today.
+
+        Returns:
+            dict: The refreshed ranges and the number of rows written.
+        """
+        span = timeline_span(log, thru_morning)
+        signatures = source_signatures(log)
+
+        with self._connect() as conn:
+            exists = self._table_exists(conn, TIMELINE_TABLE)
+            if full or not exists:
+                self._create_tables(conn)
+                ranges = [span]
+                conn.execute(f"DELETE FROM {TIMELINE_TABLE}")
+            else:
+                ranges = self._stale_ranges(conn, signatures, span)
+                conn.execute(
+                    f"DELETE FROM {TIMELINE_TABLE} "
+                    "WHERE morning < ? OR morning > ?",
+                    (_iso(span[0]), _iso(span[1])),
+                )
+
+            rows = 0
+            for first, last in ranges:
+                conn.execute(
+                    f"DELETE FROM {TIMELINE_TABLE} "
+                    "WHERE morning BETWEEN ? AND ?",
+                    (_iso(first), _iso(last)),
+                )
+                timeline = build_timeline(log, first, last)
+                rows += self._insert(conn, timeline)
+
+            self._write_signatures(conn, signatures)
+            if self.geopackage:
+                conn.execute(
+                    "UPDATE gpkg_contents SET last_change = "
+                    "strftime('%Y-%m-%dT%H:%M:%fZ', 'now') "
+                    "WHERE table_name = ?",
+                    (TIMELINE_TABLE,),
+                )
+        return {'ranges': ranges, 'rows': rows}
+
+    def read(self, start_morning=None, thru_morning=None):
+        """
+        Reads the stored timeline for a range of mornings.
+
+        Args:
+            start_morning (date): The first morning to read. Defaults to
+                the first stored morning.
+            thru_morning (date): The last morning to read. Defaults to
+                the last stored morning.
+
+        Returns:
+            DataFrame: The timeline, indexed by morning.
+        """
+        columns = ", ".join(TIMELINE_COLUMNS)
+        query = f"SELECT {columns} FROM {TIMELINE_TABLE} WHERE 1 = 1"
+        params = []
+        if start_morning is not None:
+            query += " AND morning >= ?"
+            params.append(_iso(start_morning))
+        if thru_morning is not None:
+            query += " AND morning <= ?"
+            params.append(_iso(thru_morning))
+        with self._connect() as conn:
+            df = pd.read_sql_query(f"{query} ORDER BY morning", conn,
+                params=params, parse_dates=['morning'],
+            )
+        # Match build_timeline(), which has NaN for missing text.
+        for col in ['purpose', 'type']:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+        return df.astype({col: 'Int64' for col in ID_COLUMNS}) \
+            .set_index('morning')
+
+    def _connect(self):
+        """Returns a connection that commits when its context exits."""
+        if self.geopackage and not self.path.is_file():
+            raise FileNotFoundError(f"GeoPackage not found: {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return _ClosingConnection(self.path)
+
+    def _table_exists(self, conn, table):
+        """Returns True if a table exists in the database."""
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone() is not None
+
+    def _create_tables(self, conn):
+        """Creates the timeline and signature tables if needed."""
+        columns = ", ".join(
+            f'"{col}" {sql_type}' for col, sql_type in TIMELINE_COLUMNS.items()
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {TIMELINE_TABLE} ("
+            "fid INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL, "
+            f"{columns})"
+        )
+        conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {TIMELINE_TABLE}_morning "
+            f"ON {TIMELINE_TABLE} (morning)"
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {SOURCES_TABLE} ("
+            "kind TEXT NOT NULL, fid INTEGER NOT NULL, "
+            "signature TEXT NOT NULL, first_morning DATE, last_morning DATE, "
+            "PRIMARY KEY (kind, fid))"
+        )
+        if self.geopackage:
+            conn.execute(
+                "INSERT OR IGNORE INTO gpkg_contents "
+                "(table_name, data_type, identifier, description) "
+                "VALUES (?, 'attributes', ?, ?)",
+                (
+                    TIMELINE_TABLE,
+                    TIMELINE_TABLE,
+                    "One row per morning, away or at home.",
+                ),
+            )
+
+    def _stale_ranges(self, conn, signatures, span):
+        """
+        Returns the ranges of mornings to rebuild: those affected by
+        changed stays and homes, and any mornings in the span that are
+        not yet stored.
+        """
+        old = pd.read_sql_query(
+            f"SELECT kind, fid, signature, first_morning, last_morning "
+            f"FROM {SOURCES_TABLE}",
+            conn,
+            parse_dates=['first_morning', 'last_morning'],
+        )
+        ranges = changed_ranges(old, signatures, span)
+
+        stored = conn.execute(
+            f"SELECT MIN(morning), MAX(morning) FROM {TIMELINE_TABLE}"
+        ).fetchone()
+        if stored[0] is None:
+            return [span]
+        stored = (pd.Timestamp(stored[0]), pd.Timestamp(stored[1]))
+        ranges.append((span[0], stored[0] - timedelta(days=1)))
+        ranges.append((stored[1] + timedelta(days=1), span[1]))
+        return merge_ranges(ranges, span)
+
+    def _insert(self, conn, timeline):
+        """Inserts timeline rows and returns the number inserted."""
+        df = timeline.reset_index()
+        df['morning'] = df['morning'].dt.strftime("%Y-%m-%d")
+        df = df[list(TIMELINE_COLUMNS)].astype(object)
+        df = df.where(df.notna(), None)
+        columns = ", ".join(f'"{col}"' for col in TIMELINE_COLUMNS)
+        placeholders = ", ".join("?" for _ in TIMELINE_COLUMNS)
+        conn.executemany(
+            f"INSERT INTO {TIMELINE_TABLE} ({columns}) "
+            f"VALUES ({placeholders})",
+            df.itertuples(index=False, name=None),
+        )
+        return len(df)
+
+    def _write_signatures(self, conn, signatures):
+        """Replaces the stored signatures."""
+        conn.execute(f"DELETE FROM {SOURCES_TABLE}")
+        rows = [
+            (
+                row.kind,
+                int(row.fid),
+                row.signature,
+                _iso(row.first_morning),
+                None if pd.isna(row.last_morning) else _iso(row.last_morning),
+            )
+            for row in signatures.itertuples()
+        ]
+        conn.executemany(
+            f"INSERT INTO {SOURCES_TABLE} VALUES (?, ?, ?, ?, ?)", rows
+        )
+
+
+class _ClosingConnection:
+    """
+    An sqlite3 connection context that commits (or rolls back) and then
+    closes the connection.
+    """
+
+    def __init__(self, path):
+        """Opens the connection."""
+        self.conn = sqlite3.connect(path)
+
+    def __enter__(self):
+        """Returns the open connection."""
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Commits or rolls back the transaction and closes."""
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.conn.close()
+
+
+def _iso(morning):
+    """Returns a morning as a YYYY-MM-DD string."""
+    return pd.Timestamp(morning).strftime("%Y-%m-%d")
@@ -0,0 +1,394 @@
+"""Validates the referential integrity of a lodging GeoPackage."""
+
+# Standard library imports
+import hashlib
+import heapq
+import json
+import os
+from pathlib import Path
+
+# Third-party imports
+import pandas as pd
+
+STAY_LOCATION_TYPES = ['Hotel', 'STR', 'Residence', 'Flight']
+
+# Increment when checks outside of VALIDATION_RULES change, so that
+# cached validation results are invalidated.
+VALIDATION_VERSION = 2
+
+OVERLAP_ERROR = "Stays cover the same morning"
+OVERLAP_QUERY = "SELECT fid, check_out_date, nights FROM stays"
+
+# Each rule checks one column of one table. Rules with a `references`
+# table require the column to match a fid in that table; rules with an
+# `allowed` list require the column to be one of the listed values.
+VALIDATION_RULES = [
+    # Check that every stay has a valid stay_location_fid.
+    {
+        'table': "stays",
+        'column': "stay_location_fid",
+        'references': "stay_locations",
+        'nullable': False,
+        'error': "Invalid or null stay_location_fid",
+    },
+    # Check that every home has a valid stay_location_fid.
+    {
+        'table': "homes",
+        'column': "stay_location_fid",
+        'references': "stay_locations",
+        'nullable': False,
+        'error': "Invalid or null stay_location_fid",
+    },
+    # Check that every stay_location has a valid or null city_fid.
+    {
+        'table': "stay_locations",
+        'column': "city_fid",
+        'references': "cities",
+        'nullable': True,
+        'error': "Invalid city_fid",
+    },
+    # Check that every stay_location has a valid type.
+    {
+        'table': "stay_locations",
+        'column': "type",
+        'allowed': STAY_LOCATION_TYPES,
+        'nullable': False,
+        'error': (
+            "Type must be one of 'Hotel', 'STR', 'Residence', or 'Flight'"
+        ),
+    },
+    # Check that every city has a valid or null metro_fid.
+    {
+        'table': "cities",
+        'column': "metro_fid",
+        'references': "metros",
+        'nullable': True,
+        'error': "Invalid metro_fid",
+    },
+    # Check that every city has a valid or null region_fid.
+    {
+        'table': "cities",
+        'column': "region_fid",
+        'references': "regions",
+        'nullable': True,
+        'error': "Invalid region_fid",
+    },
+]
+
+class LodgingValidationError(ValueError):
+    """Raised when a lodging log fails validation."""
+
+    def __init__(self, report):
+        """Initializes the error with a ValidationReport."""
+        super().__init__(str(report))
+        self.report = report
+
+
+class ValidationReport:
+    """Collects every rule violation found in a lodging log."""
+
+    COLUMNS = ['table', 'column', 'fid', 'value', 'error']
+
+    def __init__(self, violations=None):
+        """
+        Initializes the ValidationReport.
+
+        Args:
+            violations (DataFrame): A DataFrame with table, column, fid,
+                value, and error columns, one row per violation.
+        """
+        if violations is None:
+            violations = pd.DataFrame(columns=self.COLUMNS)
+        self.violations = violations
+
+    def __repr__(self):
+        """Returns a string representation of the ValidationReport."""
+        return f"ValidationReport(violations={len(self.violations)})"
+
+    def __str__(self):
+        """Returns each group of violations as a readable message."""
+        if self.is_valid:
+            return "No invalid data found."
+        messages = []
+        for (table, column, error), group in self.violations.groupby(
+            ['table', 'column', 'error'], sort=False
+        ):
+            invalid_data = group[['fid', 'value']].rename(
+                columns={'value': column}
+            )
+            messages.append(
+                f"Invalid data found in {table} ({error}):\n"
+                f"{invalid_data.to_string(index=False)}"
+            )
+        return "\n\n".join(messages)
+
+    @property
+    def is_valid(self):
+        """Returns True if no violations were found."""
+        return self.violations.empty
+
+    def raise_if_invalid(self):
+        """Raises a LodgingValidationError if any violations were found."""
+        if not self.is_valid:
+            raise LodgingValidationError(self)
+
+
+def validation_query(rules=None):
+    """
+    Returns a single compound query that evaluates every rule and
+    returns one row per violation.
+    """
+    if rules is None:
+        rules = VALIDATION_RULES
+    selects = []
+    for index, rule in enumerate(rules):
+        table = rule['table']
+        column = rule['column']
+        if 'references' in rule:
+            condition = (
+                f"({column} IS NOT NULL AND NOT EXISTS ("
+                f"SELECT 1 FROM {rule['references']} "
+                f"WHERE {rule['references']}.fid = {table}.{column}))"
+            )
+        else:
+            allowed = ", ".join(f"'{v}'" for v in rule['allowed'])
+            condition = f"{column} NOT IN ({allowed})"
+        if not rule['nullable']:
+            condition = f"{condition} OR {column} IS NULL"
+        selects.append(
+            f"SELECT {index} AS rule, fid, CAST({column} AS TEXT) AS value "
+            f"FROM {table} WHERE {condition}"
+        )
+    return "\nUNION ALL\n".join(selects)
+
+
+def validate(connection, rules=None):
+    """
+    Validates a GeoPackage, evaluating every rule in a single query
+    pass and then checking that no two stays share a morning.
+
+    Args:
+        connection (GeoPackageConnection): The connection to validate.
+        rules (list): The rules to check. Defaults to VALIDATION_RULES.
+
+    Returns:
+        ValidationReport: A report of every violation found.
+    """
+    if rules is None:
+        rules = VALIDATION_RULES
+    violations = connection.read_sql(
+        validation_query(rules), label='validate', dtype={'fid': 'int64'},
+    )
+    for col in ['table', 'column', 'error']:
+        violations[col] = [rules[i][col] for i in violations['rule']]
+    violations = violations.sort_values(['rule', 'fid'], kind='stable')
+
+    stays = connection.read_sql(OVERLAP_QUERY,
+        label='validate overlapping stays',
+        parse_dates=['check_out_date'],
+    )
+    violations = pd.concat([violations, _overlap_violations(stays)])
+    return ValidationReport(
+        violations[ValidationReport.COLUMNS].reset_index(drop=True)
+    )
+
+
+def validate_frames(frames, rules=None):
+    """
+    Validates lodging tables held in DataFrames, applying the same
+    checks as validate().
+
+    Args:
+        frames (dict): DataFrames keyed by table name. Each frame has a
+            fid column or a fid index.
+        rules (list): The rules to check. Defaults to VALIDATION_RULES.
+
+    Returns:
+        ValidationReport: A report of every violation found.
+    """
+    if rules is None:
+        rules = VALIDATION_RULES
+    violations = []
+    for rule in rules:
+        df = _with_fid(frames[rule['table']])
+        values = df[rule['column']]
+        if 'references' in rule:
+            valid_values = _with_fid(frames[rule['references']])['fid']
+        else:
+            valid_values = rule['allowed']
+        invalid = values.notna() & ~values.isin(valid_values)
+        if not rule['nullable']:
+            invalid = invalid | values.isna()
+        violations.append(pd.DataFrame({
+            'table': rule['table'],
+            'column': rule['column'],
+            'fid': df.loc[invalid, 'fid'].astype('int64'),
+            'value': [_format_value(v) for v in values[invalid]],
+            'error': rule['error'],
+        }))
+
+    stays = _with_fid(frames['stays'])[['fid', 'check_out_date', 'nights']]
+    stays = stays.assign(
+        check_out_date=pd.to_datetime(stays['check_out_date'])
+    )
+    violations.append(_overlap_violations(stays))
+    violations = pd.concat(violations)
+    return ValidationReport(
+        violations[ValidationReport.COLUMNS].reset_index(drop=True)
+    )
+
+
+def _format_value(value):
+    """
+    Formats an invalid value as SQLite would, so integer ids read into a
+    float column (because of nulls) are not shown with a decimal point.
+    """
+    if pd.isna(value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _with_fid(df):
+    """Returns a DataFrame with its fid index moved to a column."""
+    if df.index.name == 'fid':
+        return df.reset_index()
+    return df
+
+
+def _overlap_violations(stays):
+    """Returns a violations DataFrame for stays sharing a morning."""
+    overlaps = overlapping_stays(stays)
+    return pd.DataFrame({
+        'table': "stays",
+        'column': "check_out_date",
+        'fid': overlaps['fid'].astype('int64'),
+        'value': [
+            f"{row.first_morning:%Y-%m-%d} to {row.last_morning:%Y-%m-%d} "
+            f"also in stay {row.other_fid}"
+            for row in overlaps.itertuples()
+        ],
+        'error': OVERLAP_ERROR,
+    }, columns=ValidationReport.COLUMNS)
+
+
+def overlapping_stays(stays):
+    """
+    Finds pairs of stays that cover at least one of the same mornings.
+
+    Sorts stays by check-in date and sweeps through them, keeping a heap
+    of stays whose check-out date has not yet been passed. Runs in
+    O(n log n + k) time for n stays and k overlapping pairs.
+
+    Args:
+        stays (DataFrame): A DataFrame with fid, check_out_date, and
+            nights columns.
+
+    Returns:
+        DataFrame: A DataFrame with fid, other_fid, first_morning, and
+        last_morning columns, with one row for each overlapping pair.
+        The fid is the stay with the later check-in date, and the
+        mornings are the range of mornings the two stays share.
+    """
+    stays = stays.dropna(subset=['check_out_date', 'nights']).copy()
+    stays['check_in_date'] = stays['check_out_date'] - pd.to_timedelta(
+        stays['nights'], unit='D'
+    )
+    stays = stays.sort_values(['check_in_date', 'check_out_date'])
+
+    overlaps = []
+    active = [] # Heap of (check_out_date, fid) for stays still open.
+    for stay in stays.itertuples():
+        # A stay checking out on this stay's check-in date does not
+        # share any mornings with it.
+        while active and active[0][0] <= stay.check_in_date:
+            heapq.heappop(active)
+        for other_check_out, other_fid in active:
+            overlaps.append({
+                'fid': stay.fid,
+                'other_fid': other_fid,
+                'first_morning': stay.check_in_date + pd.Timedelta(days=1),
+                'last_morning': min(stay.check_out_date, other_check_out),
+            })
+        heapq.heappush(active, (stay.check_out_date, stay.fid))
+
+    return pd.DataFrame(
+        overlaps,
+        columns=['fid', 'other_fid', 'first_morning', 'last_morning'],
+    )
+
+
+def rules_hash(rules=None):
+    """Returns a hash that changes whenever the validation checks change."""
+    return hashlib.sha256(
+        f"{VALIDATION_VERSION}:{validation_query(rules)}".encode('utf-8')
+    ).hexdigest()
+
+
+def fingerprint(path, rules=None):
+    """
+    Returns a fingerprint of a GeoPackage's current contents and the
+    validation rules, which changes whenever either changes.
+
+    Uses the size and modification time of the GeoPackage and its
+    write-ahead log, and the SQLite file change counter.
+    """
+    path = Path(path)
+    parts = {'rules': rules_hash(rules)}
+    for suffix in ['', '-wal']:
+        file = path.with_name(path.name + suffix)
+        if file.exists():
+            stat = file.stat()
+            parts[f"file{suffix}"] = [stat.st_size, stat.st_mtime_ns]
+    with open(path, 'rb') as f:
+        header = f.read(28)
+    parts['change_counter'] = int.from_bytes(header[24:28], 'big')
+    return parts
+
+
+class ValidationCache:
+    """
+    Stores the fingerprint of each GeoPackage's last successful
+    validation, so unchanged files do not need to be validated again.
+    """
+
+    def __init__(self, cache_path):
+        """
+        Initializes the ValidationCache.
+
+        Args:
+            cache_path (Path): The JSON file to store fingerprints in.
+        """
+        self.cache_path = Path(cache_path)
+
+    def is_current(self, path, file_fingerprint):
+        """Returns True if the fingerprint matches the last validation."""
+        return self._read().get(self._key(path)) == file_fingerprint
+
+    def record(self, path, file_fingerprint):
+        """Records the fingerprint of a successful validation."""
+        entries = self._read()
+        entries[self._key(path)] = file_fingerprint
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write a temporary file and rename it over the cache, so that
+        # processes validating other logs at the same time never read a
+        # partly written file.
+        temp_path = self.cache_path.with_name(
+            f"{self.cache_path.name}.{os.getpid()}.tmp"
+        )
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+    def _key(self, path):
+        """Returns the cache key for a GeoPackage path."""
+        return str(Path(path).resolve())
+
+    def _read(self):
+        """Returns all cached fingerprints."""
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
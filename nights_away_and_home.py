@@ -26,9 +26,17 @@ class GroupedStayCollection:
         """
     END_DATE = date.today()
 
-    def __init__(self, start_evening=None, thru_morning=None):
-        """Initialize a GroupedStayCollection."""
-        self.log = LodgingLog()
+    def __init__(self, start_evening=None, thru_morning=None, log=None):
+        """
+        Initialize a GroupedStayCollection.
+
+        Args:
+            start_evening (date): The first evening to include.
+            thru_morning (date): The last morning to include.
+            log (LodgingLog): An open lodging log to read. Defaults to
+                opening the configured log.
+        """
+        self.log = LodgingLog() if log is None else log
 
         if start_evening is None:
             # Use the first morning in the log as the start date.
@@ -768,7 +776,21 @@ class SVGChart:
 
     def export(self, output_path):
         """Generates an SVG chart based on the away/home row values."""
+        tree = self._draw()
+        tree.write(output_path, encoding='utf-8',
+            xml_declaration=True, pretty_print=True)
+        print(f"Wrote SVG to {output_path}")
+
+    def tostring(self):
+        """Generates an SVG chart and returns it as UTF-8 bytes."""
+        return xml.tostring(self._draw(), encoding='UTF-8',
+            xml_declaration=True, pretty_print=True)
 
+    def _draw(self):
+        """
+        Draws the chart and returns its ElementTree. Each SVGChart can
+        only be drawn once.
+        """
         self._import_styles()
         self._create_groups()
 
@@ -782,37 +804,47 @@ class SVGChart:
         self._draw_nights()
         self._draw_annotations()
         self._draw_footer()
-
-        tree = xml.ElementTree(self._root)
-        tree.write(output_path, encoding='utf-8',
-            xml_declaration=True, pretty_print=True)
-        print(f"Wrote SVG to {output_path}")
+        return xml.ElementTree(self._root)
 
 # Main function to generate the nights away and home chart.
 
 def nights_away_and_home(
-    output_svg_file, output_stats_file, start_evening=None, thru_morning=None
+    output_svg_file, output_stats_file, start_evening=None, thru_morning=None,
+    log=None, gsc=None,
 ):
-    """Main function to generate nights away and home chart."""
+    """
+    Main function to generate nights away and home chart.
+
+    Reads the given open LodgingLog (or the configured log if omitted),
+    unless an already grouped GroupedStayCollection is given as gsc, in
+    which case start_evening, thru_morning, and log are ignored.
+    """
 
-    gsc = GroupedStayCollection(start_evening, thru_morning)
+    if gsc is None:
+        gsc = GroupedStayCollection(start_evening, thru_morning, log=log)
 
     svg = SVGChart(gsc)
     svg.export(output_svg_file)
 
     if output_stats_file is not None:
         with open(output_stats_file, 'w', encoding="utf-8") as f:
-            f.write(
-                f"Statistics for stays from {gsc.start_evening} to "
-                f"{gsc.thru_morning}:\n\n")
-            f.write("Top longest home stays:\n")
-            for i, stay in enumerate(gsc.top("home")):
-                f.write(f"  #{i + 1}\t{stay}\n")
-            f.write("\nTop longest away stays:\n")
-            for i, stay in enumerate(gsc.top("away")):
-                f.write(f"  #{i + 1}\t{stay}\n")
+            f.write(stats_text(gsc))
         print(f"Wrote statistics to {output_stats_file}")
 
+def stats_text(gsc):
+    """Returns the summary statistics of a GroupedStayCollection."""
+    lines = [
+        f"Statistics for stays from {gsc.start_evening} to "
+        f"{gsc.thru_morning}:\n\n",
+        "Top longest home stays:\n",
+    ]
+    for i, stay in enumerate(gsc.top("home")):
+        lines.append(f"  #{i + 1}\t{stay}\n")
+    lines.append("\nTop longest away stays:\n")
+    for i, stay in enumerate(gsc.top("away")):
+        lines.append(f"  #{i + 1}\t{stay}\n")
+    return "".join(lines)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Generate a chart of nights away and home."
@@ -0,0 +1,380 @@
+"""
+Serves the lodging reports over HTTP from one lodging log kept loaded
+in memory, reloading it only when the lodging data changes.
+"""
+
+# Standard library imports
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Third-party imports
+import argparse
+
+# First-party imports
+from annual_night_counts import annual_night_counts
+from distance_from_home_by_day import SingleYearDistanceChart
+from frequency_table import frequency_data
+from modules.backends import MemoryBackend
+from modules.distance import DISTANCE_MODELS
+from modules.lodging_log import LodgingLog, configured_backend
+from modules.validation import LodgingValidationError
+from nights_away_and_home import GroupedStayCollection, SVGChart, stats_text
+
+CACHE_ENTRIES = 256 # Number of responses to keep cached.
+
+def flag(value):
+    """Converts a query string value to a bool, like a CLI flag."""
+    if value.lower() in ['', '1', 'true', 'yes', 'on']:
+        return True
+    if value.lower() in ['0', 'false', 'no', 'off']:
+        return False
+    raise ValueError(f"Invalid flag value: {value}")
+
+
+def place_type(value):
+    """Checks a frequency table grouping type."""
+    if value not in ['location', 'city', 'metro', 'region']:
+        raise ValueError(f"Invalid grouping type: {value}")
+    return value
+
+
+def distance_model(value):
+    """Checks a distance model name."""
+    if value not in DISTANCE_MODELS:
+        raise ValueError(f"Invalid distance model: {value}")
+    return value
+
+
+def render_annual_night_counts(log):
+    """Returns the annual night counts CSV."""
+    return annual_night_counts(log).to_csv(index=False).encode('utf-8')
+
+
+def render_frequency_table(log, top=None, **params):
+    """Returns a frequency table CSV."""
+    grouped = frequency_data(log, **params)
+    if top is not None:
+        grouped = grouped.head(top)
+    return grouped.to_csv(index=False).encode('utf-8')
+
+
+def render_distance(log, year, distance_model='geodesic'):
+    """Returns the distance from home CSV for a single year."""
+    chart = SingleYearDistanceChart(year, log=log,
+        distance_model=distance_model,
+    )
+    return chart.distance_series().to_csv(index=False).encode('utf-8')
+
+
+def render_nights_svg(log, start_evening=None, thru_morning=None):
+    """Returns the nights away and home SVG."""
+    gsc = GroupedStayCollection(start_evening, thru_morning, log=log)
+    return SVGChart(gsc).tostring()
+
+
+def render_nights_stats(log, start_evening=None, thru_morning=None):
+    """Returns the nights away and home summary statistics."""
+    gsc = GroupedStayCollection(start_evening, thru_morning, log=log)
+    return stats_text(gsc).encode('utf-8')
+
+
+# Each route has its content type, the function that renders it from
+# the log, and its query string parameters (named as in the scripts'
+# arguments) with the functions that convert them.
+ROUTES = {
+    '/annual_night_counts.csv': {
+        'content_type': "text/csv; charset=utf-8",
+        'render': render_annual_night_counts,
+        'params': {},
+    },
+    '/frequency_table.csv': {
+        'content_type': "text/csv; charset=utf-8",
+        'render': render_frequency_table,
+        'params': {
+            'by': place_type,
+            'start_morning': date.fromisoformat,
+            'thru_morning': date.fromisoformat,
+            'exclude_transit': flag,
+            'top': int,
+            'rank': flag,
+        },
+    },
+    '/distance_from_home_by_day.csv': {
+        'content_type': "text/csv; charset=utf-8",
+        'render': render_distance,
+        'params': {'year': int, 'distance_model': distance_model},
+        'required': ['year'],
+    },
+    '/nights_away_and_home.svg': {
+        'content_type': "image/svg+xml",
+        'render': render_nights_svg,
+        'params': {
+            'start_evening': date.fromisoformat,
+            'thru_morning': date.fromisoformat,
+        },
+    },
+    '/nights_away_and_home.txt': {
+        'content_type': "text/plain; charset=utf-8",
+        'render': render_nights_stats,
+        'params': {
+            'start_evening': date.fromisoformat,
+            'thru_morning': date.fromisoformat,
+        },
+    },
+}
+
+def parse_params(route, query):
+    """
+    Returns the converted parameters of a request.
+
+    Args:
+        route (dict): The route from ROUTES.
+        query (str): The request's query string.
+
+    Returns:
+        dict: The parameter values, keyed by name.
+    """
+    params = {}
+    for name, values in parse_qs(query, keep_blank_values=True).items():
+        if name not in route['params']:
+            raise ValueError(f"Unknown parameter: {name}")
+        try:
+            params[name] = route['params'][name](values[-1])
+        except ValueError as e:
+            raise ValueError(f"Invalid {name}: {e}") from e
+    for name in route.get('required', []):
+        if name not in params:
+            raise ValueError(f"Missing parameter: {name}")
+    return params
+
+
+class ReportService:
+    """
+    Renders reports from one lodging log held in memory, and caches the
+    responses for the current version of the lodging data.
+
+    Requests are rendered concurrently. When the stored data changes, the
+    next request reloads it; reports being rendered finish first, and the
+    cached results of queries whose tables did not change are kept.
+    """
+
+    def __init__(self, backend=None, cache_entries=CACHE_ENTRIES):
+        """
+        Initializes the ReportService.
+
+        Args:
+            backend (str): The name of the storage backend to read. See
+                configured_backend().
+            cache_entries (int): The number of responses to cache.
+        """
+        self.source = configured_backend(backend)
+        self.fingerprint = _fingerprint_key(self.source)
+        self.log = LodgingLog(backend=MemoryBackend.from_backend(self.source))
+        self.cache_entries = cache_entries
+        self._responses = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._log_lock = _ReadWriteLock()
+
+    def close(self):
+        """Closes the storage backend."""
+        self.source.close()
+
+    def response(self, path, params):
+        """
+        Returns the body of a report, from the cache if the same report
+        has already been rendered from the current data.
+
+        Args:
+            path (str): The route path, a key of ROUTES.
+            params (dict): The converted parameters, from parse_params().
+
+        Returns:
+            bytes: The response body.
+        """
+        self.refresh_if_changed()
+        with self._log_lock.reading():
+            key = (self.fingerprint, path, tuple(sorted(params.items())))
+            with self._cache_lock:
+                if key in self._responses:
+                    self._responses.move_to_end(key)
+                    return self._responses[key]
+            body = ROUTES[path]['render'](self.log, **params)
+
+        with self._cache_lock:
+            self._responses[key] = body
+            while len(self._responses) > self.cache_entries:
+                self._responses.popitem(last=False)
+        return body
+
+    def refresh_if_changed(self):
+        """Reloads the lodging data if its fingerprint has changed."""
+        fingerprint = _fingerprint_key(self.source)
+        if fingerprint == self.fingerprint:
+            return
+        with self._refresh_lock:
+            if fingerprint == self.fingerprint:
+                return
+            # Read the new data while reports are still being rendered
+            # from the old data, then swap it in.
+            backend = MemoryBackend.from_backend(self.source)
+            with self._log_lock.writing():
+                try:
+                    changed = self.log.refresh(backend)
+                    print(f"Reloaded changed tables: {sorted(changed)}")
+                except LodgingValidationError as e:
+                    print(f"{e}\nServing the previous data.")
+                self.fingerprint = fingerprint
+            with self._cache_lock:
+                self._responses.clear()
+
+
+def _fingerprint_key(backend):
+    """Returns a backend's fingerprint as a hashable string."""
+    return json.dumps(backend.fingerprint(), sort_keys=True, default=str)
+
+
+class _ReadWriteLock:
+    """A lock that any number of readers or a single writer can hold."""
+
+    def __init__(self):
+        """Initializes the _ReadWriteLock."""
+        self._condition = threading.Condition()
+        self._readers = 0
+
+    @contextmanager
+    def reading(self):
+        """Holds the lock for reading."""
+        with self._condition:
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """Holds the lock for writing, once every reader has finished."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._readers == 0)
+            yield
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Handles GET requests for reports."""
+
+    def do_GET(self):
+        """Sends a report, or the list of reports for `/`."""
+        url = urlsplit(self.path)
+        if url.path == "/":
+            self._send(HTTPStatus.OK, "text/plain; charset=utf-8",
+                _index().encode('utf-8'),
+            )
+            return
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send_error(HTTPStatus.NOT_FOUND, "Unknown report.")
+            return
+        try:
+            params = parse_params(route, url.query)
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        try:
+            body = self.server.service.response(url.path, params)
+        except Exception as e:
+            self.log_error("Error rendering %s: %r", self.path, e)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        self._send(HTTPStatus.OK, route['content_type'], body)
+
+    def _send(self, status, content_type, body):
+        """Sends a response."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        """Sends a plain text error response."""
+        self._send(status, "text/plain; charset=utf-8",
+            f"{status.value} {status.phrase}: {message}\n".encode('utf-8'),
+        )
+
+
+def _index():
+    """Returns a plain text list of the reports and their parameters."""
+    lines = ["Lodging reports:", ""]
+    for path, route in ROUTES.items():
+        params = ", ".join(route['params']) or "(none)"
+        lines.append(f"{path}  parameters: {params}")
+    return "\n".join(lines) + "\n"
+
+
+class ReportServer(ThreadingHTTPServer):
+    """A threaded HTTP server with a ReportService."""
+
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        """
+        Initializes the ReportServer.
+
+        Args:
+            address (tuple): The host and port to listen on.
+            service (ReportService): The service rendering the reports.
+        """
+        super().__init__(address, ReportRequestHandler)
+        self.service = service
+
+
+def serve(host="127.0.0.1", port=8000, backend=None):
+    """
+    Serves the reports until interrupted.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The port to listen on.
+        backend (str): The name of the storage backend to read. See
+            configured_backend().
+    """
+    service = ReportService(backend)
+    with ReportServer((host, port), service) as server:
+        print(f"Serving lodging reports at http://{host}:{port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopped serving.")
+        finally:
+            service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the lodging reports over HTTP."
+    )
+    parser.add_argument('--host',
+        help="address to listen on",
+        default="127.0.0.1",
+    )
+    parser.add_argument('--port',
+        help="port to listen on",
+        type=int,
+        default=8000,
+    )
+    parser.add_argument('--backend',
+        help="storage backend to read (defaults to data_sources.toml)",
+        choices=['gpkg', 'columnar'],
+    )
+    args = parser.parse_args()
+    serve(args.host, args.port, args.backend)
@@ -0,0 +1,178 @@
+"""
+Creates a CSV of the nights away from home in trailing windows (such as
+the last 365 days) for every day of the lodging history, and flags the
+days on which a window exceeds a threshold.
+"""
+
+# Standard library imports
+import datetime
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import numpy as np
+import pandas as pd
+
+# First-party imports
+from modules.lodging_log import LodgingLog
+from modules.timeline import timeline_span
+
+WINDOWS = [30, 90, 365] # Default trailing window lengths, in days.
+PURPOSES = {'Business': 'business', 'Personal': 'personal'}
+
+def rolling_nights_away(
+    output_csv,
+    windows=WINDOWS,
+    thresholds=None,
+    start_morning=None,
+    thru_morning=None,
+    log=None,
+):
+    """
+    Create a CSV of trailing window night counts for each day.
+
+    Args:
+        output_csv (Path): The CSV file to write.
+        windows (list): The window lengths, in days.
+        thresholds (dict): Night counts keyed by window length. Days on
+            which the nights away in the window exceed the count are
+            flagged.
+        start_morning (date): The first morning to write. Windows still
+            count nights before it.
+        thru_morning (date): The last morning to write. Defaults to
+            today.
+        log (LodgingLog): An open lodging log to read. Defaults to
+            opening the configured log.
+    """
+    query = {
+        'windows': windows,
+        'thresholds': thresholds,
+        'thru_morning': thru_morning,
+    }
+    if log is None:
+        with LodgingLog() as log:
+            rolling = rolling_counts(log, **query)
+    else:
+        rolling = rolling_counts(log, **query)
+    if start_morning is not None:
+        rolling = rolling[rolling['morning'] >= pd.Timestamp(start_morning)]
+
+    for window, nights in (thresholds or {}).items():
+        flagged = rolling.loc[rolling[f'exceeds_{window}d'], 'morning']
+        if flagged.empty:
+            print(f"No days exceed {nights} nights away in {window} days.")
+        else:
+            print(
+                f"{len(flagged)} days exceed {nights} nights away in "
+                f"{window} days, from {flagged.iloc[0]:%Y-%m-%d} through "
+                f"{flagged.iloc[-1]:%Y-%m-%d}."
+            )
+
+    rolling.to_csv(output_csv, index=False, date_format='%Y-%m-%d')
+    print(f"Saved CSV to `{output_csv}`.")
+
+def rolling_counts(log, windows=WINDOWS, thresholds=None, thru_morning=None):
+    """
+    Return a DataFrame with a row for every morning of the log's history
+    and the nights away (in total and by purpose) in each trailing
+    window ending that morning.
+
+    The counts are differences of cumulative sums of a daily away
+    indicator, so each window takes a single pass over the days however
+    long it is.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        windows (list): The window lengths, in days.
+        thresholds (dict): Night counts keyed by window length. Adds an
+            `exceeds_{window}d` column for each, true on days when the
+            nights away in the window exceed the count.
+        thru_morning (date): The last morning to include. Defaults to
+            today.
+    """
+    thresholds = thresholds or {}
+    windows = sorted(set(windows) | set(thresholds))
+    for window in windows:
+        if window < 1:
+            raise ValueError(f"Invalid window length: {window}")
+
+    first, last = timeline_span(log, thru_morning)
+    days = pd.date_range(first, last, freq='D', name='morning')
+    mornings = log.mornings().loc[first:last]
+    positions = (mornings.index - first).days.to_numpy()
+
+    # Daily indicators: 1 on each morning away (for the purpose).
+    indicators = {'nights_away': np.zeros(len(days), dtype='int64')}
+    indicators['nights_away'][positions] = 1
+    for purpose, prefix in PURPOSES.items():
+        indicator = np.zeros(len(days), dtype='int64')
+        indicator[positions[(mornings['purpose'] == purpose).to_numpy()]] = 1
+        indicators[f'{prefix}_nights'] = indicator
+
+    # Cumulative totals, with a leading 0 for the day before the first.
+    totals = {
+        name: np.concatenate([[0], np.cumsum(indicator)])
+        for name, indicator in indicators.items()
+    }
+    ends = np.arange(1, len(days) + 1)
+
+    rolling = pd.DataFrame({'morning': days})
+    rolling['away'] = indicators['nights_away']
+    for window in windows:
+        # The nights in the window ending each day are the total through
+        # that day less the total through the day before the window.
+        starts = np.maximum(ends - window, 0)
+        for name, total in totals.items():
+            rolling[f'{name}_{window}d'] = total[ends] - total[starts]
+        if window in thresholds:
+            rolling[f'exceeds_{window}d'] = \
+                rolling[f'nights_away_{window}d'] > thresholds[window]
+    return rolling
+
+def threshold(value):
+    """Parses a DAYS:NIGHTS threshold argument into a (days, nights)."""
+    try:
+        window, nights = (int(part) for part in value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid threshold `{value}` (use DAYS:NIGHTS, such as 365:183)"
+        )
+    return window, nights
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create a CSV of nights away in trailing windows."
+    )
+    parser.add_argument('output_csv',
+        help="CSV file to write the results to",
+        type=Path,
+    )
+    parser.add_argument('--windows',
+        help="trailing window lengths in days",
+        type=int,
+        nargs='+',
+        default=WINDOWS,
+    )
+    parser.add_argument('--threshold',
+        help="flag days with more than NIGHTS nights away in the last DAYS "
+            "days, as DAYS:NIGHTS (may be repeated)",
+        type=threshold,
+        action='append',
+        dest='thresholds',
+    )
+    parser.add_argument('--start_morning',
+        help="the earliest morning to write (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--thru_morning',
+        help="the latest morning to write (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    args = parser.parse_args()
+    rolling_nights_away(
+        args.output_csv,
+        windows=args.windows,
+        thresholds=dict(args.thresholds or []),
+        start_morning=args.start_morning,
+        thru_morning=args.thru_morning,
+    )
@@ -0,0 +1,420 @@
+"""
+Generates the reports listed in a TOML pipeline spec, sharing the
+lodging log and its intermediate results between them.
+"""
+
+# Standard library imports
+import os
+import time
+from datetime import date
+from functools import partial
+from pathlib import Path
+
+# Charts are only saved to files, so no interactive backend is needed in
+# the worker processes. This must be set before pyplot is imported.
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Third-party imports
+import argparse
+import matplotlib.pyplot as plt
+import tomllib
+
+# First-party imports
+from annual_night_counts import create_annual_night_counts
+from distance_from_home_by_day import (
+    YEARS_PER_PAGE,
+    SingleYearDistanceChart,
+    YearsAndAverageDistanceChart,
+)
+from frequency_table import frequency_table
+from modules.backends import MemoryBackend
+from modules.gpkg_watch import GeoPackageWatcher
+from modules.lodging_log import QUERY_TABLES, LodgingLog, configured_backend
+from modules.pipeline import Pipeline
+from nights_away_and_home import GroupedStayCollection, nights_away_and_home
+
+LOG = ('log',)
+MORNINGS = ('mornings',)
+HOME_LOCATIONS = ('home_locations',)
+
+# Shared stages. Each stage after the log caches its query result in the
+# log snapshot and returns the snapshot, so the output stages in every
+# worker read the cached results instead of computing them again.
+
+def load_log(backend=None):
+    """Returns an in-memory snapshot of the lodging log."""
+    with LodgingLog(backend=backend) as log:
+        return log.snapshot()
+
+
+def mornings_stage(log):
+    """Caches the mornings away from home."""
+    log.mornings()
+    return log
+
+
+def home_locations_stage(log):
+    """Caches the home location of each home."""
+    log.home_locations()
+    return log
+
+
+def mornings_by_stage(by, start_morning, thru_morning, exclude_transit, log):
+    """Caches the mornings grouped by a place type."""
+    log.mornings_by(by, start_morning, thru_morning, exclude_transit)
+    return log
+
+
+def timeline_stage(start_morning, thru_morning, distance_model, log, *_):
+    """Caches the daily timeline for a range of mornings."""
+    log.daily_timeline(start_morning, thru_morning, distance_model)
+    return log
+
+
+def grouped_stays_stage(start_evening, thru_morning, log):
+    """Returns the stays grouped into away and home periods."""
+    return GroupedStayCollection(start_evening, thru_morning, log=log)
+
+
+# Output stages, run in worker processes.
+
+def run_annual_night_counts(log, output_csv):
+    """Writes the annual night counts CSV."""
+    create_annual_night_counts(output_csv, log=log)
+
+
+def run_frequency_table(log, **params):
+    """Writes a frequency table CSV."""
+    frequency_table(log=log, silent=True, **params)
+
+
+def run_distance_single(log, **params):
+    """Saves a single year distance from home chart."""
+    SingleYearDistanceChart(log=log, **params).plot()
+    plt.close('all')
+
+
+def run_distance_multi(log, start_year, thru_year, output_img,
+    distance_model='geodesic', output_data=None, decimate=None, agg='mean',
+    years_per_page=YEARS_PER_PAGE,
+):
+    """
+    Saves a multiple year distance from home chart. Its pages are
+    rendered in this process, since outputs already run in parallel.
+    """
+    YearsAndAverageDistanceChart(start_year, thru_year, output_img,
+        log=log, distance_model=distance_model, output_data=output_data,
+        decimate_period=decimate, agg=agg, years_per_page=years_per_page,
+        workers=1,
+    ).plot()
+    plt.close('all')
+
+
+def run_nights_away_and_home(gsc, output_svg, output_stats=None):
+    """Writes the nights away and home SVG and statistics."""
+    nights_away_and_home(output_svg, output_stats, gsc=gsc)
+
+
+# Functions adding each report type to a pipeline. Each declares the
+# shared stages its output needs; stages with equal keys are shared.
+
+def add_annual_night_counts(pipeline, output_csv):
+    """Adds an annual night counts output."""
+    pipeline.add_output(
+        f"annual_night_counts ({output_csv.name})",
+        partial(run_annual_night_counts, output_csv=output_csv),
+        [MORNINGS],
+    )
+
+
+def add_frequency_table(pipeline, output_csv, by='city', start_morning=None,
+    thru_morning=None, exclude_transit=False, top=None, rank=False,
+):
+    """Adds a frequency table output."""
+    key = ('mornings_by', by, start_morning, thru_morning, exclude_transit)
+    pipeline.add_stage(key,
+        partial(mornings_by_stage,
+            by, start_morning, thru_morning, exclude_transit,
+        ),
+        [MORNINGS],
+        QUERY_TABLES['mornings_by'],
+    )
+    pipeline.add_output(
+        f"frequency_table ({output_csv.name})",
+        partial(run_frequency_table,
+            by=by,
+            start_morning=start_morning,
+            thru_morning=thru_morning,
+            output_csv=output_csv,
+            top=top,
+            exclude_transit=exclude_transit,
+            rank=rank,
+        ),
+        [key],
+    )
+
+
+def add_distance_single(pipeline, output_img, year, output_csv=None,
+    labels=None, earliest_prior_year=None, distance_model='geodesic',
+):
+    """Adds a single year distance from home chart output."""
+    key = add_timeline(pipeline, earliest_prior_year or year, year,
+        distance_model,
+    )
+    pipeline.add_output(
+        f"distance_single ({output_img.name})",
+        partial(run_distance_single,
+            year=year,
+            output_img=output_img,
+            output_csv=output_csv,
+            labels=None if labels is None else Path(labels).expanduser(),
+            earliest_prior_year=earliest_prior_year,
+            distance_model=distance_model,
+        ),
+        [key],
+    )
+
+
+def add_distance_multi(pipeline, output_img, start_year, thru_year,
+    distance_model='geodesic', output_data=None, decimate=None, agg='mean',
+    years_per_page=YEARS_PER_PAGE,
+):
+    """Adds a multiple year distance from home chart output."""
+    key = add_timeline(pipeline, start_year, thru_year, distance_model)
+    pipeline.add_output(
+        f"distance_multi ({output_img.name})",
+        partial(run_distance_multi,
+            start_year=start_year,
+            thru_year=thru_year,
+            output_img=output_img,
+            distance_model=distance_model,
+            output_data=output_data,
+            decimate=decimate,
+            agg=agg,
+            years_per_page=years_per_page,
+        ),
+        [key],
+    )
+
+
+def add_timeline(pipeline, start_year, thru_year, distance_model='geodesic'):
+    """Adds a timeline stage for a range of years and returns its key."""
+    start_morning = date(int(start_year), 1, 1)
+    thru_morning = date(int(thru_year), 12, 31)
+    key = ('timeline', start_morning, thru_morning, distance_model)
+    pipeline.add_stage(key,
+        partial(timeline_stage, start_morning, thru_morning, distance_model),
+        [MORNINGS, HOME_LOCATIONS],
+        QUERY_TABLES['daily_timeline'],
+    )
+    return key
+
+
+def add_nights_away_and_home(pipeline, output_svg, output_stats=None,
+    start_evening=None, thru_morning=None,
+):
+    """Adds a nights away and home chart output."""
+    key = ('grouped_stays', start_evening, thru_morning)
+    pipeline.add_stage(key,
+        partial(grouped_stays_stage, start_evening, thru_morning),
+        [MORNINGS],
+    )
+    pipeline.add_output(
+        f"nights_away_and_home ({output_svg.name})",
+        partial(run_nights_away_and_home,
+            output_svg=output_svg,
+            output_stats=output_stats,
+        ),
+        [key],
+    )
+
+
+REPORTS = {
+    'annual_night_counts': add_annual_night_counts,
+    'frequency_table': add_frequency_table,
+    'distance_single': add_distance_single,
+    'distance_multi': add_distance_multi,
+    'nights_away_and_home': add_nights_away_and_home,
+}
+
+# Output file options, which are relative to the spec's output_dir.
+OUTPUT_PATHS = [
+    'output_csv', 'output_data', 'output_img', 'output_svg', 'output_stats',
+]
+
+def build_pipeline(spec, workers=None, log=None):
+    """
+    Returns a Pipeline for the outputs in a pipeline spec.
+
+    Args:
+        spec (dict): The parsed spec. `outputs` is a list of tables with
+            a `report` name and that report's options; the optional
+            `output_dir`, `workers`, and `backend` keys set the folder
+            for output files, the number of worker processes, and the
+            lodging log storage backend.
+        workers (int): The number of worker processes, overriding the
+            spec's `workers` value.
+        log (LodgingLog): A picklable log to generate every run's
+            outputs from, such as one held in a MemoryBackend. Defaults
+            to reading a new snapshot of the configured log on each run.
+
+    Returns:
+        Pipeline: The pipeline.
+    """
+    output_dir = Path(spec.get('output_dir', ".")).expanduser()
+    pipeline = Pipeline(workers=workers or spec.get('workers'))
+    if log is None:
+        pipeline.add_stage(LOG, partial(load_log, spec.get('backend')))
+    else:
+        pipeline.add_stage(LOG, lambda: log)
+    pipeline.add_stage(MORNINGS, mornings_stage, [LOG],
+        QUERY_TABLES['mornings'],
+    )
+    pipeline.add_stage(HOME_LOCATIONS, home_locations_stage, [LOG],
+        QUERY_TABLES['home_locations'],
+    )
+
+    if not spec.get('outputs'):
+        raise ValueError("The pipeline spec has no outputs.")
+    for output in spec['outputs']:
+        options = dict(output)
+        report = options.pop('report', None)
+        if report not in REPORTS:
+            raise ValueError(f"Invalid report: {report}")
+        for option in OUTPUT_PATHS:
+            if option in options:
+                options[option] = output_dir / options[option]
+        try:
+            REPORTS[report](pipeline, **options)
+        except TypeError as e:
+            raise ValueError(f"Invalid options for {report}: {e}") from e
+    return pipeline
+
+
+def run_pipeline(spec_path, workers=None):
+    """
+    Generates every output in a pipeline spec and prints the time taken
+    by each stage.
+
+    Args:
+        spec_path (Path): The TOML pipeline spec.
+        workers (int): The number of worker processes, overriding the
+            spec's `workers` value.
+
+    Returns:
+        DataFrame: The timing of each stage, from Pipeline.run().
+    """
+    spec = load_spec(spec_path)
+    return run_and_report(build_pipeline(spec, workers))
+
+
+def watch_pipeline(spec_path, workers=None, interval=1.0, debounce=2.0):
+    """
+    Generates every output in a pipeline spec, then watches the
+    GeoPackage and regenerates the outputs that depend on the tables
+    changed by each committed edit, until interrupted.
+
+    The log stays loaded in memory between runs. After each edit only
+    the changed tables are compared, and only the cached results that
+    depend on them are recomputed.
+
+    Args:
+        spec_path (Path): The TOML pipeline spec.
+        workers (int): The number of worker processes, overriding the
+            spec's `workers` value.
+        interval (float): The seconds between checks for changes.
+        debounce (float): The seconds to wait after a change for further
+            changes before regenerating outputs.
+    """
+    spec = load_spec(spec_path)
+    # Watch mode always reads the GeoPackage, which is what gets edited.
+    source = configured_backend('gpkg')
+    try:
+        log = LodgingLog(backend=MemoryBackend.from_backend(source))
+        pipeline = build_pipeline(spec, workers, log=log)
+        run_and_report(pipeline)
+        with GeoPackageWatcher(source.path, interval, debounce) as watcher:
+            print(f"\nWatching {source.path} (press Ctrl+C to stop)")
+            while True:
+                watcher.wait()
+                try:
+                    changed = log.refresh(MemoryBackend.from_backend(source))
+                except ValueError as e:
+                    print(f"\n{e}\nKeeping the previous outputs.")
+                    continue
+                if not changed:
+                    print("\nNo lodging tables changed.")
+                    continue
+                print(f"\nChanged: {', '.join(sorted(changed))}")
+                run_and_report(pipeline, changed)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        source.close()
+
+
+def load_spec(spec_path):
+    """Reads a pipeline spec and creates its output folder."""
+    with open(spec_path, 'rb') as f:
+        spec = tomllib.load(f)
+    Path(spec.get('output_dir', ".")).expanduser().mkdir(
+        parents=True, exist_ok=True
+    )
+    return spec
+
+
+def run_and_report(pipeline, changed=None):
+    """Runs a pipeline and prints the time taken by each stage."""
+    start = time.perf_counter()
+    timings = pipeline.run(changed)
+    elapsed = time.perf_counter() - start
+
+    if timings.empty:
+        print("No outputs depend on the changed tables.")
+        return timings
+    print(f"\n{'stage':<48} {'kind':<7} {'ms':>10}")
+    for row in timings.itertuples():
+        print(f"{row.stage:<48} {row.kind:<7} {row.seconds * 1000:>10.1f}")
+        if row.error is not None:
+            print(f"    failed: {row.error}")
+    print(f"{'total':<48} {'':<7} {elapsed * 1000:>10.1f}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate the reports listed in a pipeline spec."
+    )
+    parser.add_argument('spec',
+        help="TOML file listing the reports to generate",
+        type=Path,
+        nargs='?',
+        default=Path(__file__).parent / "pipeline.toml",
+    )
+    parser.add_argument('--workers',
+        help="number of worker processes (1 runs every report in this "
+            "process)",
+        type=int,
+    )
+    parser.add_argument('--watch',
+        help="keep running, and regenerate outputs when the GeoPackage "
+            "changes",
+        action='store_true',
+    )
+    parser.add_argument('--interval',
+        help="seconds between checks for changes in watch mode",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument('--debounce',
+        help="seconds to wait for further changes before regenerating",
+        type=float,
+        default=2.0,
+    )
+    args = parser.parse_args()
+    if args.watch:
+        watch_pipeline(args.spec, args.workers, args.interval, args.debounce)
+    else:
+        timings = run_pipeline(args.spec, args.workers)
+        if timings['error'].notna().any():
+            raise SystemExit(1)
@@ -0,0 +1,211 @@
+"""
+Finds the longest runs of consecutive nights away from home with the
+same value of an attribute, such as the same city, purpose, or stay
+type.
+"""
+
+# Standard library imports
+import datetime
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import numpy as np
+import pandas as pd
+
+# First-party imports
+from modules.lodging_log import LodgingLog
+
+# The mornings column each attribute is read from, and for places, the
+# point layer and columns holding its key and name.
+ATTRIBUTES = {
+    'location': {
+        'column': 'stay_location_fid',
+        'layer': 'stay_locations',
+        'key': None,
+        'name': 'name',
+    },
+    'city': {
+        'column': 'city_fid', 'layer': 'cities', 'key': 'key', 'name': 'name',
+    },
+    'metro': {
+        'column': 'metro_fid', 'layer': 'metros', 'key': 'key', 'name': 'name',
+    },
+    'region': {
+        'column': 'region_fid',
+        'layer': 'regions',
+        'key': 'iso_3166_2',
+        'name': 'name',
+    },
+    'purpose': {'column': 'purpose'},
+    'type': {'column': 'type'},
+}
+TOP = 10 # Default number of runs to keep for each attribute.
+
+def streaks(
+    by=tuple(ATTRIBUTES),
+    top=TOP,
+    start_morning=None,
+    thru_morning=None,
+    output_csv=None,
+    silent=False,
+    log=None,
+):
+    """
+    Find the longest runs of consecutive nights for each attribute, and
+    print them and/or write them to a CSV.
+
+    The log argument is an open LodgingLog to read; if omitted, the
+    configured log is opened and closed.
+    """
+    query = {
+        'by': by,
+        'top': top,
+        'start_morning': start_morning,
+        'thru_morning': thru_morning,
+    }
+    if log is None:
+        with LodgingLog() as log:
+            runs = streak_data(log, **query)
+    else:
+        runs = streak_data(log, **query)
+
+    if not silent:
+        for attribute, attribute_runs in runs.groupby('attribute',
+            sort=False):
+            print(f"Longest runs by {attribute}:")
+            print(attribute_runs.drop(columns='attribute')
+                .dropna(axis=1, how='all').to_string(index=False))
+            print()
+
+    if output_csv is not None:
+        runs.to_csv(output_csv, index=False, date_format='%Y-%m-%d')
+        print(f"Saved CSV to `{output_csv}`.")
+
+def streak_data(log, by=tuple(ATTRIBUTES), top=TOP, start_morning=None,
+    thru_morning=None,
+):
+    """
+    Return a DataFrame of the longest runs of consecutive nights with the
+    same value of each attribute, longest first.
+
+    A run ends at a night at home, or at a night away where the attribute
+    differs or is missing (such as the city of a stay location with no
+    city).
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        by (list): The attributes: keys of ATTRIBUTES.
+        top (int): The number of runs to keep for each attribute, or None
+            for all.
+        start_morning (date): The first morning to include.
+        thru_morning (date): The last morning to include.
+
+    Returns:
+        DataFrame: A row for each run, with its attribute, rank, value
+        (the key of a place, or the purpose or type), name (for places),
+        first and last mornings, and night count.
+    """
+    for attribute in by:
+        if attribute not in ATTRIBUTES:
+            raise ValueError(f"Invalid attribute: {attribute}")
+    mornings = log.mornings().loc[start_morning:thru_morning]
+    day_numbers = (mornings.index - pd.Timestamp(0)).days.to_numpy()
+    # True where the morning directly follows the previous one.
+    consecutive = np.zeros(len(mornings), dtype=bool)
+    consecutive[1:] = np.diff(day_numbers) == 1
+
+    frames = [
+        _attribute_runs(log, mornings, attribute, consecutive, top)
+        for attribute in by
+    ]
+    columns = ['attribute', 'rank', 'value', 'name', 'first_morning',
+        'last_morning', 'nights']
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def _attribute_runs(log, mornings, attribute, consecutive, top):
+    """Return the longest runs of one attribute."""
+    spec = ATTRIBUTES[attribute]
+    values = mornings[spec['column']]
+    present = values.notna().to_numpy()
+    codes = pd.factorize(values)[0]
+
+    same = np.zeros(len(mornings), dtype=bool)
+    same[1:] = codes[1:] == codes[:-1]
+    # A run starts at every present morning that does not continue the
+    # previous morning's run.
+    starts = present & ~(consecutive & same)
+    run_ids = np.cumsum(starts)[present]
+
+    present_mornings = mornings.index[present]
+    runs = pd.DataFrame({
+        'run': run_ids,
+        'morning': present_mornings,
+        'value': values[present].to_numpy(),
+    }).groupby('run').agg(
+        value=('value', 'first'),
+        first_morning=('morning', 'first'),
+        last_morning=('morning', 'last'),
+        nights=('morning', 'count'),
+    )
+    runs = runs.sort_values(['nights', 'first_morning'],
+        ascending=[False, True], kind='stable',
+    )
+    if top is not None:
+        runs = runs.head(top)
+
+    if 'layer' in spec:
+        places = log.places(spec['layer'])
+        runs['name'] = places[spec['name']].reindex(runs['value']).to_numpy()
+        if spec['key'] is not None:
+            runs['value'] = \
+                places[spec['key']].reindex(runs['value']).to_numpy()
+    else:
+        runs['name'] = pd.NA
+    runs.insert(0, 'attribute', attribute)
+    runs.insert(1, 'rank', range(1, len(runs) + 1))
+    return runs.reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find the longest runs of consecutive nights."
+    )
+    parser.add_argument('--by',
+        help="attributes to find runs of",
+        choices=list(ATTRIBUTES),
+        nargs='+',
+        default=list(ATTRIBUTES),
+    )
+    parser.add_argument('--top',
+        help="how many runs to show for each attribute",
+        type=int,
+        default=TOP,
+    )
+    parser.add_argument('--start_morning',
+        help="the earliest morning to include (inclusive) in YYYY-MM-DD "
+            "format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--thru_morning',
+        help="the latest morning to include (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--output_csv',
+        help="CSV file to write the results to",
+        type=Path,
+    )
+    parser.add_argument('--silent',
+        help="do not show the runs in console",
+        action='store_true',
+    )
+    args = parser.parse_args()
+    streaks(
+        args.by,
+        top=args.top,
+        start_morning=args.start_morning,
+        thru_morning=args.thru_morning,
+        output_csv=args.output_csv,
+        silent=args.silent,
+    )
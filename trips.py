@@ -0,0 +1,211 @@
+"""
+Creates a table of trips, each a period of consecutive nights away from
+home, with the places visited and the distances traveled on each.
+"""
+
+# Standard library imports
+import datetime
+from pathlib import Path
+
+# Third-party imports
+import argparse
+import numpy as np
+import pandas as pd
+
+# First-party imports
+from modules.distance import DISTANCE_MODELS, distance_miles
+from modules.lodging_log import LodgingLog
+
+DISTANCE_DECIMALS = 1 # Number of decimal places for distances
+
+def trips(
+    start_morning=None,
+    thru_morning=None,
+    output_csv=None,
+    top=None,
+    silent=False,
+    log=None,
+    distance_model='geodesic',
+):
+    """
+    Create a table of trips, and print it and/or write it to a CSV.
+
+    The log argument is an open LodgingLog to read; if omitted, the
+    configured log is opened and closed.
+    """
+    query = {
+        'start_morning': start_morning,
+        'thru_morning': thru_morning,
+        'distance_model': distance_model,
+    }
+    if log is None:
+        with LodgingLog() as log:
+            trip_table = trip_data(log, **query)
+    else:
+        trip_table = trip_data(log, **query)
+
+    if not silent:
+        shown = trip_table if top is None else trip_table.tail(top)
+        print(shown.to_string(index=False))
+        print(f"{len(trip_table)} trips, "
+            f"{trip_table['nights'].sum()} nights away")
+
+    if output_csv is not None:
+        trip_table.to_csv(output_csv, index=False, date_format='%Y-%m-%d')
+        print(f"Saved CSV to `{output_csv}`.")
+
+def trip_data(log, start_morning=None, thru_morning=None,
+    distance_model='geodesic',
+):
+    """
+    Return a DataFrame with a row for each trip: each run of consecutive
+    nights away from home, which may span several back to back stays, as
+    in the away periods of nights_away_and_home.py.
+
+    Distances are between the coordinates of each stay's city (or stay
+    location, if it has no city) and the home in effect. The distances
+    of every leg of every trip are computed in a single batch.
+
+    Args:
+        log (LodgingLog): The lodging log to read.
+        start_morning (date): The first morning to include. Defaults to
+            the first morning of the log.
+        thru_morning (date): The last morning to include. Defaults to
+            today.
+        distance_model (str): `geodesic` or `haversine`. See
+            modules.distance.distance_miles().
+
+    Returns:
+        DataFrame: The trips, in date order, with the following columns:
+            start_evening, thru_morning, nights: The trip's dates.
+            {purpose}_nights: The nights for each purpose.
+            places: The places stayed, in order.
+            farthest_place, farthest_mi: The place farthest from home,
+                and its distance.
+            lodging_distance_mi: The total distance between consecutive
+                stays on the trip.
+            round_trip_mi: The lodging distance plus the distances from
+                home to the first stay and from the last stay to home.
+    """
+    timeline = log.daily_timeline(start_morning, thru_morning,
+        distance_model,
+    )
+    away = (timeline['status'] == 'away').to_numpy()
+    trip_starts = away & ~np.concatenate([[False], away[:-1]])
+    mornings = timeline[away].reset_index()
+    mornings['trip'] = np.cumsum(trip_starts)[away]
+    mornings['place'] = place_names(log, mornings)
+
+    # The first morning of each stay, and the previous stay on its trip.
+    new_stay = np.ones(len(mornings), dtype=bool)
+    new_stay[1:] = (mornings['stay_fid'].to_numpy()[1:]
+        != mornings['stay_fid'].to_numpy()[:-1])
+    stays = mornings[new_stay | trip_starts[away]].reset_index(drop=True)
+    same_trip = stays['trip'].eq(stays['trip'].shift()).to_numpy()
+    last_stays = mornings.groupby('trip').tail(1)
+    first_stays = stays[~same_trip]
+
+    # Compute the legs between stays, from home, and to home at once.
+    prev = stays.shift()
+    legs = distance_miles(
+        np.concatenate([prev['lat'][same_trip],
+            first_stays['home_lat'], last_stays['lat']]),
+        np.concatenate([prev['lon'][same_trip],
+            first_stays['home_lon'], last_stays['lon']]),
+        np.concatenate([stays['lat'][same_trip],
+            first_stays['lat'], last_stays['home_lat']]),
+        np.concatenate([stays['lon'][same_trip],
+            first_stays['lon'], last_stays['home_lon']]),
+        distance_model,
+    )
+    lodging_legs = pd.Series(legs[:same_trip.sum()],
+        index=stays['trip'][same_trip],
+    )
+    home_legs = pd.Series(legs[same_trip.sum():], index=np.concatenate(
+        [first_stays['trip'], last_stays['trip']]
+    ))
+
+    grouped = mornings.groupby('trip')
+    table = grouped.agg(
+        first_morning=('morning', 'first'),
+        thru_morning=('morning', 'last'),
+        nights=('morning', 'count'),
+    )
+    table.insert(0, 'start_evening',
+        table.pop('first_morning') - pd.Timedelta(days=1),
+    )
+    purposes = pd.crosstab(mornings['trip'], mornings['purpose'])
+    purposes.columns = [f"{p.lower()}_nights" for p in purposes.columns]
+    table = table.join(purposes)
+    table['places'] = stays.groupby('trip')['place'].agg(_join_places)
+
+    farthest = mornings.loc[
+        mornings['distance_mi'].fillna(-1).groupby(mornings['trip']).idxmax()
+    ].set_index('trip')
+    table['farthest_place'] = farthest['place']
+    table['farthest_mi'] = farthest['distance_mi']
+    lodging = lodging_legs.groupby(level=0).sum() \
+        .reindex(table.index, fill_value=0.0)
+    table['lodging_distance_mi'] = lodging
+    table['round_trip_mi'] = lodging + home_legs.groupby(level=0).sum()
+
+    distance_cols = ['farthest_mi', 'lodging_distance_mi', 'round_trip_mi']
+    table[distance_cols] = table[distance_cols].round(DISTANCE_DECIMALS)
+    return table.reset_index(drop=True)
+
+def place_names(log, df):
+    """
+    Return the name of each row's city, or of its stay location if it has
+    no city.
+    """
+    cities = log.geodata_cache['cities']
+    stay_locations = log.geodata_cache['stay_locations']
+    return df['city_fid'].map(cities['name']).where(
+        df['city_fid'].notna(),
+        df['stay_location_fid'].map(stay_locations['name']),
+    )
+
+def _join_places(places):
+    """Join place names in order, dropping consecutive repeats."""
+    places = places[places.ne(places.shift())]
+    return "; ".join(places.astype(str))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create a CSV of trips and their distances."
+    )
+    parser.add_argument('--start_morning',
+        help="the earliest morning to include (inclusive) in YYYY-MM-DD "
+            "format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--thru_morning',
+        help="the latest morning to include (inclusive) in YYYY-MM-DD format",
+        type=datetime.date.fromisoformat,
+    )
+    parser.add_argument('--output_csv',
+        help="CSV file to write the results to",
+        type=Path,
+    )
+    parser.add_argument('--top',
+        help="how many of the most recent trips to show",
+        type=int,
+    )
+    parser.add_argument('--silent',
+        help="do not show table in console",
+        action='store_true',
+    )
+    parser.add_argument('--distance_model',
+        help="geodesic (WGS84) or haversine (faster, within about 0.6%%)",
+        choices=list(DISTANCE_MODELS),
+        default='geodesic',
+    )
+    args = parser.parse_args()
+    trips(
+        start_morning=args.start_morning,
+        thru_morning=args.thru_morning,
+        output_csv=args.output_csv,
+        top=args.top,
+        silent=args.silent,
+        distance_model=args.distance_model,
+    )